@@ -0,0 +1,156 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterator, Optional
+
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    from strands import Agent
+
+    from query_router import QueryRouter
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Session configuration
+AGENT_IDLE_TIMEOUT = float(os.getenv("AGENT_IDLE_TIMEOUT", "1800"))  # seconds
+AGENT_MAX_SESSIONS = int(os.getenv("AGENT_MAX_SESSIONS", "100"))
+# Concurrent events each Gradio app processes
+APP_CONCURRENCY_LIMIT = int(os.getenv("APP_CONCURRENCY_LIMIT", "8"))
+
+
+class _Session:
+    def __init__(self, agent: "Agent", router: Optional["QueryRouter"] = None):
+        self.agent = agent
+        self.router = router
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+class AgentPool:
+    """Keeps one agent, and so one conversation, per user session.
+    Agents are created on a session's first request, and evicted after
+    AGENT_IDLE_TIMEOUT seconds without use. When there are more than
+    AGENT_MAX_SESSIONS sessions, the least recently used idle one is evicted.
+    Requests in the same session run one at a time. Requests in different sessions
+    run concurrently. With a router_factory, each session also gets a QueryRouter
+    over its agent's tools, so fast-path searches use the session's embedding
+    handles and result store.
+    """
+
+    def __init__(
+        self,
+        agent_factory: Callable[[], "Agent"],
+        logger: logging.Logger,
+        idle_timeout: float = AGENT_IDLE_TIMEOUT,
+        max_sessions: int = AGENT_MAX_SESSIONS,
+        router_factory: Optional[Callable[["Agent"], "QueryRouter"]] = None,
+    ):
+        self.agent_factory = agent_factory
+        self.router_factory = router_factory
+        self.logger = logger
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator["Agent"]:
+        """Checks out the session's agent, creating it if needed.
+        Waits while another request of the same session is using the agent.
+        Args:
+            session_id (str): The user session ID.
+        Yields:
+            Agent: The session's agent.
+        """
+        with self.routed_session(session_id) as (agent, _):
+            yield agent
+
+    @contextmanager
+    def routed_session(
+        self, session_id: str
+    ) -> Iterator[tuple["Agent", Optional["QueryRouter"]]]:
+        """Checks out the session's agent and router, creating them if needed.
+        Args:
+            session_id (str): The user session ID.
+        Yields:
+            tuple: The session's agent, and its router, or None without a
+            router_factory.
+        """
+        entry = self._checkout(session_id)
+        with entry.lock:
+            try:
+                yield entry.agent, entry.router
+            finally:
+                entry.last_used = time.monotonic()
+
+    def reset(self, session_id: str) -> None:
+        """Forgets a session's conversation without calling the model.
+        The session gets a new agent on its next request.
+        Args:
+            session_id (str): The user session ID.
+        """
+        with self._lock:
+            removed = self._sessions.pop(session_id, None)
+        if removed is not None:
+            self.logger.info(f"Reset conversation for session {session_id[:8]}")
+
+    def stats(self) -> dict:
+        """Returns the number of sessions and how many are running a request.
+        Returns:
+            dict: Session counters and limits.
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "sessions": len(sessions),
+            "active": sum(1 for entry in sessions if entry.lock.locked()),
+            "max_sessions": self.max_sessions,
+            "idle_timeout": self.idle_timeout,
+        }
+
+    def _checkout(self, session_id: str) -> _Session:
+        """Returns the session's entry, evicting idle sessions first."""
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                self._sessions.move_to_end(session_id)
+                entry.last_used = time.monotonic()
+                return entry
+
+        # Build the agent outside the lock, so other sessions are not held up
+        agent = self.agent_factory()
+        router = self.router_factory(agent) if self.router_factory else None
+        with self._lock:
+            entry = self._sessions.setdefault(session_id, _Session(agent, router))
+            self._sessions.move_to_end(session_id)
+            self._evict_excess(keep=session_id)
+            self.logger.info(
+                f"Created agent for session {session_id[:8]} "
+                f"({len(self._sessions)} sessions)"
+            )
+            return entry
+
+    def _evict_idle(self, now: float) -> None:
+        """Drops sessions idle for too long. The caller must hold the lock."""
+        for session_id, entry in list(self._sessions.items()):
+            if not entry.lock.locked() and now - entry.last_used > self.idle_timeout:
+                del self._sessions[session_id]
+                self.logger.info(f"Evicted idle session {session_id[:8]}")
+
+    def _evict_excess(self, keep: str) -> None:
+        """Drops the least recently used idle sessions above the session cap.
+        The caller must hold the lock.
+        """
+        for session_id, entry in list(self._sessions.items()):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if session_id != keep and not entry.lock.locked():
+                del self._sessions[session_id]
+                self.logger.info(f"Evicted oldest session {session_id[:8]}")
@@ -0,0 +1,200 @@
+import asyncio
+import contextvars
+import queue
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterator,
+    Callable,
+    Iterator,
+    NamedTuple,
+    Optional,
+)
+
+from event_loop import BackgroundEventLoop, get_background_loop
+from session_logs import get_session_logs, log_session
+from telemetry import record_agent_result, stage
+
+# Strands is imported by the search agent; the UI can start before it is loaded
+if TYPE_CHECKING:
+    from strands import Agent
+    from strands.agent import AgentResult
+
+    from query_router import QueryRouter
+
+
+class StreamUpdate(NamedTuple):
+    """One incremental update from a streaming agent invocation.
+    kind is "text" for a chunk of model output, "tool" when a tool starts or
+    finishes, "progress" for a step inside a tool, "log" for a line logged by the
+    invocation's session, and "result" for the final AgentResult. A result without
+    an AgentResult carries the complete answer of a search the router ran without
+    the model.
+    """
+
+    kind: str
+    text: str = ""
+    result: Optional["AgentResult"] = None
+
+
+# Receives progress messages reported by the tools of the current invocation
+_progress_sink: contextvars.ContextVar[Optional[Callable[[str], None]]] = (
+    contextvars.ContextVar("progress_sink", default=None)
+)
+
+
+def report_progress(message: str) -> None:
+    """Reports a progress step to the streaming invocation that is running the caller.
+    Does nothing outside a streaming invocation.
+    Args:
+        message (str): A short description of the step.
+    """
+    sink = _progress_sink.get()
+    if sink is not None:
+        sink(message)
+
+
+def stream_agent(
+    agent: "Agent",
+    prompt: str,
+    background_loop: Optional[BackgroundEventLoop] = None,
+    router: Optional["QueryRouter"] = None,
+    session_id: Optional[str] = None,
+) -> Iterator[StreamUpdate]:
+    """Invokes the agent and yields its output as it is produced.
+    Synchronous wrapper around stream_agent_async, for generator UI handlers.
+    Args:
+        agent (Agent): The agent to invoke.
+        prompt (str): The user prompt.
+        background_loop (BackgroundEventLoop): The loop to run the agent on.
+        router (QueryRouter): Answers explicit searches without invoking the model.
+        session_id (str): Tags the invocation's logs with this user session, and
+            streams them as "log" updates.
+    Yields:
+        StreamUpdate: Model text, tool progress and, last, the final result.
+    """
+    background_loop = background_loop or get_background_loop()
+    updates: queue.Queue = queue.Queue()
+    done = object()
+
+    async def produce():
+        try:
+            await _run_agent(agent, prompt, updates.put, router, session_id)
+        finally:
+            updates.put(done)
+
+    future = asyncio.run_coroutine_threadsafe(produce(), background_loop.loop)
+    try:
+        while (update := updates.get()) is not done:
+            yield update
+        future.result()
+    finally:
+        future.cancel()
+
+
+async def stream_agent_async(
+    agent: "Agent",
+    prompt: str,
+    background_loop: Optional[BackgroundEventLoop] = None,
+    router: Optional["QueryRouter"] = None,
+    session_id: Optional[str] = None,
+) -> AsyncIterator[StreamUpdate]:
+    """Invokes the agent and yields its output as it is produced.
+    The agent runs on the background loop, so its tools await their I/O directly
+    and report progress into this stream.
+    Args:
+        agent (Agent): The agent to invoke.
+        prompt (str): The user prompt.
+        background_loop (BackgroundEventLoop): The loop to run the agent on.
+        router (QueryRouter): Answers explicit searches without invoking the model.
+        session_id (str): Tags the invocation's logs with this user session, and
+            streams them as "log" updates.
+    Yields:
+        StreamUpdate: Model text, tool progress and, last, the final result.
+    """
+    background_loop = background_loop or get_background_loop()
+    caller_loop = asyncio.get_running_loop()
+    updates: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def emit(update):
+        caller_loop.call_soon_threadsafe(updates.put_nowait, update)
+
+    async def produce():
+        try:
+            await background_loop.run_async(
+                _run_agent(agent, prompt, emit, router, session_id)
+            )
+        finally:
+            emit(done)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (update := await updates.get()) is not done:
+            yield update
+        await producer
+    finally:
+        producer.cancel()
+
+
+async def _run_agent(
+    agent: "Agent",
+    prompt: str,
+    emit: Callable[[StreamUpdate], None],
+    router: Optional["QueryRouter"] = None,
+    session_id: Optional[str] = None,
+) -> None:
+    """Translates the agent's stream events into StreamUpdates.
+    Explicit searches recognized by the router are answered directly instead.
+    """
+    if session_id is not None:
+        # Logged lines are pushed by the log writer thread as they are written
+        with log_session(session_id), get_session_logs().subscribe(
+            session_id, lambda line: emit(StreamUpdate("log", line))
+        ):
+            await _run_agent(agent, prompt, emit, router)
+        return
+
+    token = _progress_sink.set(lambda message: emit(StreamUpdate("progress", message)))
+    try:
+        route = router.route(prompt) if router is not None else None
+        if route is not None and route.mode != "agent":
+            emit(StreamUpdate("tool", f"Running a {route.mode} search directly"))
+            with stage("fast_path_search", mode=route.mode):
+                answer = await router.answer_async(route, agent)
+            emit(StreamUpdate("text", answer))
+            emit(StreamUpdate("result", answer))
+            return
+
+        with stage("agent_invocation"):
+            await _stream_events(agent, prompt, emit)
+    finally:
+        _progress_sink.reset(token)
+
+
+async def _stream_events(
+    agent: "Agent",
+    prompt: str,
+    emit: Callable[[StreamUpdate], None],
+) -> None:
+    """Emits the StreamUpdates for one agent invocation."""
+    tool_names: dict[str, str] = {}
+    async for event in agent.stream_async(prompt):
+        if "data" in event:
+            emit(StreamUpdate("text", event["data"]))
+        elif "current_tool_use" in event:
+            tool_use = event["current_tool_use"]
+            tool_use_id = tool_use.get("toolUseId")
+            if tool_use_id and tool_use_id not in tool_names:
+                tool_names[tool_use_id] = tool_use.get("name", "tool")
+                emit(StreamUpdate("tool", f"Calling {tool_names[tool_use_id]}"))
+        elif "message" in event:
+            for content in event["message"].get("content", []):
+                tool_result = content.get("toolResult")
+                if tool_result is None:
+                    continue
+                name = tool_names.get(tool_result.get("toolUseId"), "tool")
+                status = tool_result.get("status", "success")
+                emit(StreamUpdate("tool", f"{name} returned ({status})"))
+        elif "result" in event:
+            record_agent_result(event["result"])
+            emit(StreamUpdate("result", result=event["result"]))
@@ -6,15 +6,24 @@
 # Author: Gary A. Stafford
 # Date: 2025-08-03
 
-import queue
-import threading
+# Imported first, so the startup report includes the time spent on imports; this
+# puts a first-party import ahead of the third-party ones
+# pylint: disable=wrong-import-order
+from startup import get_startup_timer, start_search_agent  # isort: skip
 
 import gradio as gr
 from gradio.themes import Base, GoogleFont
-from strands import Agent
 
+from agent_pool import APP_CONCURRENCY_LIMIT, AgentPool
+from agent_streaming import stream_agent
 from custom_logging import CustomLogging
-from search_agent import SearchAgent
+from query_router import ROUTER_ENABLED, QueryRouter
+from telemetry import start_metrics_server
+
+# pylint: enable=wrong-import-order
+
+startup_timer = get_startup_timer()
+startup_timer.lap("imports")
 
 # Agent configuration
 MODEL_ID = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
@@ -25,82 +34,106 @@ MODEL_TEMPERATURE = 0.2
 # Set up custom logging
 def setup_logging():
     custom_logging = CustomLogging()
-    logger = custom_logging.setup_logging()
-    log_queue = custom_logging.get_log_queue()
-    return logger, log_queue
-
-
-logger, log_queue = setup_logging()
-
-search_agent = SearchAgent(logger=logger)
-
-agent: Agent = search_agent.create_agent(MODEL_ID, MODEL_REGION, MODEL_TEMPERATURE)
+    app_logger = custom_logging.setup_logging()
+    app_session_logs = custom_logging.get_session_logs()
+    return app_logger, app_session_logs
+
+
+logger, session_logs = setup_logging()
+startup_timer.lap("logging")
+
+# Built as STARTUP_MODE says: by default on a background thread, while the UI starts
+search_agent = start_search_agent(logger)
+
+# One agent, and so one conversation, per browser session
+agent_pool = AgentPool(
+    lambda: search_agent.get().create_agent(
+        MODEL_ID, MODEL_REGION, MODEL_TEMPERATURE
+    ),
+    logger=logger,
+    # Answers explicit searches without calling the model, with the session's tools
+    router_factory=(
+        (lambda agent: QueryRouter(search_agent.get().agent_tools(agent), logger))
+        if ROUTER_ENABLED
+        else None
+    ),
+)
+
+# Serves /metrics when TELEMETRY_ENABLED is true and METRICS_PORT is set
+start_metrics_server()
+startup_timer.lap("agent_setup")
 
 # -------------------------------------------------
 # GRADIO FRONTEND COMPONENTS
 # -------------------------------------------------
 
 
-def submit_query(user_query, logs_so_far):
+def submit_query(user_query, session_id):
     """
-    Process the user query, interact with the agent, and update output and logs.
+    Process the user query, interact with the agent, and stream output and logs.
+    Yields the partial response, tool progress and the session's logs as they arrive.
     """
-    log_lines = logs_so_far.split("\n") if logs_so_far else []
-    # Clear logs to avoid duplicate display
-    # displayed_logs = []
-    # Start a thread to relay live logs
-    stop_event = threading.Event()
-    logs_thread = threading.Thread(target=relay_live_logs, args=(log_lines, stop_event))
-    logs_thread.start()
-
+    # The agent's records are tagged with the session by stream_agent
+    session = {"session_id": session_id}
     try:
-        logger.info("Processing started for user query.")
-        # Visual feedback handled via gradio update below (progress bar)
-        result = agent(user_query)
+        logger.info("Processing started for user query.", extra=session)
+        partial_output, status, result = "", "", None
+        with agent_pool.routed_session(session_id) as (agent, router):
+            for update in stream_agent(
+                agent,
+                user_query,
+                router=router,
+                session_id=session_id,
+            ):
+                if update.kind == "text":
+                    partial_output += update.text
+                elif update.kind == "result":
+                    result = update.result or update.text
+                elif update.kind != "log":
+                    status = f"⏳ {update.text}..."
+                live_output = "\n\n".join(filter(None, [partial_output, status]))
+                # A "log" update means the session's channel has a new line
+                yield live_output, get_session_log_text(session_id)
         if not result:
             output = "No results found. Try a different query."
         else:
             output = result
-        logger.info("Processing complete.")
-        logger.info(f"Total tokens: {result.metrics.accumulated_usage['totalTokens']}")
-        logger.info(
-            f"Execution time: {sum(result.metrics.cycle_durations):.2f} seconds"
-        )
-        logger.info(f"Tools used: {list(result.metrics.tool_metrics.keys())}")
+        logger.info("Processing complete.", extra=session)
+        if isinstance(result, str):
+            logger.info(
+                "Answered by the fast path without calling the model.", extra=session
+            )
+        elif result:
+            logger.info(
+                f"Total tokens: {result.metrics.accumulated_usage['totalTokens']}",
+                extra=session,
+            )
+            logger.info(
+                f"Execution time: {sum(result.metrics.cycle_durations):.2f} seconds",
+                extra=session,
+            )
+            logger.info(
+                f"Tools used: {list(result.metrics.tool_metrics.keys())}",
+                extra=session,
+            )
 
     except Exception as e:
         output = f"❌ Error: {str(e)}"
-        logger.error("Query processing failed: %s", str(e))
-    finally:
-        stop_event.set()
-        logs_thread.join()
+        logger.error("Query processing failed: %s", str(e), extra=session)
 
-    final_logs = "\n".join(log_lines)
-    return output, final_logs
+    yield output, get_session_log_text(session_id)
 
 
-def relay_live_logs(displayed_logs, stop_event):
-    """Stream logs from the queue into the currently displayed logs list"""
-    while not stop_event.is_set() or not log_queue.empty():
-        try:
-            msg = log_queue.get(timeout=0.1)
-            displayed_logs.append(msg)
-        except queue.Empty:
-            continue
+def get_session_log_text(session_id):
+    """Returns the session's recent logs, up to LOG_CHANNEL_SIZE lines."""
+    return "\n".join(session_logs.recent(session_id))
 
 
 def get_initial_logs():
     """Return initial startup logs."""
     logger.info("Gradio UI initialized and ready.")
-    return fetch_logs_from_queue()
-
-
-def fetch_logs_from_queue():
-    """Drains the logs from the queue for initial display."""
-    lines = []
-    while not log_queue.empty():
-        lines.append(log_queue.get())
-    return "\n".join(lines)
+    # Application logs, such as startup, aren't tagged with a session
+    return get_session_log_text(None)
 
 
 # ---- GRADIO APP LAYOUT ----
@@ -172,24 +205,29 @@ with gr.Blocks(
         elem_id="logs-box",
     )
 
-    def on_submit(q, logs):
-        return submit_query(q, logs)
+    def on_submit(q, request: gr.Request):
+        yield from submit_query(q, request.session_hash)
 
-    submit_btn.click(
-        fn=on_submit, inputs=[user_input, logs_box], outputs=[output_text, logs_box]
-    )
+    submit_btn.click(fn=on_submit, inputs=[user_input], outputs=[output_text, logs_box])
 
     user_input.submit(
-        fn=on_submit, inputs=[user_input, logs_box], outputs=[output_text, logs_box]
+        fn=on_submit, inputs=[user_input], outputs=[output_text, logs_box]
     )
 
-    def on_reset(q, logs):
-        q = "Forget our previous conversation."
-        return submit_query(q, logs)
+    def on_reset(request: gr.Request):
+        # Start over locally instead of asking the model to forget
+        agent_pool.reset(request.session_hash)
+        session_logs.close_session(request.session_hash)
+        return "Started a new conversation."
 
-    reset_btn.click(
-        fn=on_reset, inputs=[user_input, logs_box], outputs=[output_text, logs_box]
-    )
+    reset_btn.click(fn=on_reset, inputs=None, outputs=output_text)
+
+    # Free the session's agent when the browser tab is closed
+    def on_unload(request: gr.Request):
+        agent_pool.reset(request.session_hash)
+        session_logs.close_session(request.session_hash)
+
+    demo.unload(on_unload)
 
     def simple_auth(username, password):
         # check if username is demo and password is demo123
@@ -215,5 +253,11 @@ with gr.Blocks(
     logout_button.click(fn=lambda: "You have been logged out.", outputs=output_text)
 
 
-demo.queue()  # Sequential processing
-demo.launch(auth=simple_auth)  # auth=simple_auth
+startup_timer.lap("ui_layout")
+
+demo.queue(default_concurrency_limit=APP_CONCURRENCY_LIMIT)
+# Returns once the server is up, so the report covers it; then serves until exit
+demo.launch(auth=simple_auth, prevent_thread_lock=True)  # auth=simple_auth
+startup_timer.lap("ui_launch")
+logger.info(startup_timer.report("Startup timing, UI ready"))
+demo.block_thread()
@@ -6,32 +6,60 @@
 # Author: Gary A. Stafford
 # Date: 2025-08-16
 
+# Imported first, so the startup report includes the time spent on imports; this
+# puts a first-party import ahead of the third-party ones
+# pylint: disable=wrong-import-order
+from startup import get_startup_timer, start_search_agent  # isort: skip
+
 import gradio as gr
 from gradio.themes import Base, GoogleFont
 from gradio_log import Log
-from strands import Agent
 
+from agent_pool import APP_CONCURRENCY_LIMIT, AgentPool
+from agent_streaming import stream_agent
 from gradio_logger import GradioLogger
-from search_agent import SearchAgent
+from query_router import ROUTER_ENABLED, QueryRouter
+from telemetry import start_metrics_server
+
+# pylint: enable=wrong-import-order
+
+startup_timer = get_startup_timer()
+startup_timer.lap("imports")
 
 # Agent configuration
 MODEL_ID = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
 MODEL_REGION = "us-east-1"
 MODEL_TEMPERATURE = 0.2
 
-# Log file
+# Log file, emptied on startup
 log_file = "./log_file.txt"
-with open(log_file, "w") as f:
-    pass  # The 'pass' statement does nothing, but the 'w' mode clears the file
 
 
 # Set up custom logging
 gradio_logger = GradioLogger()
-logger = gradio_logger.setup_logging()
-
-search_agent = SearchAgent(logger=logger)
-
-agent: Agent = search_agent.create_agent(MODEL_ID, MODEL_REGION, MODEL_TEMPERATURE)
+logger = gradio_logger.setup_logging(truncate=True)
+startup_timer.lap("logging")
+
+# Built as STARTUP_MODE says: by default on a background thread, while the UI starts
+search_agent = start_search_agent(logger)
+
+# One agent, and so one conversation, per browser session
+agent_pool = AgentPool(
+    lambda: search_agent.get().create_agent(
+        MODEL_ID, MODEL_REGION, MODEL_TEMPERATURE
+    ),
+    logger=logger,
+    # Answers explicit searches without calling the model, with the session's tools
+    router_factory=(
+        (lambda agent: QueryRouter(search_agent.get().agent_tools(agent), logger))
+        if ROUTER_ENABLED
+        else None
+    ),
+)
+
+# Serves /metrics when TELEMETRY_ENABLED is true and METRICS_PORT is set
+start_metrics_server()
+startup_timer.lap("agent_setup")
 
 # -------------------------------------------------
 # GRADIO FRONTEND COMPONENTS
@@ -95,19 +123,42 @@ with gr.Blocks(
         def user(user_message, history: list):
             return "", history + [{"role": "user", "content": user_message}]
 
-        def bot(history: list):
-            history.append(
-                {
-                    "role": "assistant",
-                    "content": str(agent(history[-1]["content"])),
-                }
-            )
-            return history
+        def bot(history: list, request: gr.Request):
+            # Stream the response; tool progress goes into a collapsible message
+            user_message = history[-1]["content"]
+            answer = {"role": "assistant", "content": ""}
+            progress = {
+                "role": "assistant",
+                "content": "",
+                "metadata": {"title": "🔧 Searching", "status": "pending"},
+            }
+            history.append(answer)
+            with agent_pool.routed_session(request.session_hash) as (agent, router):
+                for update in stream_agent(agent, user_message, router=router):
+                    if update.kind == "text":
+                        answer["content"] += update.text
+                    elif update.kind == "result":
+                        answer["content"] = str(update.result or update.text)
+                        progress["metadata"]["status"] = "done"
+                    else:
+                        if not progress["content"]:
+                            history.insert(len(history) - 1, progress)
+                        progress["content"] += f"{update.text}\n"
+                    yield history
+
+        def on_clear(request: gr.Request):
+            # Clearing the chat also clears the agent's conversation, locally
+            agent_pool.reset(request.session_hash)
 
         msg.submit(
             fn=user, inputs=[msg, chatbot], outputs=[msg, chatbot], queue=False
         ).then(fn=bot, inputs=[chatbot], outputs=chatbot)
 
+        chatbot.clear(fn=on_clear)
+
+        # Free the session's agent when the browser tab is closed
+        demo.unload(on_clear)
+
     def simple_auth(username, password):
         # check if username is demo and password is demo123
         return username == "demo" and password == "demo123"
@@ -132,5 +183,11 @@ with gr.Blocks(
     logout_button.click(fn=lambda: "You have been logged out.", outputs=None)
 
 
-demo.queue()  # Sequential processing
-demo.launch()  # auth=simple_auth
+startup_timer.lap("ui_layout")
+
+demo.queue(default_concurrency_limit=APP_CONCURRENCY_LIMIT)
+# Returns once the server is up, so the report covers it; then serves until exit
+demo.launch(prevent_thread_lock=True)  # auth=simple_auth
+startup_timer.lap("ui_launch")
+logger.info(startup_timer.report("Startup timing, UI ready"))
+demo.block_thread()
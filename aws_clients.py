@@ -0,0 +1,61 @@
+import os
+import threading
+
+from botocore.config import Config
+from dotenv import load_dotenv
+
+from event_loop import AWS_MAX_WORKERS
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Region of the Marengo model and its embeddings bucket
+AWS_REGION_MARENGO = os.getenv("AWS_REGION_MARENGO", "us-east-1")
+
+_s3_client = None
+_bedrock_runtime_client = None
+_aws_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """Returns the process-wide S3 client, creating it on first use.
+    boto3 is imported here, as importing it and loading the service model take
+    longer than anything else the tools do before their first call.
+    Returns:
+        S3.Client: The S3 client, sized for concurrent async callers.
+    """
+    global _s3_client
+    with _aws_client_lock:
+        if _s3_client is None:
+            import boto3
+
+            _s3_client = boto3.client(
+                "s3",
+                region_name=AWS_REGION_MARENGO,
+                config=Config(max_pool_connections=AWS_MAX_WORKERS),
+            )
+        return _s3_client
+
+
+def get_bedrock_runtime_client():
+    """Returns the process-wide Bedrock runtime client, creating it on first use.
+    Returns:
+        BedrockRuntime.Client: The client, with retries and sized for concurrent
+        async callers.
+    """
+    global _bedrock_runtime_client
+    with _aws_client_lock:
+        if _bedrock_runtime_client is None:
+            import boto3
+
+            # Retry mode: 'standard', or 'adaptive' for a more sophisticated approach
+            config = Config(
+                retries={"max_attempts": 5, "mode": "standard"},
+                max_pool_connections=AWS_MAX_WORKERS,
+            )
+            _bedrock_runtime_client = boto3.client(
+                service_name="bedrock-runtime",
+                region_name=AWS_REGION_MARENGO,
+                config=config,
+            )
+        return _bedrock_runtime_client
@@ -1,20 +1,11 @@
 import logging
-import queue
+
+from log_pipeline import BatchStreamHandler, attach_log_pipeline
 
 
 class BasicLogging:
     """A class to set up basic logging configuration."""
 
-    # Main log queue for UI to consume
-    _log_queue = queue.Queue()
-
-    @staticmethod
-    def get_log_queue() -> queue.Queue:
-        """
-        Returns the main log queue for UI to consume.
-        """
-        return BasicLogging._log_queue
-
     @staticmethod
     def setup_logging() -> logging.Logger:
         """Set up logging for the application.
@@ -22,10 +13,12 @@ class BasicLogging:
         Returns:
             logging.Logger: The configured logger instance.
         """
-        logging.basicConfig(
-            level=logging.INFO,
-            format="", #"%(levelname)s | %(message)s",
-            handlers=[logging.StreamHandler()],
-        )
+        # Like logging.basicConfig, only configures a root logger without handlers
+        root = logging.getLogger()
+        if not root.handlers:
+            handler = BatchStreamHandler()
+            handler.setFormatter(logging.Formatter())  # "%(levelname)s | %(message)s"
+            attach_log_pipeline(root, [handler])
+            root.setLevel(logging.INFO)
         logger = logging.getLogger(__name__)
         return logger
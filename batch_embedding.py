@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Callable, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+from embedding_cache import EmbeddingCache
+from polling import PollingStrategy
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Batch configuration
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+# Above this many pending jobs, one ListAsyncInvokes sweep replaces per-job status calls
+BATCH_LIST_THRESHOLD = int(os.getenv("BATCH_LIST_THRESHOLD", "20"))
+
+
+class EmbeddingResult(NamedTuple):
+    """The outcome of embedding one text in a batch."""
+
+    text: str
+    embedding: Optional[list[float]]
+    error: Optional[BaseException] = None
+
+
+class _PendingJob(NamedTuple):
+    texts: list[str]
+    submitted: float
+
+
+class BatchEmbedder:
+    """Embeds many texts with Marengo async invocations tracked by a single poller.
+    Jobs are submitted with bounded concurrency. One poller task checks all pending
+    jobs per tick, with one round of GetAsyncInvoke calls for small batches or a
+    ListAsyncInvokes sweep for large ones. Outputs are downloaded from S3 in parallel
+    and each embedding is emitted as soon as it is available.
+    """
+
+    def __init__(
+        self,
+        tools,
+        model_id: str,
+        embedding_cache: EmbeddingCache,
+        polling_strategy: PollingStrategy,
+        logger: logging.Logger,
+        max_concurrency: int = BATCH_MAX_CONCURRENCY,
+        list_threshold: int = BATCH_LIST_THRESHOLD,
+    ):
+        self.tools = tools
+        self.model_id = model_id
+        self.embedding_cache = embedding_cache
+        self.polling_strategy = polling_strategy
+        self.logger = logger
+        self.max_concurrency = max(1, max_concurrency)
+        self.list_threshold = list_threshold
+
+        self._slots: asyncio.Semaphore
+        self._pending: dict[str, _PendingJob] = {}
+        self._downloads: set[asyncio.Task] = set()
+        self._work_available: asyncio.Event
+
+    async def run(
+        self, texts: list[str], emit: Callable[[EmbeddingResult], None]
+    ) -> None:
+        """Embeds every text and calls emit once per input text, in completion order.
+        Args:
+            texts (list[str]): The texts to embed.
+            emit (Callable[[EmbeddingResult], None]): Receives each result.
+        """
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._work_available = asyncio.Event()
+        started = datetime.now(timezone.utc)
+
+        # Serve cache hits immediately and submit each distinct text only once
+        to_submit: dict[str, list[str]] = {}
+        for text in texts:
+            embedding = self.embedding_cache.get(text, self.model_id)
+            if embedding is not None:
+                emit(EmbeddingResult(text, embedding))
+                continue
+            key = EmbeddingCache.make_key(text, self.model_id)
+            to_submit.setdefault(key, []).append(text)
+
+        self.logger.info(
+            f"Batch embedding {len(to_submit)} distinct texts "
+            f"({len(texts) - sum(len(v) for v in to_submit.values())} cache hits)"
+        )
+        if not to_submit:
+            return
+
+        submitter = asyncio.create_task(self._submit_all(to_submit.values(), emit))
+        try:
+            await self._poll(submitter, started, emit)
+        finally:
+            submitter.cancel()
+            for task in list(self._downloads):
+                task.cancel()
+
+    async def _submit_all(self, groups, emit: Callable[[EmbeddingResult], None]) -> None:
+        """Submits one job per group of identical texts, bounded by the semaphore."""
+        for group in groups:
+            await self._slots.acquire()
+            try:
+                response = await asyncio.to_thread(
+                    self.tools.embedding_jobs.generate_text_embedding_bedrock, group[0]
+                )
+            except Exception as err:
+                self._slots.release()
+                for text in group:
+                    emit(EmbeddingResult(text, None, err))
+                continue
+            self._pending[response["invocationArn"]] = _PendingJob(
+                group, time.monotonic()
+            )
+            self._work_available.set()
+
+    async def _poll(
+        self,
+        submitter: asyncio.Task,
+        started: datetime,
+        emit: Callable[[EmbeddingResult], None],
+    ) -> None:
+        """Runs the shared poller until every submitted job has been resolved."""
+        interval = self.polling_strategy.initial_delay
+        while not submitter.done() or self._pending or self._downloads:
+            if not self._pending:
+                # Nothing to poll yet; wait for a submission or a finished download
+                self._work_available.clear()
+                waiters = [asyncio.create_task(self._work_available.wait())]
+                waiters += [submitter] if not submitter.done() else []
+                waiters += list(self._downloads)
+                await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                waiters[0].cancel()
+                continue
+
+            await asyncio.sleep(interval)
+            statuses = await self._fetch_statuses(started)
+
+            progressed = False
+            for arn, (status, message) in statuses.items():
+                job = self._pending.get(arn)
+                if job is None or status == "InProgress":
+                    continue
+                progressed = True
+                del self._pending[arn]
+                if status == "Completed":
+                    self.polling_strategy.record_completion(
+                        time.monotonic() - job.submitted
+                    )
+                    task = asyncio.create_task(self._download(arn, job, emit))
+                    self._downloads.add(task)
+                    task.add_done_callback(self._downloads.discard)
+                else:
+                    self._slots.release()
+                    error = RuntimeError(f"Embedding job failed: {message}")
+                    for text in job.texts:
+                        emit(EmbeddingResult(text, None, error))
+
+            self._expire_stale_jobs(emit)
+            if progressed:
+                interval = self.polling_strategy.initial_delay
+            else:
+                interval = min(
+                    interval * self.polling_strategy.multiplier,
+                    self.polling_strategy.max_interval,
+                )
+
+        if submitter.done() and submitter.exception():
+            raise submitter.exception()
+
+    async def _fetch_statuses(self, started: datetime) -> dict[str, tuple[str, str]]:
+        """Fetches the status of all pending jobs in one round.
+        Returns:
+            dict[str, tuple[str, str]]: Status and failure message by invocation ARN.
+        """
+        client = self.tools.bedrock_runtime_client
+        arns = list(self._pending)
+
+        if len(arns) > self.list_threshold:
+            statuses: dict[str, tuple[str, str]] = {}
+            try:
+                for status in ("Completed", "Failed"):
+                    next_token = None
+                    while True:
+                        kwargs = {
+                            "statusEquals": status,
+                            "submitTimeAfter": started,
+                            "maxResults": 1000,
+                        }
+                        if next_token:
+                            kwargs["nextToken"] = next_token
+                        response = await asyncio.to_thread(
+                            client.list_async_invokes, **kwargs
+                        )
+                        for summary in response.get("asyncInvokeSummaries", []):
+                            statuses[summary["invocationArn"]] = (
+                                summary["status"],
+                                summary.get("failureMessage", ""),
+                            )
+                        next_token = response.get("nextToken")
+                        if not next_token:
+                            break
+            except Exception as err:
+                # Like a failed get_async_invoke: the jobs stay pending, and the
+                # poller backs off and retries until their deadline
+                self.logger.warning(f"Failed to list embedding job statuses: {err}")
+            return statuses
+
+        responses = await asyncio.gather(
+            *[
+                asyncio.to_thread(client.get_async_invoke, invocationArn=arn)
+                for arn in arns
+            ],
+            return_exceptions=True,
+        )
+        statuses = {}
+        for arn, response in zip(arns, responses):
+            if isinstance(response, Exception):
+                self.logger.warning(f"Failed to get status of {arn}: {response}")
+                continue
+            statuses[arn] = (response["status"], response.get("failureMessage", ""))
+        return statuses
+
+    async def _download(
+        self, arn: str, job: _PendingJob, emit: Callable[[EmbeddingResult], None]
+    ) -> None:
+        """Downloads a completed job's output, caches it and emits it."""
+        try:
+            output = await asyncio.to_thread(
+                self.tools.embedding_jobs.download_search_embedding_from_s3,
+                self.tools.embedding_jobs.output_s3_key(arn),
+            )
+            embedding = output["data"][0]["embedding"]
+        except Exception as err:
+            for text in job.texts:
+                emit(EmbeddingResult(text, None, err))
+        else:
+            self.embedding_cache.put(job.texts[0], self.model_id, embedding)
+            for text in job.texts:
+                emit(EmbeddingResult(text, embedding))
+        finally:
+            self._slots.release()
+            self._work_available.set()
+
+    def _expire_stale_jobs(self, emit: Callable[[EmbeddingResult], None]) -> None:
+        """Gives up on jobs that exceeded the polling deadline."""
+        now = time.monotonic()
+        for arn, job in list(self._pending.items()):
+            if now - job.submitted > self.polling_strategy.deadline:
+                del self._pending[arn]
+                self._slots.release()
+                error = TimeoutError(f"Job {arn.split('/')[-1]} did not finish in time")
+                for text in job.texts:
+                    emit(EmbeddingResult(text, None, error))
@@ -0,0 +1,102 @@
+# Compares two benchmark reports written by benchmarks.run
+# Run from the repository root: python -m benchmarks.compare old.json new.json
+# Exits with status 1 when a stage's p95 latency regressed by more than --threshold.
+
+import argparse
+import json
+import sys
+from typing import Optional
+
+COMPARED_METRICS = ["throughput_per_s", "p50_ms", "p95_ms", "p99_ms"]
+
+
+def percent_change(old: float, new: float) -> Optional[float]:
+    """Returns the relative change from old to new, in percent."""
+    if not old:
+        return None
+    return round((new - old) / old * 100, 2)
+
+
+def compare_reports(old: dict, new: dict) -> dict:
+    """Compares the stages of two reports.
+    Args:
+        old (dict): The baseline report.
+        new (dict): The report to compare against the baseline.
+    Returns:
+        dict: Per stage and metric, the old and new values and the change in percent.
+    """
+    stages = {}
+    for name in sorted(set(old["stages"]) | set(new["stages"])):
+        old_stage = old["stages"].get(name, {})
+        new_stage = new["stages"].get(name, {})
+        stages[name] = {
+            metric: {
+                "old": old_stage.get(metric),
+                "new": new_stage.get(metric),
+                "change_pct": (
+                    percent_change(old_stage[metric], new_stage[metric])
+                    if metric in old_stage and metric in new_stage
+                    else None
+                ),
+            }
+            for metric in COMPARED_METRICS
+        }
+    return {
+        "old_commit": old.get("git_commit"),
+        "new_commit": new.get("git_commit"),
+        "config_changed": old.get("config") != new.get("config"),
+        "stages": stages,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compares two benchmark reports.")
+    parser.add_argument("old", help="The baseline report")
+    parser.add_argument("new", help="The report to compare")
+    parser.add_argument("--json", action="store_true", help="Print the diff as JSON")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="Fail when a stage's p95 latency grew by more than this percentage",
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    comparison = compare_reports(old, new)
+
+    if args.json:
+        print(json.dumps(comparison, indent=2, sort_keys=True))
+    else:
+        print(f"{comparison['old_commit']} -> {comparison['new_commit']}")
+        if comparison["config_changed"]:
+            print("Warning: the reports were run with different configurations")
+        header = "".join(f"{metric:>24}" for metric in COMPARED_METRICS)
+        print(f"{'stage':<32}{header}")
+        for name, metrics in comparison["stages"].items():
+            cells = []
+            for values in metrics.values():
+                if values["change_pct"] is None:
+                    cells.append(f"{'n/a':>24}")
+                else:
+                    cell = f"{values['new']:.2f} ({values['change_pct']:+.1f}%)"
+                    cells.append(f"{cell:>24}")
+            print(f"{name:<32}" + "".join(cells))
+
+    if args.threshold is not None:
+        regressions = [
+            name
+            for name, metrics in comparison["stages"].items()
+            if (metrics["p95_ms"]["change_pct"] or 0) > args.threshold
+        ]
+        if regressions:
+            print(f"p95 regressions above {args.threshold}%: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
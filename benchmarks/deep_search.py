@@ -0,0 +1,124 @@
+# Measures deep result retrieval: one search for every result, then formatting, vs
+# VideoSearch.deep_search, which pages with a point-in-time and search_after and
+# formats each page as it is consumed.
+# The fake cluster builds each hit on request, so the peak memory measured is the
+# client's. Run from the repository root: python -m benchmarks.deep_search
+
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+
+from benchmarks.formatting import raw_response
+from custom_tools import CustomTools
+from embedding_cache import EmbeddingCache
+from result_cache import SearchResultCache
+from search_queries import build_deep_search
+
+RESULT_COUNTS = [500, 2_000, 5_000]
+
+
+class PagingOpenSearch:
+    """A fake cluster with a fixed ranking of segment search hits, with PIT support.
+    Hit i is built on request, as OpenSearch would read it, and sorts by [-i].
+    """
+
+    def __init__(self, segments_per_video: int):
+        self.segments_per_video = segments_per_video
+
+    def hit(self, number: int) -> dict:
+        hit = raw_response(1, self.segments_per_video, seed=number)["hits"]["hits"][0]
+        hit["_id"] = f"video-{number:06d}"
+        hit["_source"]["videoName"] = f"commercial-{number:06d}.mp4"
+        hit["sort"] = [-number]
+        return hit
+
+    def create_pit(self, index, params=None) -> dict:
+        return {"pit_id": "benchmark"}
+
+    def delete_pit(self, body=None) -> dict:
+        return {"pits": [{"successful": True}]}
+
+    def search(self, body: dict, index=None, **kwargs) -> dict:
+        start = -body["search_after"][0] + 1 if "search_after" in body else 0
+        hits = [self.hit(number) for number in range(start, start + body["size"])]
+        return {"took": 1, "pit_id": "benchmark", "hits": {"hits": hits}}
+
+
+def consume(results: list[dict]) -> int:
+    """Writes results as NDJSON lines, as the /search/deep endpoint does."""
+    return sum(len(json.dumps(result)) for result in results)
+
+
+def one_shot(client, search_type: str, count: int) -> int:
+    """A single search for every result, formatted at once."""
+    query, _, format_page = build_deep_search(search_type, [0.0], count)
+    response = client.search(dict(query, size=count))
+    page = format_page(response)
+    return consume(page["results" if "results" in page else "videos"])
+
+
+def paged(
+    tools: CustomTools, client, search_type: str, count: int, page_size: int
+) -> int:
+    written = 0
+    pages = tools.video_search.deep_search(
+        client, search_type, [0.0], count, page_size
+    )
+    for page in pages:
+        written += consume(page["results" if "results" in page else "videos"])
+    return written
+
+
+def measure(function, *args) -> dict:
+    """Returns the wall time and the peak traced memory of one call."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    function(*args)
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(seconds, 3), "peak_mb": round(peak / 2**20, 1)}
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(
+        description="Compares one-shot and paged retrieval of many search results."
+    )
+    parser.add_argument("--results", type=int, nargs="+", default=RESULT_COUNTS)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--segments-per-video", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    tools = CustomTools(
+        logger=logging.getLogger(__name__),
+        embedding_cache=EmbeddingCache(cache_dir=None),
+        result_cache=SearchResultCache(max_entries=0),
+    )
+    client = PagingOpenSearch(args.segments_per_video)
+    report = {}
+    print(
+        f"{'search':<10}{'results':>9}{'one-shot s':>12}{'one-shot MB':>13}"
+        f"{'paged s':>9}{'paged MB':>10}"
+    )
+    for search_type in ("videos", "segments"):
+        for count in args.results:
+            row = {
+                "one_shot": measure(one_shot, client, search_type, count),
+                "paged": measure(
+                    paged, tools, client, search_type, count, args.page_size
+                ),
+            }
+            report[f"{search_type}_{count}"] = row
+            one, many = row["one_shot"], row["paged"]
+            print(
+                f"{search_type:<10}{count:>9}"
+                f"{one['seconds']:>12.3f}{one['peak_mb']:>13.1f}"
+                f"{many['seconds']:>9.3f}{many['peak_mb']:>10.1f}"
+            )
+    return report
+
+
+if __name__ == "__main__":
+    main()
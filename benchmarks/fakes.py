@@ -0,0 +1,329 @@
+import asyncio
+import hashlib
+import io
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+from botocore.exceptions import ClientError
+
+from local_search import LocalIndexWriter, LocalVectorIndex
+
+EMBEDDING_DIMENSIONS = 1_024
+EMBEDDING_OPTIONS = ["visual-text", "visual-image", "audio"]
+KEYWORDS = [
+    "car", "truck", "beach", "city", "family", "dog", "food", "music", "sports",
+    "soccer", "running", "phone", "bank", "travel", "snow", "night", "kitchen",
+    "coffee", "fashion", "holiday", "insurance", "pharmacy", "game", "shoes",
+]  # fmt: skip
+
+
+class LatencyModel:
+    """A distribution of simulated latencies, in seconds.
+    Specs are "constant:SECONDS", "uniform:LOW:HIGH", or "lognormal:MEDIAN:SIGMA".
+    Every sample is multiplied by scale, so long Bedrock jobs can be compressed.
+    """
+
+    def __init__(self, spec: str, scale: float = 1.0, seed: Optional[int] = None):
+        kind, *params = spec.split(":")
+        if kind not in ("constant", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(param) for param in params]
+        self.scale = scale
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        """Returns one latency, in seconds."""
+        with self._lock:
+            if self.kind == "constant":
+                seconds = self.params[0]
+            elif self.kind == "uniform":
+                seconds = self._random.uniform(*self.params)
+            else:
+                median, sigma = self.params
+                seconds = self._random.lognormvariate(math.log(median), sigma)
+        return seconds * self.scale
+
+
+class CallCounter:
+    """Counts calls to each fake API, for the report."""
+
+    def __init__(self):
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(sorted(self._counts.items()))
+
+
+def fake_text_embedding(text: str) -> list[float]:
+    """Returns a deterministic unit-length embedding for a text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIMENSIONS)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def client_error(code: str, operation: str) -> ClientError:
+    """Builds the ClientError boto3 raises for an error code."""
+    return ClientError({"Error": {"Code": code, "Message": code}}, operation)
+
+
+class FakeS3:
+    """Stands in for the S3 client that reads the output.json of embedding jobs.
+    Objects become visible when their job completes.
+    """
+
+    def __init__(self, latency: LatencyModel, calls: CallCounter):
+        self.latency = latency
+        self.calls = calls
+        self._objects: dict[str, tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def put_job_output(self, key: str, available_at: float, text: str) -> None:
+        """Registers the output.json a job writes when it completes."""
+        output = {
+            "data": [
+                {
+                    "embedding": fake_text_embedding(text),
+                    "embeddingOption": "visual-text",
+                    "startSec": 0.0,
+                    "endSec": 0.0,
+                }
+            ]
+        }
+        with self._lock:
+            self._objects[key] = (available_at, json.dumps(output).encode("utf-8"))
+
+    def _visible(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._objects.get(key)
+        if entry is None or entry[0] > time.monotonic():
+            return None
+        return entry[1]
+
+    def get_object(self, Bucket: str, Key: str) -> dict:
+        self.calls.add("s3.get_object")
+        time.sleep(self.latency.sample())
+        body = self._visible(Key)
+        if body is None:
+            raise client_error("NoSuchKey", "GetObject")
+        return {"Body": io.BytesIO(body), "ContentLength": len(body)}
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        self.calls.add("s3.head_object")
+        time.sleep(self.latency.sample())
+        body = self._visible(Key)
+        if body is None:
+            raise client_error("404", "HeadObject")
+        return {"ContentLength": len(body)}
+
+
+class FakeBedrockRuntime:
+    """Stands in for the bedrock-runtime async-invoke and InvokeModel APIs.
+    Each job completes after a latency drawn from job_latency, and a failure_rate
+    fraction of jobs fail. Completed jobs write their output.json to the fake S3.
+    InvokeModel returns the same embedding inline after invoke_latency.
+    """
+
+    def __init__(
+        self,
+        s3: FakeS3,
+        job_latency: LatencyModel,
+        call_latency: LatencyModel,
+        calls: CallCounter,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+        invoke_latency: Optional[LatencyModel] = None,
+    ):
+        self.s3 = s3
+        self.job_latency = job_latency
+        self.call_latency = call_latency
+        self.invoke_latency = invoke_latency or call_latency
+        self.calls = calls
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._jobs: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def start_async_invoke(
+        self, modelId: str, modelInput: dict, outputDataConfig: dict
+    ) -> dict:
+        self.calls.add("bedrock.start_async_invoke")
+        time.sleep(self.call_latency.sample())
+        job_id = uuid.uuid4().hex[:12]
+        arn = f"arn:aws:bedrock:us-east-1:000000000000:async-invoke/{job_id}"
+        completes_at = time.monotonic() + self.job_latency.sample()
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+            self._jobs[arn] = {
+                "invocationArn": arn,
+                "modelArn": modelId,
+                "completes_at": completes_at,
+                "failed": failed,
+                "submitTime": datetime.now(timezone.utc),
+            }
+        if not failed:
+            s3_uri = outputDataConfig["s3OutputDataConfig"]["s3Uri"]
+            prefix = s3_uri.removeprefix("s3://").split("/", 1)[1].rstrip("/")
+            key = f"{prefix}/{job_id}/output.json"
+            self.s3.put_job_output(key, completes_at, modelInput["inputText"])
+        return {"invocationArn": arn}
+
+    def invoke_model(
+        self, modelId: str, body: str, contentType: str, accept: str
+    ) -> dict:
+        self.calls.add("bedrock.invoke_model")
+        time.sleep(self.invoke_latency.sample())
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+        if failed:
+            raise client_error("ModelErrorException", "InvokeModel")
+        text = json.loads(body)["inputText"]
+        output = {"data": [{"embedding": fake_text_embedding(text)}]}
+        return {"body": io.BytesIO(json.dumps(output).encode("utf-8"))}
+
+    def _summary(self, job: dict) -> dict:
+        summary = {
+            "invocationArn": job["invocationArn"],
+            "modelArn": job["modelArn"],
+            "submitTime": job["submitTime"],
+            "status": "InProgress",
+        }
+        if job["completes_at"] <= time.monotonic():
+            summary["status"] = "Failed" if job["failed"] else "Completed"
+            if job["failed"]:
+                summary["failureMessage"] = "Simulated failure"
+        return summary
+
+    def get_async_invoke(self, invocationArn: str) -> dict:
+        self.calls.add("bedrock.get_async_invoke")
+        time.sleep(self.call_latency.sample())
+        with self._lock:
+            job = self._jobs.get(invocationArn)
+        if job is None:
+            raise client_error("ResourceNotFoundException", "GetAsyncInvoke")
+        return self._summary(job)
+
+    def list_async_invokes(
+        self,
+        statusEquals: Optional[str] = None,
+        submitTimeAfter: Optional[datetime] = None,
+        maxResults: int = 1000,
+        nextToken: Optional[str] = None,
+    ) -> dict:
+        self.calls.add("bedrock.list_async_invokes")
+        time.sleep(self.call_latency.sample())
+        with self._lock:
+            jobs = list(self._jobs.values())
+        summaries = [self._summary(job) for job in jobs]
+        summaries = [
+            summary
+            for summary in summaries
+            if (statusEquals is None or summary["status"] == statusEquals)
+            and (submitTimeAfter is None or summary["submitTime"] >= submitTimeAfter)
+        ]
+        start = int(nextToken or 0)
+        response = {"asyncInvokeSummaries": summaries[start : start + maxResults]}
+        if start + maxResults < len(summaries):
+            response["nextToken"] = str(start + maxResults)
+        return response
+
+
+class FakeOpenSearch:
+    """Stands in for the OpenSearch client over a synthetic catalog.
+    Queries are answered by a LocalVectorIndex, after a simulated network latency.
+    """
+
+    def __init__(
+        self, index: LocalVectorIndex, latency: LatencyModel, calls: CallCounter
+    ):
+        self.index = index
+        self.latency = latency
+        self.calls = calls
+
+    def search(self, body: dict, index: Optional[str] = None, **kwargs) -> dict:
+        self.calls.add("opensearch.search")
+        time.sleep(self.latency.sample())
+        return self.index.search(body, index=index, **kwargs)
+
+    def msearch(self, body: list, index: Optional[str] = None, **kwargs) -> dict:
+        self.calls.add("opensearch.msearch")
+        time.sleep(self.latency.sample())
+        return self.index.msearch(body, index=index, **kwargs)
+
+
+class FakeAsyncOpenSearch:
+    """Async variant of FakeOpenSearch, for the async search paths."""
+
+    def __init__(
+        self, index: LocalVectorIndex, latency: LatencyModel, calls: CallCounter
+    ):
+        self.index = index
+        self.latency = latency
+        self.calls = calls
+
+    async def search(self, body: dict, index: Optional[str] = None, **kwargs) -> dict:
+        self.calls.add("opensearch.search")
+        await asyncio.sleep(self.latency.sample())
+        return await asyncio.to_thread(self.index.search, body, index=index, **kwargs)
+
+    async def msearch(self, body: list, index: Optional[str] = None, **kwargs) -> dict:
+        self.calls.add("opensearch.msearch")
+        await asyncio.sleep(self.latency.sample())
+        return await asyncio.to_thread(self.index.msearch, body, index=index, **kwargs)
+
+
+def build_catalog(
+    directory: str,
+    videos: int,
+    segments_per_video: int,
+    seed: int = 0,
+    dtype: str = "float32",
+) -> LocalVectorIndex:
+    """Writes a synthetic catalog of videos with 1024-d segment embeddings.
+    Args:
+        directory (str): The directory to write the index files to.
+        videos (int): The number of videos.
+        segments_per_video (int): The average number of segments per video.
+        seed (int): The random seed, so catalogs are identical between runs.
+        dtype (str): The on-disk embedding type, float32 or float16.
+    Returns:
+        LocalVectorIndex: The index over the catalog.
+    """
+    rng = np.random.default_rng(seed)
+    with LocalIndexWriter(directory, dtype) as writer:
+        for number in range(videos):
+            segments = int(rng.integers(1, 2 * segments_per_video))
+            duration = float(segments * 6)
+            metadata = {
+                "_id": f"video-{number:06d}",
+                "videoName": f"commercial-{number:06d}.mp4",
+                "title": f"Synthetic commercial {number}",
+                "summary": f"A synthetic {duration:.0f} second commercial.",
+                "keywords": rng.choice(KEYWORDS, 4, replace=False).tolist(),
+                "durationSec": duration,
+                "s3URI": f"s3://synthetic/commercial-{number:06d}.mp4",
+                "keyframeURL": f"https://synthetic/commercial-{number:06d}.jpg",
+            }
+            writer.add_video(
+                metadata,
+                [float(segment * 6) for segment in range(segments)],
+                [float(segment * 6 + 6) for segment in range(segments)],
+                [EMBEDDING_OPTIONS[segment % 3] for segment in range(segments)],
+                rng.standard_normal((segments, EMBEDDING_DIMENSIONS), np.float32),
+            )
+    return LocalVectorIndex(directory)
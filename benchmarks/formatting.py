@@ -0,0 +1,234 @@
+# Micro-benchmarks for formatting OpenSearch responses into search results
+# Compares the per-hit pydantic construction that format_search_results* used to do,
+# model_construct, and the validation-free dicts used now, at realistic hit counts,
+# then the flat segment results with the ones grouped by video.
+# Run from the repository root: python -m benchmarks.formatting
+
+import argparse
+import json
+import random
+import timeit
+
+from benchmarks.fakes import EMBEDDING_OPTIONS, KEYWORDS
+from data import (
+    VideoSearchResult,
+    VideoSearchResults,
+    VideoSegmentSearchResult,
+    VideoSegmentSearchResults,
+    flatten_segment_groups,
+    segment_group_dict,
+    segment_result_dicts,
+    video_result_dict,
+)
+from tool_output import estimate_tokens
+
+# (videos, segments per video): the default tool size, a page, and a large request
+HIT_COUNTS = [(6, 25), (25, 25), (100, 25)]
+
+
+def raw_response(videos: int, segments: int, seed: int = 0) -> dict:
+    """Builds a segment search response, with inner hits, as OpenSearch returns it.
+    Durations, offsets and times are integers where OpenSearch may return them so.
+    """
+    rng = random.Random(seed)
+    hits = []
+    for number in range(videos):
+        inner_hits = [
+            {
+                "_nested": {"field": "embeddings", "offset": offset},
+                "_score": rng.random(),
+                "fields": {
+                    "embeddings.startSec": [offset * 6],
+                    "embeddings.endSec": [offset * 6 + 6.0],
+                    "embeddings.embeddingOption": [EMBEDDING_OPTIONS[offset % 3]],
+                },
+            }
+            for offset in range(segments)
+        ]
+        hits.append(
+            {
+                "_id": f"video-{number:06d}",
+                "_score": rng.random(),
+                "_source": {
+                    "videoName": f"commercial-{number:06d}.mp4",
+                    "title": f"Synthetic commercial {number}",
+                    "summary": "A synthetic commercial. " * 20,
+                    "keywords": rng.sample(KEYWORDS, 6),
+                    "durationSec": segments * 6,
+                    "s3URI": f"s3://synthetic/commercial-{number:06d}.mp4",
+                    "keyframeURL": f"https://synthetic/commercial-{number:06d}.jpg",
+                },
+                "inner_hits": {"embeddings": {"hits": {"hits": inner_hits}}},
+            }
+        )
+    return {"took": 5, "hits": {"hits": hits}}
+
+
+def _video_kwargs(hit: dict) -> dict:
+    source = hit["_source"]
+    return {
+        "videoName": source["videoName"],
+        "title": source["title"],
+        "summary": source["summary"],
+        "keywords": source["keywords"],
+        "durationSec": source["durationSec"],
+        "s3URI": source["s3URI"],
+        "keyframeURL": source["keyframeURL"],
+        "score": hit["_score"],
+    }
+
+
+def _segment_kwargs(hit: dict) -> list[dict]:
+    video = _video_kwargs(hit)
+    segments = []
+    for segment in hit["inner_hits"]["embeddings"]["hits"]["hits"]:
+        fields = segment["fields"]
+        segments.append(
+            dict(
+                video,
+                segmentId=segment["_nested"]["offset"],
+                startSec=fields["embeddings.startSec"][0],
+                endSec=fields["embeddings.endSec"][0],
+                embeddingOption=fields["embeddings.embeddingOption"][0],
+                segmentScore=segment["_score"],
+            )
+        )
+    return segments
+
+
+def videos_validated(response: dict) -> dict:
+    """The previous implementation: a validated model per hit, then model_dump."""
+    results = VideoSearchResults(results=[])
+    for hit in response["hits"]["hits"]:
+        results.results.append(VideoSearchResult(**_video_kwargs(hit)))
+    return results.to_dict()
+
+
+def videos_constructed(response: dict) -> dict:
+    """model_construct skips validation, but not model_dump, and not coercion."""
+    results = [
+        VideoSearchResult.model_construct(**_video_kwargs(hit))
+        for hit in response["hits"]["hits"]
+    ]
+    return VideoSearchResults.model_construct(results=results).to_dict()
+
+
+def videos_direct(response: dict) -> dict:
+    """The current implementation."""
+    return {"results": [video_result_dict(hit) for hit in response["hits"]["hits"]]}
+
+
+def segments_validated(response: dict) -> dict:
+    results = VideoSegmentSearchResults(results=[])
+    for hit in response["hits"]["hits"]:
+        for kwargs in _segment_kwargs(hit):
+            results.results.append(VideoSegmentSearchResult(**kwargs))
+    return results.to_dict()
+
+
+def segments_constructed(response: dict) -> dict:
+    results = [
+        VideoSegmentSearchResult.model_construct(**kwargs)
+        for hit in response["hits"]["hits"]
+        for kwargs in _segment_kwargs(hit)
+    ]
+    return VideoSegmentSearchResults.model_construct(results=results).to_dict()
+
+
+def segments_direct(response: dict) -> dict:
+    results = []
+    for hit in response["hits"]["hits"]:
+        results.extend(segment_result_dicts(hit))
+    return {"results": results}
+
+
+def segments_grouped(response: dict) -> dict:
+    """Each video once, with its segments, as SEGMENT_RESULTS_FORMAT=grouped."""
+    return {"videos": [segment_group_dict(hit) for hit in response["hits"]["hits"]]}
+
+
+IMPLEMENTATIONS = {
+    "videos": (videos_validated, videos_constructed, videos_direct),
+    "segments": (segments_validated, segments_constructed, segments_direct),
+}
+
+
+def same_output(first: dict, second: dict) -> bool:
+    """Whether two results are equal, including float vs int and key order."""
+    return json.dumps(first) == json.dumps(second)
+
+
+def compare_grouped(response: dict, repeat: int) -> dict:
+    """Times the grouped segment results and compares their size to the flat ones."""
+    flat, grouped = segments_direct(response), segments_grouped(response)
+    if not same_output(flatten_segment_groups(grouped["videos"]), flat["results"]):
+        raise AssertionError("Flattened grouped segments differ from the flat ones")
+    return {
+        "grouped_us": round(time_per_call(segments_grouped, response, repeat), 2),
+        "flat_tokens": estimate_tokens(flat),
+        "grouped_tokens": estimate_tokens(grouped),
+    }
+
+
+def time_per_call(function, response: dict, repeat: int) -> float:
+    """Returns the best time of one call, in microseconds."""
+    number = max(1, 2_000 // len(response["hits"]["hits"]))
+    timer = timeit.Timer(lambda: function(response))
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmarks for formatting search results."
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    report = {}
+    print(
+        f"{'results':<10}{'videos':>8}{'segments':>10}"
+        f"{'validated us':>15}{'construct us':>15}{'direct us':>12}{'speedup':>9}"
+    )
+    for kind, (validated, constructed, direct) in IMPLEMENTATIONS.items():
+        for videos, segments in HIT_COUNTS:
+            response = raw_response(videos, segments)
+            # model_construct keeps ints where the models coerce to float
+            if not same_output(validated(response), direct(response)):
+                raise AssertionError(f"{kind} output differs at {videos} videos")
+            timings = {
+                name: round(time_per_call(function, response, args.repeat), 2)
+                for name, function in (
+                    ("validated_us", validated),
+                    ("constructed_us", constructed),
+                    ("direct_us", direct),
+                )
+            }
+            timings["constructed_matches"] = same_output(
+                validated(response), constructed(response)
+            )
+            report[f"{kind}_{videos}x{segments}"] = timings
+            if kind == "segments":
+                timings.update(compare_grouped(response, args.repeat))
+            speedup = timings["validated_us"] / timings["direct_us"]
+            print(
+                f"{kind:<10}{videos:>8}{segments if kind == 'segments' else '-':>10}"
+                f"{timings['validated_us']:>15.1f}{timings['constructed_us']:>15.1f}"
+                f"{timings['direct_us']:>12.1f}{speedup:>8.1f}x"
+            )
+
+    print(
+        f"\n{'grouped':<10}{'videos':>8}{'segments':>10}"
+        f"{'flat us':>10}{'grouped us':>12}{'flat tokens':>13}{'grouped tokens':>16}"
+    )
+    for videos, segments in HIT_COUNTS:
+        timings = report[f"segments_{videos}x{segments}"]
+        print(
+            f"{'segments':<10}{videos:>8}{segments:>10}"
+            f"{timings['direct_us']:>10.1f}{timings['grouped_us']:>12.1f}"
+            f"{timings['flat_tokens']:>13}{timings['grouped_tokens']:>16}"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    main()
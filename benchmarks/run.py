@@ -0,0 +1,379 @@
+# Offline end-to-end benchmarks for CustomTools
+# Swaps in local stand-ins for Bedrock async invoke, S3 and OpenSearch, then measures
+# the latency percentiles and throughput of each search stage.
+# Run from the repository root: python -m benchmarks.run --output report.json
+# Compare two reports with: python -m benchmarks.compare old.json new.json
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+import numpy as np
+
+from benchmarks.fakes import (
+    KEYWORDS,
+    CallCounter,
+    FakeAsyncOpenSearch,
+    FakeBedrockRuntime,
+    FakeOpenSearch,
+    FakeS3,
+    LatencyModel,
+    build_catalog,
+)
+from custom_tools import OPENSEARCH_INDEX_NAME, CustomTools
+from embedding_backends import InvokeModelBackend, create_embedding_backend
+from embedding_cache import EmbeddingCache
+from event_loop import get_background_loop
+from local_search import LocalVectorIndex
+from polling import POLL_INITIAL_DELAY, POLL_MAX_INTERVAL, PollingStrategy
+from result_cache import SearchResultCache
+from search_formatting import (
+    format_search_results,
+    format_search_results_segments,
+    format_search_results_segments_grouped,
+)
+
+REPORT_SCHEMA_VERSION = 1
+
+
+def summarize(latencies: list[float], wall_seconds: float, errors: int) -> dict:
+    """Summarizes one stage's latencies, in milliseconds.
+    Args:
+        latencies (list[float]): The latency of each successful operation, in seconds.
+        wall_seconds (float): The wall-clock time of the whole stage.
+        errors (int): The number of failed operations.
+    Returns:
+        dict: Count, throughput and latency percentiles.
+    """
+    if not latencies:
+        return {"count": 0, "errors": errors}
+    milliseconds = np.asarray(latencies) * 1_000
+    p50, p95, p99 = np.percentile(milliseconds, [50, 95, 99])
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "throughput_per_s": round(len(latencies) / wall_seconds, 3),
+        "mean_ms": round(float(milliseconds.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "min_ms": round(float(milliseconds.min()), 4),
+        "max_ms": round(float(milliseconds.max()), 4),
+    }
+
+
+async def measure_async(
+    operation: Callable[[int], Awaitable], count: int, concurrency: int
+) -> dict:
+    """Runs an async operation count times, with up to concurrency at once.
+    Args:
+        operation (Callable[[int], Awaitable]): Runs the i-th operation.
+        count (int): The number of operations.
+        concurrency (int): The number of operations in flight at once.
+    Returns:
+        dict: The stage summary.
+    """
+    latencies: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(number: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await operation(number)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(number) for number in range(count)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def measure_sync(operation: Callable[[int], object], count: int) -> dict:
+    """Runs a CPU-bound operation count times in a row.
+    Args:
+        operation (Callable[[int], object]): Runs the i-th operation.
+        count (int): The number of operations.
+    Returns:
+        dict: The stage summary.
+    """
+    latencies = []
+    started = time.perf_counter()
+    for number in range(count):
+        operation_started = time.perf_counter()
+        operation(number)
+        latencies.append(time.perf_counter() - operation_started)
+    return summarize(latencies, time.perf_counter() - started, 0)
+
+
+def git_commit() -> str:
+    """Returns the current commit, or "unknown" outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def create_tools(
+    args: argparse.Namespace, calls: CallCounter, catalog: LocalVectorIndex
+) -> CustomTools:
+    """Creates CustomTools wired to the offline stand-ins.
+    Result caching is disabled so each search reaches the fake OpenSearch.
+    """
+    tools = CustomTools(
+        logger=logging.getLogger(__name__),
+        embedding_cache=EmbeddingCache(cache_dir=None),
+        polling_strategy=PollingStrategy(
+            initial_delay=POLL_INITIAL_DELAY * args.time_scale,
+            max_interval=POLL_MAX_INTERVAL * args.time_scale,
+            probe_s3=args.probe_s3,
+        ),
+        result_cache=SearchResultCache(max_entries=0),
+    )
+    tools.logger.setLevel(args.log_level)
+
+    s3 = FakeS3(LatencyModel(args.s3_latency, args.time_scale, args.seed), calls)
+    tools.s3_client_us_east_1 = s3
+    tools.bedrock_runtime_client = FakeBedrockRuntime(
+        s3,
+        LatencyModel(args.job_latency, args.time_scale, args.seed),
+        LatencyModel(args.api_latency, args.time_scale, args.seed),
+        calls,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+        invoke_latency=LatencyModel(args.invoke_latency, args.time_scale, args.seed),
+    )
+    tools.embedding_backend = create_embedding_backend(
+        tools, args.embedding_backend, fallback=None
+    )
+    search_latency = LatencyModel(args.search_latency, 1.0, args.seed)
+    sync_client = FakeOpenSearch(catalog, search_latency, calls)
+    async_client = FakeAsyncOpenSearch(catalog, search_latency, calls)
+    tools.video_search.create_opensearch_client = lambda: sync_client
+    tools.video_search.create_async_opensearch_client = lambda: async_client
+    return tools
+
+
+async def run_stages(args: argparse.Namespace, tools: CustomTools) -> dict:
+    """Runs every stage on the background loop and returns their summaries."""
+    rng = np.random.default_rng(args.seed)
+    queries = [rng.standard_normal(1_024).tolist() for _ in range(args.searches)]
+    keyword_lists = [
+        rng.choice(KEYWORDS, 2, replace=False).tolist() for _ in range(args.searches)
+    ]
+    video_search = tools.video_search
+    client = video_search.create_async_opensearch_client()
+    stages = {}
+
+    # The async invoke path, whatever --embedding-backend is, so reports compare
+    stages["bedrock_embedding"] = await measure_async(
+        lambda n: tools.embedding_jobs.generate_text_embedding_s3_async(f"query {n}"),
+        args.embeddings,
+        args.concurrency,
+    )
+    invoke_model = InvokeModelBackend(tools)
+    stages["bedrock_invoke_model"] = await measure_async(
+        lambda n: invoke_model.embed_async(f"query {n}"),
+        args.embeddings,
+        args.concurrency,
+    )
+
+    texts = [f"batch query {n}" for n in range(args.embeddings)]
+    started = time.perf_counter()
+    latencies, errors = [], 0
+    async for result in tools.create_text_embeddings_batch_async(texts):
+        if result.error is None:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors += 1
+    stages["batch_embedding"] = summarize(
+        latencies, time.perf_counter() - started, errors
+    )
+
+    stages["embedding_cache_hit"] = await measure_async(
+        lambda n: tools.create_text_embedding_async(texts[n % len(texts)]),
+        args.searches,
+        args.concurrency,
+    )
+
+    stages["semantic_search"] = await measure_async(
+        lambda n: video_search.semantic_search_async(
+            client, queries[n], args.results_size
+        ),
+        args.searches,
+        args.concurrency,
+    )
+    stages["segment_search"] = await measure_async(
+        lambda n: video_search.semantic_search_segments_async(
+            client, queries[n], args.results_size
+        ),
+        args.searches,
+        args.concurrency,
+    )
+    stages["keyword_search"] = await measure_async(
+        lambda n: video_search.keyword_search_async(
+            client, keyword_lists[n], args.results_size
+        ),
+        args.searches,
+        args.concurrency,
+    )
+    stages["hybrid_search"] = await measure_async(
+        lambda n: video_search.hybrid_search_async(
+            client, queries[n], keyword_lists[n], args.results_size
+        ),
+        args.searches,
+        args.concurrency,
+    )
+
+    handles = [
+        tools.embedding_handles.add(f"q{n}", "benchmark", query)
+        for n, query in enumerate(queries[: tools.embedding_handles.max_entries])
+    ]
+    stages["semantic_search_tool"] = await measure_async(
+        lambda n: tools.semantic_search_for_videos_async(
+            handles[n % len(handles)], args.results_size
+        ),
+        args.searches,
+        args.concurrency,
+    )
+
+    video_response = await video_search.semantic_search_async(
+        client, queries[0], args.format_results_size
+    )
+    segment_response = await video_search.semantic_search_segments_async(
+        client, queries[0], args.format_results_size
+    )
+    stages["format_search_results"] = measure_sync(
+        lambda n: format_search_results(video_response), args.format_iterations
+    )
+    stages["format_search_results_segments"] = measure_sync(
+        lambda n: format_search_results_segments(segment_response),
+        args.format_iterations,
+    )
+    stages["format_search_results_segments_grouped"] = measure_sync(
+        lambda n: format_search_results_segments_grouped(segment_response),
+        args.format_iterations,
+    )
+    return stages
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Offline end-to-end benchmarks for CustomTools."
+    )
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--videos", type=int, default=2_000)
+    parser.add_argument("--segments-per-video", type=int, default=8)
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--embeddings", type=int, default=50)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--results-size", type=int, default=6)
+    parser.add_argument("--format-results-size", type=int, default=50)
+    parser.add_argument("--format-iterations", type=int, default=2_000)
+    parser.add_argument(
+        "--job-latency",
+        default="lognormal:2.0:0.35",
+        help="Bedrock job duration: constant:S, uniform:LO:HI, lognormal:MEDIAN:SIGMA",
+    )
+    parser.add_argument("--api-latency", default="lognormal:0.03:0.3")
+    parser.add_argument(
+        "--invoke-latency",
+        default="lognormal:0.2:0.3",
+        help="InvokeModel duration, including the model run",
+    )
+    parser.add_argument("--s3-latency", default="lognormal:0.02:0.3")
+    parser.add_argument(
+        "--search-latency",
+        default="lognormal:0.005:0.3",
+        help="OpenSearch network latency, added to the local search time",
+    )
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=0.05,
+        help="Multiplies Bedrock, S3 and polling delays to shorten the run",
+    )
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--probe-s3", action="store_true")
+    parser.add_argument(
+        "--embedding-backend",
+        default="async",
+        choices=["async", "sync", "local"],
+        help="The backend of the batch embedding and cache stages",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    calls = CallCounter()
+    with tempfile.TemporaryDirectory(prefix="benchmark-index-") as directory:
+        started = time.perf_counter()
+        catalog = build_catalog(
+            directory, args.videos, args.segments_per_video, args.seed, args.dtype
+        )
+        catalog_seconds = time.perf_counter() - started
+        catalog_info = {
+            "index_name": OPENSEARCH_INDEX_NAME,
+            "videos": len(catalog.videos),
+            "segments": int(catalog.embeddings.shape[0]),
+            "build_seconds": round(catalog_seconds, 3),
+        }
+        tools = create_tools(args, calls, catalog)
+        stages = get_background_loop().run(run_stages(args, tools))
+
+    report = {
+        "schema_version": REPORT_SCHEMA_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "catalog": catalog_info,
+        "stages": stages,
+        "fake_api_calls": calls.snapshot(),
+    }
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(
+        f"{'stage':<32}{'count':>7}{'ops/s':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    for name, stage in stages.items():
+        if not stage["count"]:
+            print(f"{name:<32}{0:>7}  (all {stage['errors']} operations failed)")
+            continue
+        print(
+            f"{name:<32}{stage['count']:>7}{stage['throughput_per_s']:>10.1f}"
+            f"{stage['p50_ms']:>10.3f}{stage['p95_ms']:>10.3f}"
+            f"{stage['p99_ms']:>10.3f}"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    main()
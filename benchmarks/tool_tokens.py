@@ -0,0 +1,120 @@
+# Measures the tokens the search tools put into the model's context, in the "full"
+# and "compact" TOOL_OUTPUT_MODE.
+# Offline, the tool output of each search tool is estimated over a synthetic catalog:
+#   python -m benchmarks.tool_tokens
+# With --live, each query is run through a Bedrock agent in both modes, and the
+# tokens reported in result.metrics.accumulated_usage are compared:
+#   python -m benchmarks.tool_tokens --live "cars driving on a beach" "dogs playing"
+
+import argparse
+import contextlib
+import io
+import logging
+import tempfile
+
+import numpy as np
+
+from benchmarks.fakes import KEYWORDS, CallCounter, build_catalog
+from benchmarks.run import create_tools
+from benchmarks.run import parse_args as parse_run_args
+from event_loop import get_background_loop
+from tool_output import estimate_tokens
+
+MODES = ["full", "compact"]
+MODEL_ID = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
+MODEL_REGION = "us-east-1"
+
+
+async def estimate_tool_tokens(tools, results_sizes: list[int], seed: int) -> dict:
+    """Estimates the tokens of each search tool's output, per mode and results size."""
+    rng = np.random.default_rng(seed)
+    handle = tools.embedding_handles.add(
+        "benchmark", "benchmark", rng.standard_normal(1_024).tolist()
+    )
+    keywords = rng.choice(KEYWORDS, 2, replace=False).tolist()
+    searches = {
+        "semantic_search_for_videos": lambda size: (
+            tools.semantic_search_for_videos_async(handle, size)
+        ),
+        "semantic_search_for_video_segments": lambda size: (
+            tools.semantic_search_for_video_segments_async(handle, size)
+        ),
+        "keyword_search_for_videos": lambda size: (
+            tools.keyword_search_for_videos_async(keywords, size)
+        ),
+        "hybrid_search_for_videos": lambda size: (
+            tools.hybrid_search_for_videos_async(handle, keywords, size)
+        ),
+    }
+    report = {}
+    for name, search in searches.items():
+        for size in results_sizes:
+            row = {}
+            for mode in MODES:
+                tools.tool_output_mode = mode
+                row[mode] = estimate_tokens(await search(size))
+            report[f"{name}@{size}"] = row
+    return report
+
+
+def run_offline(args: argparse.Namespace) -> dict:
+    run_args = parse_run_args(["--videos", str(args.videos), "--seed", str(args.seed)])
+    with tempfile.TemporaryDirectory(prefix="benchmark-index-") as directory:
+        catalog = build_catalog(directory, args.videos, 8, args.seed)
+        tools = create_tools(run_args, CallCounter(), catalog)
+        report = get_background_loop().run(
+            estimate_tool_tokens(tools, args.results_sizes, args.seed)
+        )
+    print(f"{'tool@results_size':<44}{'full':>8}{'compact':>9}{'saved':>8}")
+    for name, row in report.items():
+        saved = 1 - row["compact"] / row["full"] if row["full"] else 0.0
+        print(f"{name:<44}{row['full']:>8}{row['compact']:>9}{saved:>8.0%}")
+    return report
+
+
+def run_live(args: argparse.Namespace) -> dict:
+    # Imported here, so the offline run needs neither Bedrock nor the Strands tools
+    from search_agent import SearchAgent
+
+    search_agent = SearchAgent(logger=logging.getLogger(__name__))
+    report = {}
+    print(f"{'query':<40}{'mode':>9}{'input':>9}{'output':>9}{'total':>9}")
+    for query in args.live:
+        report[query] = {}
+        for mode in MODES:
+            # Agents clone the tools, and with them the output mode
+            search_agent.custom_tools.tool_output_mode = mode
+            agent = search_agent.create_agent(args.model_id, args.model_region, 0.0)
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = agent(query)
+            usage = result.metrics.accumulated_usage
+            report[query][mode] = {
+                "inputTokens": usage["inputTokens"],
+                "outputTokens": usage["outputTokens"],
+                "totalTokens": usage["totalTokens"],
+            }
+            print(
+                f"{query[:38]:<40}{mode:>9}{usage['inputTokens']:>9}"
+                f"{usage['outputTokens']:>9}{usage['totalTokens']:>9}"
+            )
+        full, compact = report[query]["full"], report[query]["compact"]
+        print(f"{'':<40}{'saved':>9}{full['inputTokens'] - compact['inputTokens']:>9}")
+    return report
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(
+        description="Measures the tokens of full and compact search tool output."
+    )
+    parser.add_argument("--live", nargs="+", metavar="QUERY", help="Run the agent")
+    parser.add_argument("--model-id", default=MODEL_ID)
+    parser.add_argument("--model-region", default=MODEL_REGION)
+    parser.add_argument("--videos", type=int, default=500)
+    parser.add_argument("--results-sizes", type=int, nargs="+", default=[6, 25])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    return run_live(args) if args.live else run_offline(args)
+
+
+if __name__ == "__main__":
+    main()
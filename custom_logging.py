@@ -1,45 +1,7 @@
-import io
 import logging
-import queue
-import sys
 
-
-class GradioLogHandler(logging.Handler):
-    """Custom log handler to capture logs into a thread-safe queue."""
-
-    def __init__(self, log_queue):
-        super().__init__()
-        self.log_queue = log_queue
-
-    def emit(self, record):
-        msg = self.format(record)
-        self.log_queue.put(msg)
-
-
-class StreamToLogger(io.StringIO):
-    """
-    Redirect a stream (stdout or stderr) to logging.
-    """
-
-    # --------- NEW: Capture stdout, stderr, and warnings ---------
-
-    def __init__(self, logger, log_level):
-        super().__init__()
-        self.logger = logger
-        self.log_level = log_level
-        self._buffer = ""
-
-    def write(self, buf):
-        self._buffer += buf
-        while "\n" in self._buffer:
-            line, self._buffer = self._buffer.split("\n", 1)
-            if line.strip():
-                self.logger.log(self.log_level, line)
-
-    def flush(self):
-        if self._buffer.strip():
-            self.logger.log(self.log_level, self._buffer.strip())
-            self._buffer = ""
+from log_pipeline import BatchStreamHandler, attach_log_pipeline, capture_stdio
+from session_logs import SessionLogFilter, SessionLogs, get_session_logs
 
 
 class CustomLogging:
@@ -47,15 +9,12 @@ class CustomLogging:
     # LOGGING SETUP TO INTERCEPT LOG OUTPUT FOR UI
     # -------------------------------------------------
 
-    # Main log queue for UI to consume
-    _log_queue = queue.Queue()
-
     @staticmethod
-    def get_log_queue() -> queue.Queue:
+    def get_session_logs() -> SessionLogs:
         """
-        Returns the main log queue for UI to consume.
+        Returns the per-session log channels for the UI to display.
         """
-        return CustomLogging._log_queue
+        return get_session_logs()
 
     @staticmethod
     def setup_logging() -> logging.Logger:
@@ -64,20 +23,22 @@ class CustomLogging:
         Returns:
             logging.Logger: The configured logger instance.
         """
-        # Set up the log handler for application logs
-        gradio_log_handler = GradioLogHandler(CustomLogging.get_log_queue())
-        # gradio_log_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
-        gradio_log_handler.setFormatter(logging.Formatter("%(message)s"))
-        logging.getLogger().addHandler(gradio_log_handler)
-        logging.getLogger().addHandler(logging.StreamHandler())
+        # Set up the log handler for application logs, one channel per session
+        session_logs = CustomLogging.get_session_logs()
+        # session_logs.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+        session_logs.setFormatter(logging.Formatter("%(message)s"))
+        # Both handlers run on the pipeline's writer thread, not the request thread
+        pipeline = attach_log_pipeline(
+            logging.getLogger(), [session_logs, BatchStreamHandler()]
+        )
+        # The session is known on the caller's thread, so tag records before queuing
+        pipeline.handler.addFilter(SessionLogFilter())
         logging.getLogger().setLevel(logging.INFO)
 
+        # Unless LOG_CAPTURE_STDIO is false, as it replaces the streams process-wide
         stdout_logger = logging.getLogger("STDOUT")
         stderr_logger = logging.getLogger("STDERR")
-        sys.stdout = StreamToLogger(stdout_logger, logging.INFO)
-        sys.stderr = StreamToLogger(stderr_logger, logging.ERROR)
-
-        logging.captureWarnings(True)
+        capture_stdio(stdout_logger, stderr_logger)
 
         logger = logging.getLogger(__name__)
 
@@ -1,335 +1,398 @@
-import json
+import asyncio
+import copy
 import logging
 import os
-import time
-import warnings
+from typing import AsyncIterator, Iterator, Optional
 
-import boto3
-from botocore.config import Config
-from botocore.exceptions import ClientError
 from dotenv import load_dotenv
-from opensearchpy import OpenSearch
 from strands import tool
 
-from data import (
-    VideoSearchResult,
-    VideoSearchResults,
-    VideoSegmentSearchResult,
-    VideoSegmentSearchResults,
+from agent_streaming import report_progress
+from aws_clients import get_bedrock_runtime_client, get_s3_client
+from batch_embedding import BATCH_MAX_CONCURRENCY, BatchEmbedder, EmbeddingResult
+from embedding_backends import EmbeddingBackend, create_embedding_backend
+from embedding_cache import EmbeddingCache, EmbeddingHandles, get_embedding_cache
+from embedding_jobs import EmbeddingJobs
+from event_loop import get_background_loop, on_background_loop
+from polling import PollingStrategy, get_polling_strategy
+from result_cache import SearchResultCache, get_result_cache
+from search_formatting import (
+    format_search_results,
+    format_search_results_segments,
+    format_search_results_segments_grouped,
 )
-from gradio_logger import GradioLogger
+from telemetry import is_enabled, record
+from tool_output import (
+    TOOL_OUTPUT_MODE,
+    ResultStore,
+    compact_search_results,
+    estimate_tokens,
+)
+from video_search import VideoSearch
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Sensitive environment variables
-AWS_REGION_MARENGO = os.getenv("AWS_REGION_MARENGO", "us-east-1")
-S3_VIDEO_STORAGE_BUCKET_MARENGO = os.getenv("S3_VIDEO_STORAGE_BUCKET_MARENGO")
-
 OPENSEARCH_ENDPOINT = os.getenv("OPENSEARCH_ENDPOINT")
 OPENSEARCH_INDEX_NAME = os.getenv("OPENSEARCH_INDEX_NAME")
 
-# Amazon Bedrock model ID
-MODEL_ID_MARENGO = "twelvelabs.marengo-embed-2-7-v1:0"
-
-# Embeddings output location on S3
-S3_DESTINATION_PREFIX = "embeddings"
+# The segment search tool returns each video once with its segments ("grouped"),
+# or one result per segment with its video's metadata repeated ("flat")
+SEGMENT_RESULTS_FORMAT = os.getenv("SEGMENT_RESULTS_FORMAT", "grouped").lower()
 
 
 class CustomTools:
     """A collection of tools for interacting with AWS services and performing operations."""
 
-    def __init__(self, logger: logging.Logger):
-        gradio_logger = GradioLogger()
-        self.logger = gradio_logger.setup_logging()
+    def __init__(
+        self,
+        logger: logging.Logger,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        polling_strategy: Optional[PollingStrategy] = None,
+        result_cache: Optional[SearchResultCache] = None,
+        embedding_backend: Optional[EmbeddingBackend] = None,
+    ):
+        self.logger = logger
 
-        # S3 clients for different regions/models
-        self.s3_client_us_east_1 = boto3.client("s3", region_name=AWS_REGION_MARENGO)
+        # AWS clients, created on first use; assigning one replaces the shared client
+        self._s3_client_us_east_1 = None
+        self._bedrock_runtime_client = None
 
-        # Bedrock runtime client with retry configuration
-        config = Config(
-            retries={
-                "max_attempts": 5,
-                "mode": "standard",  # Or 'adaptive' for a more sophisticated approach
-            }
-        )
+        # Query embeddings are cached by normalized text and model ID
+        self.embedding_cache = embedding_cache or get_embedding_cache()
+
+        # Polling strategy for async invocations, shared so it learns completion times
+        self.polling_strategy = polling_strategy or get_polling_strategy()
 
-        self.bedrock_runtime_client = boto3.client(
-            service_name="bedrock-runtime",
-            region_name=AWS_REGION_MARENGO,
-            config=config,
+        # Search responses are cached until they expire or the index is invalidated
+        self.result_cache = result_cache or get_result_cache()
+
+        # Runs the searches through the result cache
+        self.video_search = VideoSearch(
+            logger, OPENSEARCH_INDEX_NAME, self.result_cache
         )
 
-        # This will hold the embedding generated by the Marengo model
-        self.text_embedding: list[float] = []
+        # Event loop that runs all async I/O; the sync tools are wrappers around it
+        self.background_loop = get_background_loop()
 
-    def generate_text_embedding_bedrock(self, search_text) -> dict:
-        """Generates a text embedding using the Marengo model.
-        Args:
-            search_text (str): The search query text.
+        # Embeddings generated by the Marengo model, addressed by handle
+        self.embedding_handles = EmbeddingHandles()
+
+        # Async invocations of the Marengo model, whose output is read from S3
+        self.embedding_jobs = EmbeddingJobs(self)
+
+        # Turns query text into vectors: InvokeModel, async invoke and S3, or local
+        self.embedding_backend = embedding_backend or create_embedding_backend(self)
+
+        # "full" or "compact" search tool output, and the full records behind it
+        self.tool_output_mode = TOOL_OUTPUT_MODE
+        self.result_store = ResultStore()
+
+    @property
+    def s3_client_us_east_1(self):
+        """The S3 client; the process-wide one unless another was assigned."""
+        if self._s3_client_us_east_1 is None:
+            self._s3_client_us_east_1 = get_s3_client()
+        return self._s3_client_us_east_1
+
+    @s3_client_us_east_1.setter
+    def s3_client_us_east_1(self, client) -> None:
+        self._s3_client_us_east_1 = client
+
+    @property
+    def bedrock_runtime_client(self):
+        """The Bedrock runtime client; the process-wide one unless another was
+        assigned."""
+        if self._bedrock_runtime_client is None:
+            self._bedrock_runtime_client = get_bedrock_runtime_client()
+        return self._bedrock_runtime_client
+
+    @bedrock_runtime_client.setter
+    def bedrock_runtime_client(self, client) -> None:
+        self._bedrock_runtime_client = client
+
+    def warm_clients(self) -> tuple:
+        """Creates the AWS clients ahead of the first request that needs them.
         Returns:
-            dict: The response from the video analysis job.
+            tuple: The Bedrock runtime and S3 clients.
         """
-        try:
-            response = self.bedrock_runtime_client.start_async_invoke(
-                modelId=MODEL_ID_MARENGO,
-                modelInput={
-                    "inputType": "text",
-                    "inputText": search_text,
-                },
-                outputDataConfig={
-                    "s3OutputDataConfig": {
-                        "s3Uri": f"s3://{S3_VIDEO_STORAGE_BUCKET_MARENGO}/{S3_DESTINATION_PREFIX}/",
-                    }
-                },
-            )
-            return response
-        except ClientError as err:
-            self.logger.error(f"Failed to generate text embedding: {err}")
-            raise err
+        return self.bedrock_runtime_client, self.s3_client_us_east_1
 
-    def download_search_embedding_from_s3(self, s3_key: str) -> dict:
-        """Download the output file from S3 and save it locally.
-        Args:
-            s3_key (str): The S3 key of the output file.
+    def clone(self) -> "CustomTools":
+        """Returns a copy of the tools for another conversation.
+        The copy shares the AWS clients, caches, polling strategy and event loop, but
+        keeps its own embedding handles and result store, so conversations only see
+        their own vectors and results.
         Returns:
-            VideoEmbeddings: The video embedding object.
+            CustomTools: The new tools instance.
         """
-        try:
-            s3_object = self.s3_client_us_east_1.get_object(
-                Bucket=S3_VIDEO_STORAGE_BUCKET_MARENGO,
-                Key=s3_key,
-            )
-            embedding = json.loads(s3_object["Body"].read().decode("utf-8"))
-            return embedding
-        except ClientError as err:
-            self.logger.error(f"Failed to download text embedding from S3: {err}")
-            raise err
-
-    def poll_job_status(self, invocation_arn: str) -> str:
-        """Poll the job status until it is completed or failed.
+        custom_tools = copy.copy(self)
+        custom_tools.embedding_handles = EmbeddingHandles()
+        custom_tools.result_store = ResultStore()
+        return custom_tools
+
+    def generate_text_embedding(self, search_text: str) -> list[float]:
+        """Generates a text embedding with the embedding backend, bypassing the cache.
+        Synchronous wrapper around generate_text_embedding_async.
         Args:
-            invocation_arn (str): The ARN of the job invocation.
+            search_text (str): The text to be embedded.
         Returns:
-            str: The final job status.
+            list[float]: The text embedding.
         """
-        try:
-            while True:
-                response = self.bedrock_runtime_client.get_async_invoke(
-                    invocationArn=invocation_arn
-                )
-                status = response["status"]
+        return self.background_loop.run(self.generate_text_embedding_async(search_text))
 
-                self.logger.info(f"Invocation status: {status}")
-
-                if status == "Completed":
-                    self.logger.info("Job completed!")
-                    break
-                elif status == "Failed":
-                    self.logger.info(f"Job failed: {response.get('failureMessage')}")
-                    break
-                else:
-                    # Still in progress, so wait and retry
-                    time.sleep(0.5)  # Adjust polling interval as necessary
+    @on_background_loop
+    async def generate_text_embedding_async(self, search_text: str) -> list[float]:
+        """Generates a text embedding with the embedding backend, bypassing the cache.
+        Args:
+            search_text (str): The text to be embedded.
+        Returns:
+            list[float]: The text embedding.
+        Raises:
+            botocore.exceptions.ClientError: If the backend and its fallback fail.
+        """
+        return await self.embedding_backend.embed_async(search_text)
 
-            return response["status"]
-        except ClientError as err:
-            self.logger.error(f"Failed to poll job status: {err}")
-            raise err
+    def create_text_embedding(self, search_text: str) -> str:
+        """Creates a text embedding using the TwelveLabs Marengo model on Amazon Bedrock.
+        Synchronous wrapper around create_text_embedding_async.
+        Args:
+            search_text (str): The text to be embedded.
+        Returns:
+            str: A handle for the embedding, to pass to the search tools.
+        Raises:
+            ValueError: If the embedding is not found in the response.
+            botocore.exceptions.ClientError: If the job fails or the S3 download fails.
+        """
+        return self.background_loop.run(self.create_text_embedding_async(search_text))
 
-    @tool
-    def create_text_embedding(self, search_text: str):
+    @tool(name="create_text_embedding")
+    @on_background_loop
+    async def create_text_embedding_async(self, search_text: str) -> str:
         """Creates a text embedding using the TwelveLabs Marengo model on Amazon Bedrock.
         Args:
             search_text (str): The text to be embedded.
+        Returns:
+            str: A handle for the embedding, to pass to the search tools.
         Raises:
             ValueError: If the embedding is not found in the response.
             botocore.exceptions.ClientError: If the job fails or the S3 download fails.
         """
-        # Generate embeddings for the search text using Amazon Bedrock
-        self.logger.info(
-            f'Generating text embedding using Amazon Bedrock for: "{search_text}"'
+        model_id = self.embedding_backend.model_id
+        text_embedding = await self.embedding_cache.get_or_compute_async(
+            search_text, model_id, self.generate_text_embedding_async
         )
-        response = self.generate_text_embedding_bedrock(search_text)
-        invocation_arn = response["invocationArn"]
-        self.logger.info(f"Invocation ARN: {invocation_arn.split('/')[-1]}")
-
-        # Poll the job status until it is completed
-        response = self.poll_job_status(invocation_arn)
-        self.logger.info(f"Job completed with status: {response}")
-
-        # Download the output.json file from S3
-        s3_key = f"{S3_DESTINATION_PREFIX}/{invocation_arn.split('/')[-1]}/output.json"
-        self.logger.info(f"Downloading embedding from S3 key: {s3_key}")
-        text_embedding = self.download_search_embedding_from_s3(s3_key)
-
-        # Extract the text embedding from the response
-        text_embedding = text_embedding["data"][0]["embedding"]
         self.logger.info(f"Text embedding: {text_embedding[0:5]}")
-        self.text_embedding = text_embedding
-
-    def create_opensearch_client(self) -> OpenSearch:
-        """Creates an OpenSearch client instance.
+        self.logger.debug("Embedding cache stats: %s", self.embedding_cache.stats())
+        return self.embedding_handles.add(search_text, model_id, text_embedding)
+
+    def create_text_embeddings_batch(
+        self, texts: list[str], max_concurrency: Optional[int] = None
+    ) -> Iterator[EmbeddingResult]:
+        """Embeds many texts and yields each result as soon as it is available.
+        Synchronous wrapper around create_text_embeddings_batch_async.
         Args:
-            None
-        Returns:
-            OpenSearch: The OpenSearch client instance.
+            texts (list[str]): The texts to embed.
+            max_concurrency (int): The maximum number of outstanding Bedrock jobs.
+        Yields:
+            EmbeddingResult: The text and its embedding, or the error that occurred.
         """
-        # Suppress security warnings related to unverified HTTPS requests and SSL connections
-        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
-        warnings.filterwarnings(
-            "ignore", message="Connecting to https://localhost:9200 using SSL"
+        yield from self.background_loop.iterate(
+            self.create_text_embeddings_batch_async(texts, max_concurrency)
         )
 
-        os_client = OpenSearch(
-            hosts=[{"host": OPENSEARCH_ENDPOINT, "port": 9200}],
-            http_auth=("admin", "OpenSearch123"),
-            use_ssl=True,
-            verify_certs=False,
-        )
+    async def create_text_embeddings_batch_async(
+        self, texts: list[str], max_concurrency: Optional[int] = None
+    ) -> AsyncIterator[EmbeddingResult]:
+        """Embeds many texts and yields each result as soon as it is available.
+        Jobs are submitted with bounded concurrency and tracked by a single shared
+        poller; cached texts are returned without submitting a job.
+        Args:
+            texts (list[str]): The texts to embed.
+            max_concurrency (int): The maximum number of outstanding Bedrock jobs.
+        Yields:
+            EmbeddingResult: The text and its embedding, or the error that occurred.
+        """
+        caller_loop = asyncio.get_running_loop()
+        results: asyncio.Queue = asyncio.Queue()
+        done = object()
 
-        return os_client
+        def emit(result):
+            caller_loop.call_soon_threadsafe(results.put_nowait, result)
 
-    def semantic_search(
-        self, opensearch_client: OpenSearch, text_embedding: list, results_size: int = 6
-    ) -> dict:
-        """Query the OpenSearch index using a text embedding and return a list of video search results.
-        This function performs a semantic search in OpenSearch using the provided text embedding.
-        It constructs a query that uses the k-nearest neighbors (kNN) algorithm to find
-        the most similar video segments based on the embedding.
-        The results are limited to the specified number of results_size.
+        async def produce():
+            try:
+                await self.background_loop.run_async(
+                    self._run_batch(texts, max_concurrency, emit)
+                )
+            finally:
+                emit(done)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (result := await results.get()) is not done:
+                yield result
+            await producer
+        finally:
+            producer.cancel()
+
+    async def _run_batch(self, texts: list[str], max_concurrency, emit) -> None:
+        """Runs one batch embedding on the background loop.
+        Async invocations share BatchEmbedder's job poller; other backends embed
+        each text directly, with bounded concurrency.
+        """
+        if not self.embedding_backend.batch_jobs:
+            await self._embed_each(
+                texts, max_concurrency or BATCH_MAX_CONCURRENCY, emit
+            )
+            return
+        batch_embedder = BatchEmbedder(
+            self,
+            self.embedding_backend.model_id,
+            self.embedding_cache,
+            self.polling_strategy,
+            self.logger,
+            **({"max_concurrency": max_concurrency} if max_concurrency else {}),
+        )
+        await batch_embedder.run(texts, emit)
+
+    async def _embed_each(self, texts: list[str], max_concurrency: int, emit) -> None:
+        """Embeds each text with the embedding backend; repeated texts are embedded
+        once, as they join the same embedding cache entry."""
+        slots = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def embed(text: str) -> None:
+            async with slots:
+                try:
+                    embedding = await self.embedding_cache.get_or_compute_async(
+                        text,
+                        self.embedding_backend.model_id,
+                        self.embedding_backend.embed_async,
+                    )
+                except Exception as err:
+                    emit(EmbeddingResult(text, None, err))
+                    return
+            emit(EmbeddingResult(text, embedding))
+
+        await asyncio.gather(*(embed(text) for text in texts))
+
+    def tool_output(self, search_results: dict) -> dict:
+        """Returns formatted search results as the search tools give them to the model.
+        In compact mode, the results are shrunk to fit TOOL_OUTPUT_TOKEN_BUDGET, and
+        the full records are kept in the result store.
         Args:
-            opensearch_client (OpenSearch): The OpenSearch client instance.
-            text_embedding (list): The text embedding to use for the search.
-            results_size (int): The number of results to return.
+            search_results (dict): The output of format_search_results*.
         Returns:
-            dict: The search results from OpenSearch.
+            dict: The full or compact search results.
         """
-        query = {
-            "query": {
-                "nested": {
-                    "path": "embeddings",
-                    "query": {
-                        "knn": {
-                            "embeddings.embedding": {
-                                "vector": text_embedding,
-                                "k": results_size,
-                            }
-                        }
-                    },
-                }
-            },
-            "size": results_size,
-            "_source": {"excludes": ["embeddings.embedding"]},
-        }
-        try:
-            search_results = opensearch_client.search(
-                body=query, index=OPENSEARCH_INDEX_NAME
+        if self.tool_output_mode == "compact":
+            search_results = compact_search_results(search_results, self.result_store)
+        if is_enabled():
+            record(
+                "tool_output_tokens",
+                estimate_tokens(search_results),
+                mode=self.tool_output_mode,
             )
-            self.logger.debug(f"Search results: {search_results}")
-            return search_results
-        except Exception as err:
-            self.logger.error(f"Error querying index: {err}")
-            raise err
-
-    def keyword_search(
-        self, opensearch_client: OpenSearch, keyword_list: list, results_size: int = 6
-    ) -> dict:
-        """Query the OpenSearch index using a text embedding and return a list of video search results.
-        This function performs a keyword search in OpenSearch using the provided keyword list.
+        return search_results
+
+    @tool
+    def get_search_results(self, result_ids: list) -> dict:
+        """Returns the full records of earlier search results, including the summary,
+        all keywords, the S3 URI and the keyframe URL.
         Args:
-            opensearch_client (OpenSearch): The OpenSearch client instance.
-            keyword_list (list): The list of keywords to search for.
-            results_size (int): The number of results to return.
+            result_ids (list): Result IDs from the search tools, e.g. "res-3f2a9c1b".
         Returns:
-            dict: The search results from OpenSearch.
+            dict: The full records, and the IDs that are no longer available.
         """
-        query = {
-            "query": {"terms": {"keywords": keyword_list}},
-            "size": results_size,
-            "_source": {"excludes": ["embeddings.embedding"]},
-        }
-
-        try:
-            search_results = opensearch_client.search(
-                body=query, index=OPENSEARCH_INDEX_NAME
-            )
-            self.logger.debug(f"Search results: {search_results}")
-            return search_results
-        except Exception as err:
-            self.logger.error(f"Error querying index: {err}")
-            raise err
-
-    def format_search_results(self, raw_search_results: dict) -> dict:
-        """Formats the raw search results for videos from OpenSearch into a structured format.
-        This function processes the raw search results returned by OpenSearch and converts them
-        into a structured format that includes video metadata such as video name, title, summary,
-        keywords, duration, S3 URI, keyframe URL, and score.
+        results, missing = [], []
+        for result_id in result_ids:
+            search_result = self.result_store.get(result_id)
+            if search_result is None:
+                missing.append(result_id)
+            else:
+                results.append(search_result)
+        if missing:
+            return {"results": results, "missing": missing}
+        return {"results": results}
+
+    def semantic_search_for_videos(
+        self, embedding_handle: str, results_size: int = 6
+    ) -> dict:
+        """Performs a semantic search for a list of unique videos using the generated text embedding.
+        Synchronous wrapper around semantic_search_for_videos_async.
         Args:
-            raw_search_results (dict): The raw search results from OpenSearch.
+            embedding_handle (str): The handle returned by create_text_embedding.
+            results_size (int): The number of results to return.
         Returns:
-            dict: The formatted search results.
+            dict: The search results from OpenSearch.
         """
-        search_results = VideoSearchResults(results=[])
-
-        for result in raw_search_results["hits"]["hits"]:
-            source = result["_source"]
-            search_result = VideoSearchResult(
-                videoName=source["videoName"],
-                title=source["title"],
-                summary=source["summary"],
-                keywords=source["keywords"],
-                durationSec=source["durationSec"],
-                s3URI=source["s3URI"],
-                keyframeURL=source["keyframeURL"],
-                score=result["_score"],
-            )
-
-            search_results.results.append(search_result)
-
-        return search_results.to_dict()
+        return self.background_loop.run(
+            self.semantic_search_for_videos_async(embedding_handle, results_size)
+        )
 
-    @tool
-    def semantic_search_for_videos(self, results_size: int = 6) -> dict:
+    @tool(name="semantic_search_for_videos")
+    @on_background_loop
+    async def semantic_search_for_videos_async(
+        self, embedding_handle: str, results_size: int = 6
+    ) -> dict:
         """Performs a semantic search for a list of unique videos using the generated text embedding.
         This function uses the text embedding generated by the Marengo model to search for videos in OpenSearch.
         Args:
-            text_embedding (list): The dense vector embedding (list of floats) to use for the search.
+            embedding_handle (str): The handle returned by create_text_embedding.
             results_size (int): The number of results to return.
         Returns:
             dict: The search results from OpenSearch.
         """
-        if len(self.text_embedding) != 1_024:
+        text_embedding = self.embedding_handles.resolve(embedding_handle)
+        if len(text_embedding) != self.embedding_backend.dimensions:
             self.logger.error(
                 "Text embedding does not have the correct dimensions. Cannot perform search."
             )
             return {}
-        self.logger.debug(f"Text embedding dimensions: {len(self.text_embedding)}")
+        self.logger.debug("Text embedding dimensions: %s", len(text_embedding))
 
-        # Create an OpenSearch client
-        opensearch_client = self.create_opensearch_client()
+        # Get the async OpenSearch client
+        opensearch_client = self.video_search.create_async_opensearch_client()
+        report_progress("Searching the video index")
 
         # Perform the semantic search
         self.logger.info(
-            f"Performing semantic search with embedding: {self.text_embedding[0:5]}..."
+            f"Performing semantic search with embedding: {text_embedding[0:5]}..."
         )
-        raw_search_results = self.semantic_search(
-            opensearch_client, self.text_embedding, results_size
+        raw_search_results = await self.video_search.semantic_search_async(
+            opensearch_client, text_embedding, results_size
         )
 
         # Format the search results
-        search_results = self.format_search_results(raw_search_results)
-        self.logger.debug(f"Search results: {search_results}")
-        return search_results
+        search_results = format_search_results(raw_search_results)
+        report_progress(f"Found {len(search_results['results'])} results")
+        self.logger.debug("Search results: %s", search_results)
+        return self.tool_output(search_results)
 
-    @tool
     def keyword_search_for_videos(
         self, keyword_list: list, results_size: int = 6
+    ) -> dict:
+        """Performs a keyword search for a list of unique videos using the generated text embedding.
+        Synchronous wrapper around keyword_search_for_videos_async.
+        Args:
+            keyword_list (list): The list of keywords to search for.
+            results_size (int): The number of results to return.
+        Returns:
+            dict: The search results from OpenSearch.
+        """
+        return self.background_loop.run(
+            self.keyword_search_for_videos_async(keyword_list, results_size)
+        )
+
+    @tool(name="keyword_search_for_videos")
+    @on_background_loop
+    async def keyword_search_for_videos_async(
+        self, keyword_list: list, results_size: int = 6
     ) -> dict:
         """Performs a keyword search for a list of unique videos using the generated text embedding.
         This function uses the text embedding generated by the Marengo model to search for videos in OpenSearch.
         Args:
-            text_embedding (list): The dense vector embedding (list of floats) to use for the search.
+            keyword_list (list): The list of keywords to search for.
             results_size (int): The number of results to return.
         Returns:
             dict: The search results from OpenSearch.
@@ -337,146 +400,148 @@ class CustomTools:
         if not keyword_list:
             self.logger.error("Keyword list is empty. Cannot perform search.")
             return {}
-        self.logger.debug(f"Keyword list: {keyword_list}")
+        self.logger.debug("Keyword list: %s", keyword_list)
 
-        # Create an OpenSearch client
-        opensearch_client = self.create_opensearch_client()
+        # Get the async OpenSearch client
+        opensearch_client = self.video_search.create_async_opensearch_client()
+        report_progress("Searching the video index")
 
         # Perform the keyword search
         self.logger.info(f"Performing keyword search with keywords: {keyword_list}...")
-        raw_search_results = self.keyword_search(
+        raw_search_results = await self.video_search.keyword_search_async(
             opensearch_client, keyword_list, results_size
         )
 
         # Format the search results
-        search_results = self.format_search_results(raw_search_results)
-        self.logger.debug(f"Search results: {search_results}")
-        return search_results
+        search_results = format_search_results(raw_search_results)
+        report_progress(f"Found {len(search_results['results'])} results")
+        self.logger.debug("Search results: %s", search_results)
+        return self.tool_output(search_results)
 
-    def semantic_search_segments(
-        self, opensearch_client: OpenSearch, text_embedding: list, results_size: int = 6
+    def hybrid_search_for_videos(
+        self, embedding_handle: str, keyword_list: list, results_size: int = 6
     ) -> dict:
-        """Performs a semantic search in OpenSearch using the provided text embedding and returns a list of video segments.
-        This function constructs a query that uses the k-nearest neighbors (kNN) algorithm to find
-        the most similar video segments based on the embedding. The results are limited to the specified number of results_size.
+        """Performs a hybrid semantic and keyword search for a list of unique videos.
+        Synchronous wrapper around hybrid_search_for_videos_async.
         Args:
-            opensearch_client (OpenSearch): The OpenSearch client instance.
-            text_embedding (list): The text embedding to use for the search.
+            embedding_handle (str): The handle returned by create_text_embedding.
+            keyword_list (list): The list of keywords to search for.
             results_size (int): The number of results to return.
         Returns:
-            dict: The search response from OpenSearch.
+            dict: The fused search results from OpenSearch.
         """
-        query = {
-            "query": {
-                "nested": {
-                    "path": "embeddings",
-                    "query": {
-                        "knn": {
-                            "embeddings.embedding": {
-                                "vector": text_embedding,
-                                "k": results_size,
-                                "expand_nested_docs": True,
-                                "rescore": True,
-                            }
-                        }
-                    },
-                    "inner_hits": {
-                        "_source": False,
-                        "fields": [
-                            "embeddings.startSec",
-                            "embeddings.endSec",
-                            "embeddings.embeddingOption",
-                            "embeddings.embedding",
-                        ],
-                        "size": 25,
-                    },
-                    "score_mode": "max",
-                }
-            },
-            "size": results_size,
-            "_source": {"excludes": ["embeddings.embedding"]},
-        }
-
-        try:
-            search_results = opensearch_client.search(
-                body=query, index=OPENSEARCH_INDEX_NAME
+        return self.background_loop.run(
+            self.hybrid_search_for_videos_async(
+                embedding_handle, keyword_list, results_size
             )
-            self.logger.debug(f"Search results: {search_results}")
-            return search_results
-        except Exception as err:
-            self.logger.error(f"Error querying index: {err}")
-            raise err
-
-    def format_search_results_segments(self, raw_search_results: dict) -> dict:
-        """Formats the raw search results for video segments from OpenSearch into a structured format.
-        This function processes the raw search results returned by OpenSearch and converts them
-        into a structured format that includes video segment metadata such as video name, title,
-        summary, keywords, duration, S3 URI, keyframe URL, start and end times, embedding option,
-        and score.
+        )
+
+    @tool(name="hybrid_search_for_videos")
+    @on_background_loop
+    async def hybrid_search_for_videos_async(
+        self, embedding_handle: str, keyword_list: list, results_size: int = 6
+    ) -> dict:
+        """Performs a hybrid semantic and keyword search for a list of unique videos.
+        Use this when the query has both a description and explicit keywords. Both
+        searches run in one request and their rankings are fused into one list.
         Args:
-            raw_search_results (dict): The raw search results from OpenSearch.
+            embedding_handle (str): The handle returned by create_text_embedding.
+            keyword_list (list): The list of keywords to search for.
+            results_size (int): The number of results to return.
         Returns:
-            dict: The formatted search results.
+            dict: The fused search results from OpenSearch.
         """
-        search_results = VideoSegmentSearchResults(results=[])
-
-        for result in raw_search_results["hits"]["hits"]:
-            source = result["_source"]
-            segments = result["inner_hits"]["embeddings"]["hits"]["hits"]
-
-            for segment in segments:
-                search_result = VideoSegmentSearchResult(
-                    videoName=source["videoName"],
-                    title=source["title"],
-                    summary=source["summary"],
-                    keywords=source["keywords"],
-                    durationSec=source["durationSec"],
-                    s3URI=source["s3URI"],
-                    keyframeURL=source["keyframeURL"],
-                    score=result["_score"],
-                    segmentId=segment["_nested"]["offset"],
-                    startSec=segment["fields"]["embeddings.startSec"][0],
-                    endSec=segment["fields"]["embeddings.endSec"][0],
-                    embeddingOption=segment["fields"]["embeddings.embeddingOption"][0],
-                    segmentScore=segment["_score"],
-                )
+        text_embedding = self.embedding_handles.resolve(embedding_handle)
+        if len(text_embedding) != self.embedding_backend.dimensions:
+            self.logger.error(
+                "Text embedding does not have the correct dimensions. Cannot perform search."
+            )
+            return {}
+        if not keyword_list:
+            self.logger.error("Keyword list is empty. Cannot perform search.")
+            return {}
 
-                search_results.results.append(search_result)
+        # Get the async OpenSearch client
+        opensearch_client = self.video_search.create_async_opensearch_client()
+        report_progress("Searching the video index")
 
-        # search_results = search_results.sorted_by_segment_score()
-        # print(search_results[0:2])
-        return search_results.to_dict()
+        # Perform the hybrid search
+        self.logger.info(
+            f"Performing hybrid search with embedding: {text_embedding[0:5]}... "
+            f"and keywords: {keyword_list}..."
+        )
+        raw_search_results = await self.video_search.hybrid_search_async(
+            opensearch_client, text_embedding, keyword_list, results_size
+        )
 
-    @tool
-    def semantic_search_for_video_segments(self, results_size: int = 6) -> dict:
+        # Format the search results
+        search_results = format_search_results(raw_search_results)
+        report_progress(f"Found {len(search_results['results'])} results")
+        self.logger.debug("Search results: %s", search_results)
+        return self.tool_output(search_results)
+
+    def semantic_search_for_video_segments(
+        self, embedding_handle: str, results_size: int = 6
+    ) -> dict:
+        """Performs a semantic search for a list of unique video segments (2-10 second excerpts from the video) using the generated text embedding.
+        Synchronous wrapper around semantic_search_for_video_segments_async.
+        Args:
+            embedding_handle (str): The handle returned by create_text_embedding.
+            results_size (int): The number of results to return.
+        Returns:
+            dict: The search results from OpenSearch.
+        """
+        return self.background_loop.run(
+            self.semantic_search_for_video_segments_async(
+                embedding_handle, results_size
+            )
+        )
+
+    @tool(name="semantic_search_for_video_segments")
+    @on_background_loop
+    async def semantic_search_for_video_segments_async(
+        self, embedding_handle: str, results_size: int = 6
+    ) -> dict:
         """Performs a semantic search for a list of unique video segments (2-10 second excerpts from the video) using the generated text embedding.
         This function uses the text embedding generated by the Marengo model to search for video segments in OpenSearch.
-        The results are then formatted and returned.
+        The results list each video once, with its matching segments under "segments".
         Args:
-            text_embedding (list): The dense vector embedding (list of floats) to use for the search.
+            embedding_handle (str): The handle returned by create_text_embedding.
             results_size (int): The number of results to return.
         Returns:
             dict: The search results from OpenSearch.
         """
-        if len(self.text_embedding) != 1_024:
+        text_embedding = self.embedding_handles.resolve(embedding_handle)
+        if len(text_embedding) != self.embedding_backend.dimensions:
             self.logger.error(
                 "Text embedding does not have the correct dimensions. Cannot perform search."
             )
             return {}
-        self.logger.info(f"Text embedding dimensions: {len(self.text_embedding)}")
+        self.logger.info(f"Text embedding dimensions: {len(text_embedding)}")
 
-        # Create an OpenSearch client
-        opensearch_client = self.create_opensearch_client()
+        # Get the async OpenSearch client
+        opensearch_client = self.video_search.create_async_opensearch_client()
+        report_progress("Searching the video index")
 
         # Perform the semantic search
         self.logger.info(
-            f"Performing semantic search for video segments with embedding: {self.text_embedding[0:5]}..."
+            f"Performing semantic search for video segments with embedding: {text_embedding[0:5]}..."
         )
-        raw_search_results = self.semantic_search_segments(
-            opensearch_client, self.text_embedding, results_size
+        raw_search_results = await self.video_search.semantic_search_segments_async(
+            opensearch_client, text_embedding, results_size
         )
 
         # Format the search results
-        search_results = self.format_search_results_segments(raw_search_results)
-        self.logger.debug(f"Search results: {search_results}")
-        return search_results
+        if SEGMENT_RESULTS_FORMAT == "grouped":
+            search_results = format_search_results_segments_grouped(
+                raw_search_results
+            )
+            segment_count = sum(
+                len(video["segments"]) for video in search_results["videos"]
+            )
+        else:
+            search_results = format_search_results_segments(raw_search_results)
+            segment_count = len(search_results["results"])
+        report_progress(f"Found {segment_count} results")
+        self.logger.debug("Search results: %s", search_results)
+        return self.tool_output(search_results)
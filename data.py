@@ -35,3 +35,127 @@ class VideoSegmentSearchResults(BaseModel):
 
     def sorted_by_segment_score(self):
         return sorted(self.results, key=lambda x: x.segmentScore, reverse=True)
+
+
+class VideoSegment(BaseModel):
+    segmentId: int
+    startSec: float
+    endSec: float
+    embeddingOption: str
+    segmentScore: float
+
+
+class VideoSegmentGroup(VideoSearchResult):
+    """A video's metadata once, followed by its matching segments."""
+
+    segments: list[VideoSegment]
+
+
+class VideoSegmentGroups(BaseModel):
+    videos: list[VideoSegmentGroup]
+
+    def to_dict(self):
+        return {"videos": [video.model_dump() for video in self.videos]}
+
+    def to_flat(self) -> VideoSegmentSearchResults:
+        """Converts to one VideoSegmentSearchResult per segment, as before grouping."""
+        return VideoSegmentSearchResults(
+            results=[
+                VideoSegmentSearchResult(
+                    **video.model_dump(exclude={"segments"}), **segment.model_dump()
+                )
+                for video in self.videos
+                for segment in video.segments
+            ]
+        )
+
+
+# Fast path: build the model_dump() of the models above directly from OpenSearch
+# hits, with the same keys, order and number coercion, but without validation.
+
+
+def video_result_dict(hit: dict) -> dict:
+    """Returns the VideoSearchResult dict for a video hit, without validation.
+    Args:
+        hit (dict): A hit of an OpenSearch video search.
+    Returns:
+        dict: Equal to VideoSearchResult(...).model_dump() for a valid hit.
+    """
+    source = hit["_source"]
+    return {
+        "videoName": source["videoName"],
+        "title": source["title"],
+        "summary": source["summary"],
+        "keywords": list(source["keywords"]),
+        "durationSec": float(source["durationSec"]),
+        "s3URI": source["s3URI"],
+        "keyframeURL": source["keyframeURL"],
+        "score": float(hit["_score"]),
+    }
+
+
+def segment_group_dict(hit: dict) -> dict:
+    """Returns the VideoSegmentGroup dict for a video hit and its inner hits,
+    without validation.
+    Args:
+        hit (dict): A hit of an OpenSearch segment search, with inner hits.
+    Returns:
+        dict: Equal to VideoSegmentGroup(...).model_dump() for a valid hit.
+    """
+    group = video_result_dict(hit)
+    segments = group["segments"] = []
+    for segment in hit["inner_hits"]["embeddings"]["hits"]["hits"]:
+        fields = segment["fields"]
+        segments.append(
+            {
+                "segmentId": int(segment["_nested"]["offset"]),
+                "startSec": float(fields["embeddings.startSec"][0]),
+                "endSec": float(fields["embeddings.endSec"][0]),
+                "embeddingOption": fields["embeddings.embeddingOption"][0],
+                "segmentScore": float(segment["_score"]),
+            }
+        )
+    return group
+
+
+def flatten_segment_groups(groups: list[dict]) -> list[dict]:
+    """Converts grouped segment results to the flat shape, one dict per segment
+    with its video's metadata, as VideoSegmentSearchResults.to_dict() gives them.
+    Args:
+        groups (list[dict]): VideoSegmentGroup dicts.
+    Returns:
+        list[dict]: VideoSegmentSearchResult dicts, in the same order.
+    """
+    results = []
+    for group in groups:
+        video = {key: value for key, value in group.items() if key != "segments"}
+        for segment in group["segments"]:
+            result = dict(video)
+            if "keywords" in video:
+                result["keywords"] = list(video["keywords"])
+            result.update(segment)
+            results.append(result)
+    return results
+
+
+def segment_result_dicts(hit: dict) -> list[dict]:
+    """Returns the VideoSegmentSearchResult dicts for the inner hits of a video hit,
+    without validation.
+    Args:
+        hit (dict): A hit of an OpenSearch segment search, with inner hits.
+    Returns:
+        list[dict]: Equal to VideoSegmentSearchResult(...).model_dump() per segment.
+    """
+    video = video_result_dict(hit)
+    results = []
+    for segment in hit["inner_hits"]["embeddings"]["hits"]["hits"]:
+        fields = segment["fields"]
+        result = dict(video)
+        result["keywords"] = list(video["keywords"])
+        result["segmentId"] = int(segment["_nested"]["offset"])
+        result["startSec"] = float(fields["embeddings.startSec"][0])
+        result["endSec"] = float(fields["embeddings.endSec"][0])
+        result["embeddingOption"] = fields["embeddings.embeddingOption"][0]
+        result["segmentScore"] = float(segment["_score"])
+        results.append(result)
+    return results
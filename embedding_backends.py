@@ -0,0 +1,286 @@
+import abc
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+
+from agent_streaming import report_progress
+from embedding_cache import EmbeddingCache
+from telemetry import record, stage
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Amazon Bedrock model ID, also the cache key of every Marengo embedding
+MODEL_ID_MARENGO = "twelvelabs.marengo-embed-2-7-v1:0"
+MARENGO_DIMENSIONS = 1_024
+
+# Embedding backend: "sync" (InvokeModel), "async" (StartAsyncInvoke and S3), or
+# "local" (deterministic vectors for offline tests)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "async").lower()
+# Used when the backend fails with an AWS error; "none" to raise instead
+EMBEDDING_FALLBACK = os.getenv("EMBEDDING_FALLBACK", "async").lower()
+# InvokeModel needs the cross-region inference profile of the model
+MODEL_ID_MARENGO_INVOKE = os.getenv(
+    "MODEL_ID_MARENGO_INVOKE", "us.twelvelabs.marengo-embed-2-7-v1:0"
+)
+LOCAL_EMBEDDING_DIMENSIONS = int(
+    os.getenv("LOCAL_EMBEDDING_DIMENSIONS", str(MARENGO_DIMENSIONS))
+)
+
+# Errors after which a backend is not retried: the model or API isn't available
+UNSUPPORTED_ERROR_CODES = (
+    "AccessDeniedException",
+    "ResourceNotFoundException",
+    "UnknownOperationException",
+)
+# Bedrock rejects a model without InvokeModel support as an invalid request, so
+# these also mean unsupported on a backend's first call; after a success, they
+# mean an invalid text and are raised to the caller
+PROBE_UNSUPPORTED_ERROR_CODES = ("ValidationException",)
+
+
+class EmbeddingBackend(abc.ABC):
+    """Turns query text into an embedding vector.
+    model_id names the embedding space; it keys the embedding cache and handles,
+    so backends with the same model_id must return interchangeable vectors.
+    batch_jobs says whether batches should go through BatchEmbedder's shared job
+    poller, or embed each text with embed_async.
+    """
+
+    name = "backend"
+    model_id = MODEL_ID_MARENGO
+    dimensions = MARENGO_DIMENSIONS
+    batch_jobs = False
+
+    @abc.abstractmethod
+    async def embed_async(self, text: str) -> list[float]:
+        """Embeds a text, bypassing the embedding cache.
+        Args:
+            text (str): The text to embed.
+        Returns:
+            list[float]: The embedding, with dimensions values.
+        """
+
+
+class AsyncInvokeBackend(EmbeddingBackend):
+    """Marengo through StartAsyncInvoke: submit a job, poll it, download the
+    output from S3. Works for every model version, but takes seconds."""
+
+    name = "async"
+    batch_jobs = True
+
+    def __init__(self, tools):
+        self.tools = tools
+
+    async def embed_async(self, text: str) -> list[float]:
+        return await self.tools.embedding_jobs.generate_text_embedding_s3_async(text)
+
+
+class InvokeModelBackend(EmbeddingBackend):
+    """Marengo through InvokeModel, with the vector returned inline. Supported for
+    text input by models and versions that offer synchronous inference."""
+
+    name = "sync"
+
+    def __init__(self, tools, invoke_model_id: str = MODEL_ID_MARENGO_INVOKE):
+        self.tools = tools
+        self.invoke_model_id = invoke_model_id
+
+    def invoke(self, text: str) -> list[float]:
+        """Calls InvokeModel and returns the embedding.
+        Args:
+            text (str): The text to embed.
+        Returns:
+            list[float]: The embedding.
+        Raises:
+            botocore.exceptions.ClientError: If the model rejects the request.
+        """
+        try:
+            response = self.tools.bedrock_runtime_client.invoke_model(
+                modelId=self.invoke_model_id,
+                body=json.dumps({"inputType": "text", "inputText": text}),
+                contentType="application/json",
+                accept="application/json",
+            )
+        except ClientError as err:
+            self.tools.logger.error(f"Failed to invoke embedding model: {err}")
+            raise err
+        body = response["body"].read()
+        record("search_response_bytes", len(body), source="bedrock")
+        output = json.loads(body)
+        # Marengo returns {"data": [{"embedding": [...]}]}, like the S3 output
+        if "data" in output:
+            output = output["data"][0]
+        return output["embedding"]
+
+    async def embed_async(self, text: str) -> list[float]:
+        self.tools.logger.info(f'Invoking the embedding model for: "{text}"')
+        with stage("bedrock_invoke_model"):
+            embedding = await asyncio.to_thread(self.invoke, text)
+        report_progress("Embedding received")
+        return embedding
+
+
+class LocalHashBackend(EmbeddingBackend):
+    """Deterministic unit vectors derived from a hash of the normalized text.
+    Needs no AWS access, so offline tests and benchmarks can run the whole search
+    path. The vectors carry no meaning, and never match a real Marengo index.
+    """
+
+    name = "local"
+    model_id = "local-hash"
+
+    def __init__(self, dimensions: int = LOCAL_EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def embed(self, text: str) -> list[float]:
+        """Returns the embedding of a text."""
+        digest = hashlib.sha256(EmbeddingCache.normalize_text(text).encode("utf-8"))
+        seed = int.from_bytes(digest.digest()[:8], "big")
+        vector = np.random.default_rng(seed).standard_normal(self.dimensions)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    async def embed_async(self, text: str) -> list[float]:
+        return self.embed(text)
+
+
+class FallbackBackend(EmbeddingBackend):
+    """Embeds with a primary backend, and with a fallback when AWS rejects a call.
+    Errors that mean the primary is unavailable, such as a model without
+    InvokeModel support, switch to the fallback for good; an invalid request is
+    raised once the primary has succeeded; other AWS errors, such as throttling,
+    fall back for that call only. Any other exception is raised.
+    """
+
+    def __init__(
+        self,
+        primary: EmbeddingBackend,
+        fallback: EmbeddingBackend,
+        logger: logging.Logger,
+    ):
+        if (primary.model_id, primary.dimensions) != (
+            fallback.model_id,
+            fallback.dimensions,
+        ):
+            raise ValueError(
+                f"Cannot fall back from {primary.name} to {fallback.name}: "
+                "their embeddings are not interchangeable"
+            )
+        self.primary = primary
+        self.fallback = fallback
+        self.logger = logger
+        self.model_id = primary.model_id
+        self.dimensions = primary.dimensions
+        self._switched = False
+        self._succeeded = False
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> EmbeddingBackend:
+        """The backend new requests go to."""
+        return self.fallback if self._switched else self.primary
+
+    @property
+    def name(self) -> str:
+        return self.active.name
+
+    @property
+    def batch_jobs(self) -> bool:
+        return self.active.batch_jobs
+
+    async def embed_async(self, text: str) -> list[float]:
+        if self._switched:
+            return await self.fallback.embed_async(text)
+        try:
+            embedding = await self.primary.embed_async(text)
+        except ClientError as err:
+            if is_unsupported(err, probing=not self._succeeded):
+                with self._lock:
+                    switched, self._switched = self._switched, True
+                if not switched:
+                    self.logger.warning(
+                        f"The {self.primary.name} embedding backend is unavailable, "
+                        f"using {self.fallback.name} from now on: {err}"
+                    )
+            elif error_code(err) in PROBE_UNSUPPORTED_ERROR_CODES:
+                raise
+            else:
+                self.logger.warning(
+                    f"The {self.primary.name} embedding backend failed, "
+                    f"using {self.fallback.name} for this text: {err}"
+                )
+            return await self.fallback.embed_async(text)
+        self._succeeded = True
+        return embedding
+
+
+def error_code(err: ClientError) -> Optional[str]:
+    """Returns the AWS error code of a ClientError."""
+    return err.response.get("Error", {}).get("Code")
+
+
+def is_unsupported(err: ClientError, probing: bool = False) -> bool:
+    """Whether an error means the backend can't serve any request.
+    Args:
+        err (ClientError): The error raised by the backend.
+        probing (bool): Whether the backend has yet to succeed.
+    Returns:
+        bool: True for UNSUPPORTED_ERROR_CODES, and for
+        PROBE_UNSUPPORTED_ERROR_CODES while probing.
+    """
+    code = error_code(err)
+    if code in UNSUPPORTED_ERROR_CODES:
+        return True
+    return probing and code in PROBE_UNSUPPORTED_ERROR_CODES
+
+
+def embedding_dimensions(backend: str = EMBEDDING_BACKEND) -> int:
+    """Returns the embedding dimensions of a configured backend.
+    Args:
+        backend (str): The backend name; defaults to EMBEDDING_BACKEND.
+    Returns:
+        int: The dimensions of its embeddings.
+    """
+    if backend == "local":
+        return LOCAL_EMBEDDING_DIMENSIONS
+    return MARENGO_DIMENSIONS
+
+
+def create_embedding_backend(
+    tools,
+    backend: str = EMBEDDING_BACKEND,
+    fallback: Optional[str] = EMBEDDING_FALLBACK,
+) -> EmbeddingBackend:
+    """Creates the configured embedding backend for a CustomTools instance.
+    Backends read the AWS clients from tools on every call, so clients swapped in
+    later, as in the benchmarks, are used.
+    Args:
+        tools (CustomTools): Provides the AWS clients, logger and polling.
+        backend (str): "sync", "async" or "local".
+        fallback (str): The backend to fall back to, or "none" or None.
+    Returns:
+        EmbeddingBackend: The backend, wrapped in a FallbackBackend if there is one.
+    Raises:
+        ValueError: If a backend name is unknown.
+    """
+    backends = {
+        "async": lambda: AsyncInvokeBackend(tools),
+        "sync": lambda: InvokeModelBackend(tools),
+        "local": LocalHashBackend,
+    }
+    for name in (backend, fallback):
+        if name not in backends and name not in ("none", None):
+            raise ValueError(f"Unknown embedding backend: {name}")
+    primary = backends[backend]()
+    # Local embeddings never fail, and no other backend shares their space
+    if fallback in ("none", None) or backend in (fallback, "local"):
+        return primary
+    return FallbackBackend(primary, backends[fallback](), tools.logger)
@@ -0,0 +1,432 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Cache configuration
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./.embedding_cache")
+# Most files kept on disk, about 20 KB each; the oldest are removed first, 0 keeps all
+EMBEDDING_CACHE_DISK_SIZE = int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "10000"))
+# Embeddings each conversation keeps addressable by handle
+EMBEDDING_HANDLE_LIMIT = int(os.getenv("EMBEDDING_HANDLE_LIMIT", "16"))
+
+
+class EmbeddingCache:
+    """A two-tier cache for query text embeddings.
+
+    The first tier is an in-memory LRU, the second a directory of JSON files that
+    survives restarts and can be shared by several worker processes. Entries are
+    keyed by the normalized query text and the model ID. Concurrent lookups of the
+    same key join a single in-flight computation instead of starting their own.
+    Files are read and written outside the lock, so a memory hit never waits for
+    the disk. The disk tier keeps the max_disk_entries most recently used files.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = EMBEDDING_CACHE_SIZE,
+        cache_dir: Optional[str] = EMBEDDING_CACHE_DIR,
+        logger: Optional[logging.Logger] = None,
+        max_disk_entries: int = EMBEDDING_CACHE_DISK_SIZE,
+    ):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir or None
+        self.logger = logger or logging.getLogger(__name__)
+        self.max_disk_entries = max_disk_entries
+        # Writes between prunes of the disk tier
+        self._prune_every = max(max_disk_entries // 10, 1)
+        self._writes = 0
+
+        self._memory: OrderedDict[str, list[float]] = OrderedDict()
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "in_flight_joins": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+            "errors": 0,
+        }
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.prune_disk()
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Normalizes query text so trivially different queries share an entry.
+        Args:
+            text (str): The query text.
+        Returns:
+            str: The lower-cased text with collapsed whitespace.
+        """
+        return " ".join(text.lower().split())
+
+    @staticmethod
+    def make_key(text: str, model_id: str) -> str:
+        """Builds the cache key for a query text and model ID.
+        Args:
+            text (str): The query text.
+            model_id (str): The embedding model ID.
+        Returns:
+            str: The hex digest identifying the entry.
+        """
+        normalized = EmbeddingCache.normalize_text(text)
+        return hashlib.sha256(f"{model_id}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str, model_id: str) -> Optional[list[float]]:
+        """Looks up an embedding in the memory tier, then the disk tier.
+        Args:
+            text (str): The query text.
+            model_id (str): The embedding model ID.
+        Returns:
+            Optional[list[float]]: The cached embedding, or None on a miss.
+        """
+        key = self.make_key(text, model_id)
+        with self._lock:
+            embedding = self._lookup(key)
+        if embedding is not None:
+            return embedding
+
+        embedding = self._read_disk(key)
+        with self._lock:
+            if embedding is None:
+                self._stats["misses"] += 1
+            else:
+                self._remember(key, embedding)
+                self._stats["disk_hits"] += 1
+        return embedding
+
+    def put(self, text: str, model_id: str, embedding: list[float]) -> None:
+        """Stores an embedding in both tiers.
+        Args:
+            text (str): The query text.
+            model_id (str): The embedding model ID.
+            embedding (list[float]): The embedding to store.
+        """
+        key = self.make_key(text, model_id)
+        with self._lock:
+            self._remember(key, embedding)
+        self._write_disk(key, text, model_id, embedding)
+
+    def get_or_compute(
+        self,
+        text: str,
+        model_id: str,
+        compute: Callable[[str], list[float]],
+    ) -> list[float]:
+        """Returns the cached embedding, computing it at most once per key.
+        If another thread is already computing the same key, this call waits for
+        that result instead of calling compute again.
+        Args:
+            text (str): The query text.
+            model_id (str): The embedding model ID.
+            compute (Callable[[str], list[float]]): Produces the embedding for the text.
+        Returns:
+            list[float]: The embedding.
+        """
+        key, future, is_owner = self._claim(text, model_id)
+        if not is_owner:
+            return future.result()
+        embedding = self._read_disk(key)
+        if embedding is not None:
+            self._release(key, future, embedding=embedding, from_disk=True)
+            return embedding
+
+        try:
+            embedding = compute(text)
+        except BaseException as err:
+            self._release(key, future, error=err)
+            raise
+        self._release(key, future, text=text, model_id=model_id, embedding=embedding)
+        return embedding
+
+    async def get_or_compute_async(
+        self,
+        text: str,
+        model_id: str,
+        compute: Callable[[str], Awaitable[list[float]]],
+    ) -> list[float]:
+        """Async variant of get_or_compute for coroutine-based embedding functions.
+        Joins in-flight computations started by both sync and async callers.
+        Args:
+            text (str): The query text.
+            model_id (str): The embedding model ID.
+            compute (Callable[[str], Awaitable[list[float]]]): Produces the embedding.
+        Returns:
+            list[float]: The embedding.
+        """
+        key, future, is_owner = self._claim(text, model_id)
+        if not is_owner:
+            return await asyncio.wrap_future(future)
+        embedding = await asyncio.to_thread(self._read_disk, key)
+        if embedding is not None:
+            self._release(key, future, embedding=embedding, from_disk=True)
+            return embedding
+
+        try:
+            embedding = await compute(text)
+        except BaseException as err:
+            self._release(key, future, error=err)
+            raise
+        self._release(key, future, text=text, model_id=model_id, embedding=embedding)
+        return embedding
+
+    def stats(self) -> dict:
+        """Returns the cache counters and current sizes.
+        Returns:
+            dict: Hit, miss, eviction and size counters.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["max_entries"] = self.max_entries
+            stats["max_disk_entries"] = self.max_disk_entries
+            stats["in_flight"] = len(self._in_flight)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = (
+            (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        )
+        return stats
+
+    def clear(self, include_disk: bool = False) -> None:
+        """Empties the memory tier and, optionally, the disk tier.
+        Args:
+            include_disk (bool): Also delete the cached files on disk.
+        """
+        with self._lock:
+            self._memory.clear()
+        if include_disk and self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".json"):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+
+    def prune_disk(self) -> int:
+        """Removes the least recently used files beyond max_disk_entries.
+        Several processes may prune the same directory; files another process
+        removed first are skipped.
+        Returns:
+            int: The number of files removed.
+        """
+        if not self.cache_dir or self.max_disk_entries <= 0:
+            return 0
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as scan:
+                for entry in scan:
+                    if entry.name.endswith(".json"):
+                        try:
+                            entries.append((entry.stat().st_mtime, entry.path))
+                        except OSError:
+                            pass
+        except OSError as err:
+            self.logger.warning(f"Failed to list the embedding cache: {err}")
+            return 0
+        if len(entries) <= self.max_disk_entries:
+            return 0
+        entries.sort()
+        removed = 0
+        for _, path in entries[: len(entries) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        with self._lock:
+            self._stats["disk_evictions"] += removed
+        return removed
+
+    def _claim(self, text: str, model_id: str) -> tuple[str, Future, bool]:
+        """Resolves a key to a future, registering a new in-flight entry on a miss
+        in the memory tier. The owner then checks the disk tier, outside the lock.
+        Returns:
+            tuple[str, Future, bool]: The key, the future holding the embedding, and
+            whether the caller owns the lookup and must release it.
+        """
+        key = self.make_key(text, model_id)
+        with self._lock:
+            embedding = self._lookup(key)
+            future: Future = Future()
+            if embedding is not None:
+                future.set_result(embedding)
+                return key, future, False
+            if key in self._in_flight:
+                self._stats["in_flight_joins"] += 1
+                return key, self._in_flight[key], False
+            self._in_flight[key] = future
+            return key, future, True
+
+    def _release(
+        self,
+        key: str,
+        future: Future,
+        text: str = "",
+        model_id: str = "",
+        embedding: Optional[list[float]] = None,
+        error: Optional[BaseException] = None,
+        from_disk: bool = False,
+    ) -> None:
+        """Completes an in-flight entry and wakes up any joined callers."""
+        with self._lock:
+            self._in_flight.pop(key, None)
+            self._stats["disk_hits" if from_disk else "misses"] += 1
+            if error is None:
+                self._remember(key, embedding)
+            else:
+                self._stats["errors"] += 1
+        if error is None:
+            if not from_disk:
+                self._write_disk(key, text, model_id, embedding)
+            future.set_result(embedding)
+        else:
+            future.set_exception(error)
+
+    def _lookup(self, key: str) -> Optional[list[float]]:
+        """Checks the memory tier for a key. The caller must hold the lock."""
+        embedding = self._memory.get(key)
+        if embedding is not None:
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+        return embedding
+
+    def _remember(self, key: str, embedding: list[float]) -> None:
+        """Adds an entry to the memory tier. The caller must hold the lock."""
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[list[float]]:
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                embedding = json.load(f)["embedding"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as err:
+            self.logger.warning(f"Ignoring unreadable embedding cache entry: {err}")
+            return None
+        try:
+            # Marks the file as recently used, so pruning keeps it
+            os.utime(path)
+        except OSError:
+            pass
+        return embedding
+
+    def _write_disk(
+        self, key: str, text: str, model_id: str, embedding: list[float]
+    ) -> None:
+        """Writes an entry atomically so concurrent processes never see partial files."""
+        if not self.cache_dir:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "modelId": model_id,
+                        "text": self.normalize_text(text),
+                        "embedding": embedding,
+                    },
+                    f,
+                )
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as err:
+            self.logger.warning(f"Failed to write embedding cache entry: {err}")
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self._prune_every == 0
+        if prune:
+            self.prune_disk()
+
+
+class EmbeddingHandles:
+    """A bounded store of the embeddings created in one conversation.
+    Tools hand out short handles instead of the vectors themselves, and the search
+    tools resolve a handle back to its vector. Handles are derived from the cache
+    key, so the same text always gets the same handle. The oldest handles are
+    dropped first.
+    """
+
+    def __init__(self, max_entries: int = EMBEDDING_HANDLE_LIMIT):
+        self.max_entries = max_entries
+        self._embeddings: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, text: str, model_id: str, embedding: list[float]) -> str:
+        """Stores an embedding and returns its handle.
+        Args:
+            text (str): The embedded text.
+            model_id (str): The embedding model ID.
+            embedding (list[float]): The embedding.
+        Returns:
+            str: The handle, e.g. "emb-3f2a9c1b7d4e".
+        """
+        handle = f"emb-{EmbeddingCache.make_key(text, model_id)[:12]}"
+        with self._lock:
+            self._embeddings[handle] = embedding
+            self._embeddings.move_to_end(handle)
+            while len(self._embeddings) > self.max_entries:
+                self._embeddings.popitem(last=False)
+        return handle
+
+    def resolve(self, handle: str) -> list[float]:
+        """Returns the embedding for a handle.
+        Args:
+            handle (str): A handle returned by add.
+        Returns:
+            list[float]: The embedding.
+        Raises:
+            ValueError: If the handle is unknown or was dropped.
+        """
+        with self._lock:
+            embedding = self._embeddings.get(handle.strip().strip("'\""))
+        if embedding is None:
+            raise ValueError(
+                f"Unknown embedding handle {handle!r}. Create the text embedding again."
+            )
+        return embedding
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._embeddings)
+
+
+_default_cache: Optional[EmbeddingCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Returns the process-wide embedding cache, creating it on first use.
+    Returns:
+        EmbeddingCache: The shared cache instance.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+        return _default_cache
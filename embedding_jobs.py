@@ -0,0 +1,232 @@
+import asyncio
+import json
+import os
+from typing import Optional
+
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+
+from agent_streaming import report_progress
+from embedding_backends import MODEL_ID_MARENGO
+from event_loop import get_background_loop, on_background_loop
+from telemetry import record, stage
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Sensitive environment variables
+S3_VIDEO_STORAGE_BUCKET_MARENGO = os.getenv("S3_VIDEO_STORAGE_BUCKET_MARENGO")
+
+# Embeddings output location on S3
+S3_DESTINATION_PREFIX = "embeddings"
+
+
+class EmbeddingJobs:
+    """Embeds texts with Marengo async invocations: starts a job, polls it until it
+    finishes, and downloads its output from S3.
+    The clients, logger and polling strategy are read from the tools on each call,
+    so clients assigned to the tools later, e.g. by the benchmarks, are used.
+    """
+
+    def __init__(self, tools):
+        self.tools = tools
+
+    def generate_text_embedding_bedrock(self, search_text) -> dict:
+        """Generates a text embedding using the Marengo model.
+        Args:
+            search_text (str): The search query text.
+        Returns:
+            dict: The response from the video analysis job.
+        """
+        try:
+            response = self.tools.bedrock_runtime_client.start_async_invoke(
+                modelId=MODEL_ID_MARENGO,
+                modelInput={
+                    "inputType": "text",
+                    "inputText": search_text,
+                },
+                outputDataConfig={
+                    "s3OutputDataConfig": {
+                        "s3Uri": f"s3://{S3_VIDEO_STORAGE_BUCKET_MARENGO}/{S3_DESTINATION_PREFIX}/",
+                    }
+                },
+            )
+            return response
+        except ClientError as err:
+            self.tools.logger.error(f"Failed to generate text embedding: {err}")
+            raise err
+
+    def download_search_embedding_from_s3(self, s3_key: str) -> dict:
+        """Download the output file from S3 and save it locally.
+        Args:
+            s3_key (str): The S3 key of the output file.
+        Returns:
+            VideoEmbeddings: The video embedding object.
+        """
+        try:
+            s3_object = self.tools.s3_client_us_east_1.get_object(
+                Bucket=S3_VIDEO_STORAGE_BUCKET_MARENGO,
+                Key=s3_key,
+            )
+            body = s3_object["Body"].read()
+            record("search_response_bytes", len(body), source="s3")
+            embedding = json.loads(body.decode("utf-8"))
+            return embedding
+        except ClientError as err:
+            self.tools.logger.error(f"Failed to download text embedding from S3: {err}")
+            raise err
+
+    @staticmethod
+    def output_s3_key(invocation_arn: str) -> str:
+        """Returns the S3 key of the output file written by an async invocation.
+        Args:
+            invocation_arn (str): The ARN of the job invocation.
+        Returns:
+            str: The S3 key of the job's output.json file.
+        """
+        return f"{S3_DESTINATION_PREFIX}/{invocation_arn.split('/')[-1]}/output.json"
+
+    def s3_object_exists(self, s3_key: str) -> bool:
+        """Checks whether an object exists in the embeddings bucket.
+        Args:
+            s3_key (str): The S3 key of the object.
+        Returns:
+            bool: True if the object exists.
+        """
+        try:
+            self.tools.s3_client_us_east_1.head_object(
+                Bucket=S3_VIDEO_STORAGE_BUCKET_MARENGO,
+                Key=s3_key,
+            )
+            return True
+        except ClientError as err:
+            if err.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return False
+            self.tools.logger.error(f"Failed to check S3 object: {err}")
+            raise err
+
+    def poll_job_status(
+        self, invocation_arn: str, s3_key: Optional[str] = None
+    ) -> str:
+        """Poll the job status until it is completed or failed.
+        Synchronous wrapper around poll_job_status_async.
+        Args:
+            invocation_arn (str): The ARN of the job invocation.
+            s3_key (str): The S3 key of the job's output file, used for S3 probing.
+        Returns:
+            str: The final job status.
+        """
+        return get_background_loop().run(
+            self.poll_job_status_async(invocation_arn, s3_key=s3_key)
+        )
+
+    @on_background_loop
+    async def poll_job_status_async(
+        self, invocation_arn: str, s3_key: Optional[str] = None
+    ) -> str:
+        """Poll the job status until it is completed or failed, without blocking.
+        Probes follow the configured polling strategy: a first probe around the typical
+        completion time, then exponential backoff with jitter, bounded by a deadline and
+        a maximum number of calls. When S3 probing is enabled and s3_key is given, most
+        probes check for the output file instead of calling the status API.
+        Args:
+            invocation_arn (str): The ARN of the job invocation.
+            s3_key (str): The S3 key of the job's output file, used for S3 probing.
+        Returns:
+            str: The final job status.
+        Raises:
+            TimeoutError: If the job does not finish within the deadline or call budget.
+        """
+        schedule = self.tools.polling_strategy.schedule()
+        try:
+            while True:
+                delay = schedule.next_delay()
+                if delay is None:
+                    raise TimeoutError(
+                        f"Job {invocation_arn.split('/')[-1]} did not finish after "
+                        f"{schedule.calls} probes and {schedule.elapsed():.1f} seconds"
+                    )
+                await asyncio.sleep(delay)
+
+                report_progress(
+                    f"Polling embedding job ({schedule.elapsed():.1f} seconds)"
+                )
+                if s3_key and not schedule.is_status_check_due():
+                    with stage("poll_probe", probe="s3"):
+                        exists = await asyncio.to_thread(self.s3_object_exists, s3_key)
+                    if exists:
+                        status = "Completed"
+                        self.tools.logger.info("Job output found in S3.")
+                        break
+                    continue
+
+                with stage("poll_probe", probe="status"):
+                    response = await asyncio.to_thread(
+                        self.tools.bedrock_runtime_client.get_async_invoke,
+                        invocationArn=invocation_arn,
+                    )
+                status = response["status"]
+
+                self.tools.logger.info(f"Invocation status: {status}")
+
+                if status == "Completed":
+                    self.tools.logger.info("Job completed!")
+                    break
+                elif status == "Failed":
+                    self.tools.logger.info(
+                        f"Job failed: {response.get('failureMessage')}"
+                    )
+                    break
+
+            if status == "Completed":
+                self.tools.polling_strategy.record_completion(schedule.elapsed())
+            record("search_poll_probes", schedule.calls)
+            self.tools.logger.info(
+                f"Polling finished after {schedule.calls} probes "
+                f"in {schedule.elapsed():.2f} seconds"
+            )
+            return status
+        except ClientError as err:
+            self.tools.logger.error(f"Failed to poll job status: {err}")
+            raise err
+
+
+    @on_background_loop
+    async def generate_text_embedding_s3_async(self, search_text: str) -> list[float]:
+        """Generates a text embedding with an async invocation, whose output is
+        downloaded from S3. This is the "async" embedding backend.
+        Args:
+            search_text (str): The text to be embedded.
+        Returns:
+            list[float]: The text embedding.
+        Raises:
+            botocore.exceptions.ClientError: If the job fails or the S3 download fails.
+        """
+        # Generate embeddings for the search text using Amazon Bedrock
+        self.tools.logger.info(
+            f'Generating text embedding using Amazon Bedrock for: "{search_text}"'
+        )
+        with stage("bedrock_start_async_invoke"):
+            response = await asyncio.to_thread(
+                self.generate_text_embedding_bedrock, search_text
+            )
+        invocation_arn = response["invocationArn"]
+        self.tools.logger.info(f"Invocation ARN: {invocation_arn.split('/')[-1]}")
+        report_progress("Embedding job submitted")
+
+        # Poll the job status until it is completed; covers Bedrock queueing and run
+        s3_key = self.output_s3_key(invocation_arn)
+        with stage("bedrock_job_wait", invocation_arn=invocation_arn):
+            response = await self.poll_job_status_async(invocation_arn, s3_key=s3_key)
+        self.tools.logger.info(f"Job completed with status: {response}")
+
+        # Download the output.json file from S3
+        self.tools.logger.info(f"Downloading embedding from S3 key: {s3_key}")
+        with stage("s3_download"):
+            text_embedding = await asyncio.to_thread(
+                self.download_search_embedding_from_s3, s3_key
+            )
+        report_progress("Embedding downloaded")
+
+        # Extract the text embedding from the response
+        return text_embedding["data"][0]["embedding"]
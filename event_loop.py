@@ -0,0 +1,132 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Iterator,
+    Optional,
+    TypeVar,
+)
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Worker threads for blocking calls (boto3) made from the event loop
+AWS_MAX_WORKERS = int(os.getenv("AWS_MAX_WORKERS", "32"))
+
+T = TypeVar("T")
+
+
+class BackgroundEventLoop:
+    """An asyncio event loop running in a daemon thread.
+    All async I/O of the search tools runs on this one loop, so async clients and
+    their connection pools are shared by every caller, whether the caller is
+    synchronous code or a coroutine running on a different event loop.
+    """
+
+    def __init__(self, max_workers: int = AWS_MAX_WORKERS):
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="aws-io")
+        )
+        self._thread = threading.Thread(
+            target=self._run_forever, name="background-event-loop", daemon=True
+        )
+        self._thread.start()
+
+    def _run_forever(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def is_current(self) -> bool:
+        """Whether the caller is running on this loop's thread."""
+        return threading.current_thread() is self._thread
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """Runs a coroutine on the loop and blocks until it finishes.
+        Args:
+            coro (Coroutine): The coroutine to run.
+            timeout (float): Seconds to wait before giving up, or None to wait forever.
+        Returns:
+            The coroutine's result.
+        Raises:
+            RuntimeError: If called from the loop's own thread, which would deadlock.
+        """
+        if self.is_current():
+            coro.close()
+            raise RuntimeError("Cannot block on the background event loop from itself")
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result(timeout)
+
+    def iterate(self, iterator: AsyncIterator[T]) -> Iterator[T]:
+        """Iterates an async iterator on the loop, blocking for each item.
+        Closing the returned iterator early closes the async iterator on the loop.
+        Args:
+            iterator (AsyncIterator): The async iterator, such as an async generator.
+        Yields:
+            Each item of the async iterator.
+        """
+        done = object()
+
+        async def next_item():
+            return await anext(iterator, done)
+
+        try:
+            while (item := self.run(next_item())) is not done:
+                yield item
+        finally:
+            if hasattr(iterator, "aclose"):
+                self.run(iterator.aclose())
+
+    async def run_async(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Awaits a coroutine on the loop from any other event loop.
+        Args:
+            coro (Coroutine): The coroutine to run.
+        Returns:
+            The coroutine's result.
+        """
+        if self.is_current():
+            return await coro
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return await asyncio.wrap_future(future)
+
+
+_background_loop: Optional[BackgroundEventLoop] = None
+_background_loop_lock = threading.Lock()
+
+
+def get_background_loop() -> BackgroundEventLoop:
+    """Returns the process-wide background event loop, starting it on first use.
+    Returns:
+        BackgroundEventLoop: The shared loop.
+    """
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = BackgroundEventLoop()
+        return _background_loop
+
+
+def on_background_loop(
+    func: Callable[..., Awaitable[T]],
+) -> Callable[..., Awaitable[T]]:
+    """Decorates a coroutine function so it always executes on the background loop.
+    Args:
+        func (Callable): The coroutine function.
+    Returns:
+        Callable: A coroutine function with the same signature.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await get_background_loop().run_async(func(*args, **kwargs))
+
+    return wrapper
@@ -1,9 +1,14 @@
 # Code Reference: https://github.com/louis-she/gradio-log/blob/master/demo/app.py
 
-import io
 import logging
 from pathlib import Path
-import sys
+
+from log_pipeline import (
+    BatchFileHandler,
+    StreamToLogger,
+    attach_log_pipeline,
+    capture_stdio,
+)
 
 
 class GradioLogger:
@@ -25,40 +30,28 @@ class GradioLogger:
             logging.CRITICAL: bold_red + format_string + reset,
         }
 
+        def __init__(self):
+            super().__init__()
+            # Built once, instead of a new Formatter for every record
+            self._formatters = {
+                level: logging.Formatter(log_fmt)
+                for level, log_fmt in self.FORMATS.items()
+            }
+            self._default_formatter = logging.Formatter()
+
         def format(self, record):
-            log_fmt = self.FORMATS.get(record.levelno)
-            formatter = logging.Formatter(log_fmt)
+            formatter = self._formatters.get(record.levelno, self._default_formatter)
             return formatter.format(record)
 
-    class StreamToLogger(io.StringIO):
-        """
-        Redirect a stream (stdout or stderr) to logging.
-        """
-
-        # --------- NEW: Capture stdout, stderr, and warnings ---------
-
-        def __init__(self, logger, log_level):
-            super().__init__()
-            self.logger = logger
-            self.log_level = log_level
-            self._buffer = ""
-
-        def write(self, buf):
-            self._buffer += buf
-            while "\n" in self._buffer:
-                line, self._buffer = self._buffer.split("\n", 1)
-                if line.strip():
-                    self.logger.log(self.log_level, line)
-
-        def flush(self):
-            if self._buffer.strip():
-                self.logger.log(self.log_level, self._buffer.strip())
-                self._buffer = ""
+    # Kept as an attribute for callers that used GradioLogger.StreamToLogger
+    StreamToLogger = StreamToLogger
 
     @staticmethod
-    def setup_logging() -> logging.Logger:
+    def setup_logging(truncate: bool = False) -> logging.Logger:
         """Set up logging for the application.
 
+        Args:
+            truncate (bool): Whether to start with an empty log file.
         Returns:
             logging.Logger: The configured logger instance.
         """
@@ -68,19 +61,17 @@ class GradioLogger:
         log_file = "./log_file.txt"
         Path(log_file).touch()
 
-        ch = logging.FileHandler(log_file)
+        # Written in batches on the pipeline's writer thread; "w" empties the file
+        ch = BatchFileHandler(log_file, mode="w" if truncate else "a")
         ch.setLevel(logging.INFO)
         ch.setFormatter(formatter)
 
         logger = logging.getLogger(__name__)
-        
-        logger.setLevel(logging.INFO)
-        for handler in logger.handlers:
-            logger.removeHandler(handler)
-        logger.addHandler(ch)
-        sys.stdout = GradioLogger.StreamToLogger(logger, logging.INFO)
-        sys.stderr = GradioLogger.StreamToLogger(logger, logging.ERROR)
 
-        logging.captureWarnings(True)
+        logger.setLevel(logging.INFO)
+        # Replaces the logger's handlers, so calling this again is safe
+        attach_log_pipeline(logger, [ch])
+        # Unless LOG_CAPTURE_STDIO is false, as it replaces the streams process-wide
+        capture_stdio(logger, logger)
 
         return logger
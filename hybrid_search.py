@@ -0,0 +1,91 @@
+import logging
+import os
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Reciprocal-rank fusion configuration
+HYBRID_SEMANTIC_WEIGHT = float(os.getenv("HYBRID_SEMANTIC_WEIGHT", "1.0"))
+HYBRID_KEYWORD_WEIGHT = float(os.getenv("HYBRID_KEYWORD_WEIGHT", "1.0"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+# Candidates fetched from each retriever before fusion
+HYBRID_WINDOW_SIZE = int(os.getenv("HYBRID_WINDOW_SIZE", "20"))
+
+MSEARCH_FILTER_PATH = (
+    "took,responses.status,responses.error,responses.hits.hits._id"
+    ",responses.hits.hits._score,responses.hits.hits._source"
+)
+
+
+def build_msearch_body(queries: list[dict], index: str) -> list[dict]:
+    """Builds an _msearch body that runs each query against the same index.
+    Args:
+        queries (list[dict]): The OpenSearch query bodies.
+        index (str): The index name.
+    Returns:
+        list[dict]: Alternating header and query lines.
+    """
+    body = []
+    for query in queries:
+        body.append({"index": index})
+        body.append(query)
+    return body
+
+
+def reciprocal_rank_fusion(
+    responses: list[dict],
+    weights: list[float],
+    results_size: int,
+    rank_constant: int = HYBRID_RRF_K,
+) -> dict:
+    """Fuses several rankings of the same documents with weighted reciprocal-rank fusion.
+    Each document scores sum(weight / (rank_constant + rank)) over the rankings it
+    appears in, so documents found by more than one retriever rise to the top.
+    Args:
+        responses (list[dict]): One OpenSearch search response per retriever.
+        weights (list[float]): The weight of each retriever.
+        results_size (int): The number of fused results to return.
+        rank_constant (int): Dampens the advantage of the very top ranks.
+    Returns:
+        dict: An OpenSearch-shaped response with the fused, deduplicated hits.
+    """
+    scores: dict[str, float] = {}
+    hits: dict[str, dict] = {}
+    for response, weight in zip(responses, weights):
+        ranking = response.get("hits", {}).get("hits", [])
+        for rank, hit in enumerate(ranking, start=1):
+            doc_id = hit["_id"]
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (rank_constant + rank)
+            hits.setdefault(doc_id, hit)
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:results_size]
+    return {
+        "hits": {
+            "hits": [
+                dict(hits[doc_id], _score=round(scores[doc_id], 6)) for doc_id in ranked
+            ]
+        }
+    }
+
+
+def fuse_hybrid_responses(
+    multi_search_results: dict, results_size: int, logger: logging.Logger
+) -> dict:
+    """Fuses the semantic and keyword rankings of an _msearch response.
+    A failed sub-search is logged and contributes no candidates.
+    Args:
+        multi_search_results (dict): The _msearch response from OpenSearch.
+        results_size (int): The number of fused results to return.
+        logger (logging.Logger): Receives a warning for each failed sub-search.
+    Returns:
+        dict: An OpenSearch-shaped response with the fused hits.
+    """
+    responses = multi_search_results.get("responses", [])
+    for name, response in zip(("Semantic", "Keyword"), responses):
+        if "error" in response:
+            logger.warning(f"{name} part of hybrid search failed: {response}")
+    return reciprocal_rank_fusion(
+        responses, [HYBRID_SEMANTIC_WEIGHT, HYBRID_KEYWORD_WEIGHT], results_size
+    )
@@ -0,0 +1,256 @@
+# Index Snapshot Exporter
+# Exports the contents of the OpenSearch index to the compact, memory-mapped format
+# read by LocalVectorIndex. Re-exports are incremental: only videos whose sequence
+# number changed since the last export are downloaded again.
+# Usage: python index_exporter.py --output ./local_index [--full] [--dtype float16]
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Iterator, Optional
+
+from dotenv import load_dotenv
+from opensearchpy import OpenSearch, helpers
+from opensearchpy.exceptions import OpenSearchException
+
+from local_search import (
+    LOCAL_INDEX_DIR,
+    VIDEO_FIELDS,
+    LocalIndexWriter,
+    LocalVectorIndex,
+)
+from opensearch_client import get_opensearch_client
+
+# Load environment variables from .env file
+load_dotenv()
+
+OPENSEARCH_INDEX_NAME = os.getenv("OPENSEARCH_INDEX_NAME")
+
+# Export configuration
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "100"))
+EXPORT_KEEP_ALIVE = os.getenv("EXPORT_KEEP_ALIVE", "5m")
+
+# Records each exported document's version for incremental exports
+MANIFEST_FILE = "manifest.json"
+
+EMBEDDING_FIELDS = [
+    "embeddings.startSec",
+    "embeddings.endSec",
+    "embeddings.embeddingOption",
+    "embeddings.embedding",
+]
+
+
+class IndexExporter:
+    """Exports an OpenSearch index of videos to a local index directory."""
+
+    def __init__(
+        self,
+        opensearch_client: OpenSearch,
+        index_name: str,
+        logger: logging.Logger,
+        page_size: int = EXPORT_PAGE_SIZE,
+        keep_alive: str = EXPORT_KEEP_ALIVE,
+    ):
+        self.opensearch_client = opensearch_client
+        self.index_name = index_name
+        self.logger = logger
+        self.page_size = page_size
+        self.keep_alive = keep_alive
+
+    def iter_documents(self, source) -> Iterator[dict]:
+        """Streams every document in the index with point-in-time and search_after.
+        Falls back to a scroll when the cluster does not support point-in-time.
+        Args:
+            source: The _source filter for each document.
+        Yields:
+            dict: Each hit, including _seq_no and _primary_term.
+        """
+        try:
+            pit = self.opensearch_client.create_pit(
+                index=self.index_name, params={"keep_alive": self.keep_alive}
+            )
+        except OpenSearchException as err:
+            self.logger.warning(f"Point-in-time unavailable, using scroll: {err}")
+            yield from helpers.scan(
+                self.opensearch_client,
+                index=self.index_name,
+                query={"_source": source, "seq_no_primary_term": True},
+                size=self.page_size,
+                scroll=self.keep_alive,
+            )
+            return
+
+        pit_id = pit["pit_id"]
+        search_after = None
+        try:
+            while True:
+                body = {
+                    "size": self.page_size,
+                    "_source": source,
+                    "seq_no_primary_term": True,
+                    "pit": {"id": pit_id, "keep_alive": self.keep_alive},
+                    "sort": [{"_shard_doc": "asc"}],
+                }
+                if search_after is not None:
+                    body["search_after"] = search_after
+                response = self.opensearch_client.search(body=body)
+                hits = response["hits"]["hits"]
+                if not hits:
+                    break
+                yield from hits
+                search_after = hits[-1]["sort"]
+                pit_id = response.get("pit_id", pit_id)
+        finally:
+            try:
+                self.opensearch_client.delete_pit(body={"pit_id": [pit_id]})
+            except OpenSearchException as err:
+                self.logger.warning(f"Failed to delete point-in-time: {err}")
+
+    def fetch_documents(self, ids: list[str]) -> Iterator[dict]:
+        """Fetches full documents, including embeddings, by ID in batches.
+        Args:
+            ids (list[str]): The document IDs.
+        Yields:
+            dict: Each found document, shaped like a search hit.
+        """
+        source = VIDEO_FIELDS + EMBEDDING_FIELDS
+        for start in range(0, len(ids), self.page_size):
+            response = self.opensearch_client.mget(
+                index=self.index_name,
+                body={"ids": ids[start : start + self.page_size]},
+                params={"_source_includes": ",".join(source)},
+            )
+            for document in response["docs"]:
+                if document.get("found"):
+                    yield document
+
+    def export(self, output_dir: str, dtype: str = "float32", full: bool = False) -> dict:
+        """Exports the index to output_dir, reusing unchanged videos from a previous export.
+        The new export is written next to the old one and swapped in when complete.
+        Args:
+            output_dir (str): The local index directory.
+            dtype (str): The on-disk embedding type, float32 or float16.
+            full (bool): Ignore any previous export and download everything.
+        Returns:
+            dict: Counts of reused, downloaded and removed videos.
+        """
+        started = time.perf_counter()
+        previous = None if full else self._load_previous(output_dir)
+        previous_versions = previous[1] if previous else {}
+
+        # Pass 1: list every document's version without downloading embeddings
+        versions = {
+            hit["_id"]: [hit.get("_seq_no"), hit.get("_primary_term")]
+            for hit in self.iter_documents(source=False)
+        }
+        changed = [
+            doc_id
+            for doc_id, version in versions.items()
+            if previous_versions.get(doc_id) != version
+        ]
+        changed_ids = set(changed)
+        unchanged = [doc_id for doc_id in versions if doc_id not in changed_ids]
+        self.logger.info(
+            f"Exporting {self.index_name}: {len(versions)} videos, "
+            f"{len(changed)} new or changed, {len(unchanged)} unchanged"
+        )
+
+        staging_dir = output_dir.rstrip("/") + ".tmp"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        with LocalIndexWriter(staging_dir, dtype) as writer:
+            # Pass 2: copy unchanged videos from the previous export
+            if previous and unchanged:
+                self._copy_unchanged(previous[0], set(unchanged), writer)
+
+            # Pass 3: download new or changed videos
+            if previous:
+                hits = self.fetch_documents(changed)
+            else:
+                hits = self.iter_documents(source=VIDEO_FIELDS + EMBEDDING_FIELDS)
+            downloaded = 0
+            for hit in hits:
+                document = dict(hit["_source"], _id=hit["_id"])
+                writer.add_document(document)
+                versions[hit["_id"]] = [hit.get("_seq_no"), hit.get("_primary_term")]
+                downloaded += 1
+
+        with open(os.path.join(staging_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "index": self.index_name,
+                    "exportedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "versions": versions,
+                },
+                f,
+            )
+        self._swap(staging_dir, output_dir)
+
+        summary = {
+            "videos": len(writer.videos),
+            "segments": writer.segment_count,
+            "reused": len(writer.videos) - downloaded,
+            "downloaded": downloaded,
+            "removed": len(set(previous_versions) - set(versions)),
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+        self.logger.info(f"Export complete: {summary}")
+        return summary
+
+    def _load_previous(
+        self, output_dir: str
+    ) -> Optional[tuple[LocalVectorIndex, dict]]:
+        """Loads the previous export and its manifest, if both exist."""
+        manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("index") != self.index_name:
+            return None
+        return LocalVectorIndex(output_dir), manifest.get("versions", {})
+
+    @staticmethod
+    def _copy_unchanged(
+        previous: LocalVectorIndex, unchanged: set, writer: LocalIndexWriter
+    ) -> None:
+        for video_index, video in enumerate(previous.videos):
+            if video["_id"] not in unchanged:
+                continue
+            start = previous.video_offsets[video_index]
+            end = previous.video_offsets[video_index + 1]
+            writer.add_video(
+                video,
+                previous.segment_start[start:end].tolist(),
+                previous.segment_end[start:end].tolist(),
+                [previous.embedding_options[c] for c in previous.segment_option[start:end]],
+                previous.embeddings[start:end],
+            )
+
+    @staticmethod
+    def _swap(staging_dir: str, output_dir: str) -> None:
+        """Replaces output_dir with staging_dir, keeping the old copy until the swap."""
+        backup_dir = output_dir.rstrip("/") + ".old"
+        shutil.rmtree(backup_dir, ignore_errors=True)
+        if os.path.exists(output_dir):
+            os.rename(output_dir, backup_dir)
+        os.rename(staging_dir, output_dir)
+        shutil.rmtree(backup_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the OpenSearch index locally.")
+    parser.add_argument("--output", default=LOCAL_INDEX_DIR, help="Output directory")
+    parser.add_argument("--index", default=OPENSEARCH_INDEX_NAME, help="Index name")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--full", action="store_true", help="Ignore previous export")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    exporter = IndexExporter(
+        get_opensearch_client(), args.index, logging.getLogger(__name__)
+    )
+    exporter.export(args.output, dtype=args.dtype, full=args.full)
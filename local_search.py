@@ -0,0 +1,633 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from result_cache import get_result_cache
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Local search configuration
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "opensearch")  # opensearch or local
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "./local_index")
+LOCAL_SPACE_TYPE = os.getenv("LOCAL_SPACE_TYPE", "cosinesimil")  # or innerproduct
+LOCAL_CHUNK_ROWS = int(os.getenv("LOCAL_CHUNK_ROWS", "65536"))
+
+# Files that make up a local index directory
+EMBEDDINGS_FILE = "embeddings.npy"  # (segments, dimension) float32 or float16
+VIDEO_OFFSETS_FILE = "video_offsets.npy"  # (videos + 1,) int64 row offsets
+SEGMENT_START_FILE = "segment_start.npy"  # (segments,) float32
+SEGMENT_END_FILE = "segment_end.npy"  # (segments,) float32
+SEGMENT_OPTION_FILE = "segment_option.npy"  # (segments,) uint8 codes
+METADATA_FILE = "metadata.json"  # video metadata and embedding option names
+
+# Video metadata fields stored in the index and returned in _source
+VIDEO_FIELDS = [
+    "videoName",
+    "title",
+    "summary",
+    "keywords",
+    "durationSec",
+    "s3URI",
+    "keyframeURL",
+]
+
+
+class LocalIndexWriter:
+    """Streams video documents into a local index directory with bounded memory.
+    Embedding rows are appended to a raw scratch file as documents arrive and are
+    converted to a memory-mappable .npy file on close. Segments are stored
+    contiguously, grouped by video, in the order of their nested offsets, so a
+    video's segments are rows offsets[i] to offsets[i + 1]. Used as a context
+    manager, the writer closes on success and removes the scratch file on error.
+    """
+
+    def __init__(self, directory: str, dtype: str = "float32"):
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        os.makedirs(directory, exist_ok=True)
+
+        self.dimension = 0
+        self.options: list[str] = []
+        self.videos: list[dict] = []
+        self._offsets = [0]
+        self._starts: list[float] = []
+        self._ends: list[float] = []
+        self._codes: list[int] = []
+        self._scratch_path = os.path.join(directory, EMBEDDINGS_FILE + ".raw")
+        self._remove_scratch()
+
+    def __enter__(self) -> "LocalIndexWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    @property
+    def segment_count(self) -> int:
+        """The number of segments added so far."""
+        return len(self._starts)
+
+    def add_document(self, document: dict) -> None:
+        """Adds an OpenSearch-shaped video document with its nested embeddings.
+        Args:
+            document (dict): The video document, with an "embeddings" list and an
+                optional "_id".
+        """
+        segments = document.get("embeddings") or []
+        self.add_video(
+            document,
+            [segment["startSec"] for segment in segments],
+            [segment["endSec"] for segment in segments],
+            [segment["embeddingOption"] for segment in segments],
+            np.asarray([segment["embedding"] for segment in segments]),
+        )
+
+    def add_video(
+        self,
+        metadata: dict,
+        starts: list,
+        ends: list,
+        options: list,
+        vectors: np.ndarray,
+    ) -> None:
+        """Adds a video from columnar segment data.
+        Args:
+            metadata (dict): The video metadata fields and an optional "_id".
+            starts (list): The segment start times in seconds.
+            ends (list): The segment end times in seconds.
+            options (list): The segment embedding options.
+            vectors (np.ndarray): A (segments, dimension) array of embeddings.
+        """
+        if len(starts):
+            if not self.dimension:
+                self.dimension = vectors.shape[1]
+            with open(self._scratch_path, "ab") as scratch:
+                scratch.write(np.ascontiguousarray(vectors, self.dtype).tobytes())
+        for option in options:
+            if option not in self.options:
+                self.options.append(option)
+            self._codes.append(self.options.index(option))
+        self._starts.extend(starts)
+        self._ends.extend(ends)
+        self._offsets.append(len(self._starts))
+
+        video = {field: metadata.get(field) for field in VIDEO_FIELDS}
+        video["_id"] = metadata.get("_id", metadata.get("videoName"))
+        self.videos.append(video)
+
+    def close(self) -> None:
+        """Writes the embedding matrix, offset tables and metadata files."""
+        try:
+            self._write_embeddings()
+        finally:
+            self._remove_scratch()
+
+        directory = self.directory
+        np.save(
+            os.path.join(directory, VIDEO_OFFSETS_FILE),
+            np.asarray(self._offsets, np.int64),
+        )
+        np.save(
+            os.path.join(directory, SEGMENT_START_FILE),
+            np.asarray(self._starts, np.float32),
+        )
+        np.save(
+            os.path.join(directory, SEGMENT_END_FILE), np.asarray(self._ends, np.float32)
+        )
+        np.save(
+            os.path.join(directory, SEGMENT_OPTION_FILE),
+            np.asarray(self._codes, np.uint8),
+        )
+        with open(os.path.join(directory, METADATA_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "dimension": self.dimension,
+                    "dtype": self.dtype.name,
+                    "embeddingOptions": self.options,
+                    "videos": self.videos,
+                },
+                f,
+            )
+
+    def abort(self) -> None:
+        """Discards the index being written and removes the scratch file."""
+        self._remove_scratch()
+
+    def _write_embeddings(self) -> None:
+        rows = len(self._starts)
+        raw = (
+            np.memmap(self._scratch_path, dtype=self.dtype, mode="r")
+            if rows
+            else np.empty(0, dtype=self.dtype)
+        )
+        matrix = np.lib.format.open_memmap(
+            os.path.join(self.directory, EMBEDDINGS_FILE),
+            mode="w+",
+            dtype=self.dtype,
+            shape=(rows, self.dimension),
+        )
+        raw = raw.reshape(rows, self.dimension)
+        for start in range(0, rows, LOCAL_CHUNK_ROWS):
+            end = start + LOCAL_CHUNK_ROWS
+            matrix[start:end] = raw[start:end]
+        matrix.flush()
+
+    def _remove_scratch(self) -> None:
+        if os.path.exists(self._scratch_path):
+            os.remove(self._scratch_path)
+
+
+def write_local_index(
+    directory: str, documents: list[dict], dtype: str = "float32"
+) -> None:
+    """Writes OpenSearch-shaped video documents to a local index directory.
+    Args:
+        directory (str): The directory to write the index files to.
+        documents (list[dict]): Video documents with an "embeddings" list, plus an
+            optional "_id".
+        dtype (str): The on-disk embedding type, float32 or float16.
+    """
+    with LocalIndexWriter(directory, dtype) as writer:
+        for document in documents:
+            writer.add_document(document)
+
+
+class LocalVectorIndex:
+    """An in-process vector search backend over memory-mapped segment embeddings.
+    It answers the same nested kNN and terms queries that CustomTools sends to
+    OpenSearch and returns OpenSearch-shaped responses, so it can stand in for the
+    OpenSearch client behind semantic_search, semantic_search_segments and
+    keyword_search.
+    """
+
+    def __init__(
+        self,
+        directory: str = LOCAL_INDEX_DIR,
+        space_type: str = LOCAL_SPACE_TYPE,
+        chunk_rows: int = LOCAL_CHUNK_ROWS,
+    ):
+        self.directory = directory
+        self.space_type = space_type
+        self.chunk_rows = chunk_rows
+        self.version = index_version(directory)
+
+        self.embeddings = np.load(
+            os.path.join(directory, EMBEDDINGS_FILE), mmap_mode="r"
+        )
+        self.video_offsets = np.load(os.path.join(directory, VIDEO_OFFSETS_FILE))
+        self.segment_start = np.load(os.path.join(directory, SEGMENT_START_FILE))
+        self.segment_end = np.load(os.path.join(directory, SEGMENT_END_FILE))
+        self.segment_option = np.load(os.path.join(directory, SEGMENT_OPTION_FILE))
+        with open(os.path.join(directory, METADATA_FILE), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        self.videos: list[dict] = metadata["videos"]
+        self.embedding_options: list[str] = metadata["embeddingOptions"]
+        self.dimension: int = metadata["dimension"]
+
+        # Row-to-video mapping and the non-empty videos, used for per-video reductions
+        segment_counts = np.diff(self.video_offsets)
+        self.segment_video = np.repeat(
+            np.arange(len(self.videos), dtype=np.int64), segment_counts
+        )
+        self._nonempty_videos = np.flatnonzero(segment_counts > 0)
+
+        self._row_norms: Optional[np.ndarray] = None
+        if space_type == "cosinesimil":
+            self._row_norms = self._compute_row_norms()
+
+    def _compute_row_norms(self) -> np.ndarray:
+        norms = np.empty(len(self.embeddings), dtype=np.float32)
+        for start in range(0, len(self.embeddings), self.chunk_rows):
+            chunk = np.asarray(
+                self.embeddings[start : start + self.chunk_rows], dtype=np.float32
+            )
+            norms[start : start + len(chunk)] = np.linalg.norm(chunk, axis=1)
+        norms[norms == 0] = 1.0
+        return norms
+
+    def prepare_queries(self, queries: np.ndarray) -> np.ndarray:
+        """Converts query vectors to a float32 batch, normalized for cosinesimil.
+        Args:
+            queries (np.ndarray): A query vector or a (queries, dimension) array.
+        Returns:
+            np.ndarray: A (queries, dimension) float32 array.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.space_type == "cosinesimil":
+            query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            queries = queries / np.where(query_norms == 0, 1.0, query_norms)
+        return queries
+
+    def segment_scores(
+        self, queries: np.ndarray, start: int = 0, end: Optional[int] = None
+    ) -> np.ndarray:
+        """Scores a range of segment rows against a batch of prepared query vectors.
+        Scores follow OpenSearch's kNN score translation.
+        Args:
+            queries (np.ndarray): A (queries, dimension) array from prepare_queries.
+            start (int): The first segment row.
+            end (int): The row after the last segment; defaults to the last row.
+        Returns:
+            np.ndarray: A (queries, end - start) float32 array of scores.
+        """
+        end = len(self.embeddings) if end is None else end
+        chunk = np.asarray(self.embeddings[start:end], dtype=np.float32)
+        scores = queries @ chunk.T
+        if self.space_type == "cosinesimil":
+            scores /= self._row_norms[start:end]
+            return (1.0 + scores) / 2.0
+        # OpenSearch innerproduct: 1 / (1 - x) for negative, x + 1 otherwise
+        return np.where(scores < 0, 1.0 / (1.0 - scores), scores + 1.0)
+
+    def video_scores(
+        self,
+        queries: np.ndarray,
+        score_mode: str = "avg",
+        all_segments: bool = False,
+    ) -> np.ndarray:
+        """Scores every video against a batch of prepared query vectors.
+        Like OpenSearch's nested kNN query, a video matches on its best segment, or
+        on all of its segments with all_segments (expand_nested_docs), and
+        score_mode combines the matched segments' scores. Segments are scored
+        chunk_rows at a time, so memory grows with the videos, not the segments.
+        Args:
+            queries (np.ndarray): A (queries, dimension) array from prepare_queries.
+            score_mode (str): The nested score mode: "avg", "max" or "sum".
+            all_segments (bool): Match every segment instead of the best one.
+        Returns:
+            np.ndarray: A (queries, videos) array; videos without segments score -inf.
+        Raises:
+            ValueError: If the score mode is not supported.
+        """
+        if score_mode not in ("avg", "max", "sum"):
+            raise ValueError(f"Unsupported score_mode: {score_mode}")
+        shape = (len(queries), len(self.videos))
+        best = np.full(shape, -np.inf, dtype=np.float32)
+        combine = all_segments and score_mode != "max"
+        totals = np.zeros(shape, dtype=np.float32) if combine else None
+        for start in range(0, len(self.embeddings), self.chunk_rows):
+            scores = self.segment_scores(queries, start, start + self.chunk_rows)
+            # A chunk may split a video; reduce each video's rows within the chunk
+            rows = self.segment_video[start : start + scores.shape[1]]
+            firsts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            videos = rows[firsts]
+            best[:, videos] = np.maximum(
+                best[:, videos], np.maximum.reduceat(scores, firsts, axis=1)
+            )
+            if combine:
+                totals[:, videos] += np.add.reduceat(scores, firsts, axis=1)
+
+        if not combine:
+            # One matched segment per video: every score mode gives its score
+            return best
+        nonempty = self._nonempty_videos
+        if score_mode == "avg":
+            totals[:, nonempty] /= np.diff(self.video_offsets)[nonempty]
+        best[:, nonempty] = totals[:, nonempty]
+        return best
+
+    def knn_videos(
+        self,
+        queries: np.ndarray,
+        k: int,
+        score_mode: str = "avg",
+        all_segments: bool = False,
+    ) -> list[list[tuple[int, float]]]:
+        """Finds the top-k videos for each query vector.
+        Args:
+            queries (np.ndarray): A (queries, dimension) array of query vectors.
+            k (int): The number of videos per query.
+            score_mode (str): The nested score mode, see video_scores.
+            all_segments (bool): Match every segment, see video_scores.
+        Returns:
+            list[list[tuple[int, float]]]: (video index, score) pairs per query.
+        """
+        scores = self.video_scores(
+            self.prepare_queries(queries), score_mode, all_segments
+        )
+        return self._top_videos(scores, k)
+
+    def knn_segments(
+        self,
+        queries: np.ndarray,
+        k: int,
+        segments_per_video: int = 25,
+        score_mode: str = "avg",
+        all_segments: bool = False,
+    ) -> list[list[tuple[int, float, list[tuple[int, float]]]]]:
+        """Finds the top-k videos and their best segments for each query vector.
+        Only the top videos' segments are scored a second time, for the inner hits.
+        Args:
+            queries (np.ndarray): A (queries, dimension) array of query vectors.
+            k (int): The number of videos per query.
+            segments_per_video (int): The maximum number of segments per video.
+            score_mode (str): The nested score mode, see video_scores.
+            all_segments (bool): Match every segment, see video_scores.
+        Returns:
+            list: Per query, (video index, score, [(segment row, score), ...]) tuples.
+        """
+        queries = self.prepare_queries(queries)
+        scores = self.video_scores(queries, score_mode, all_segments)
+        results = []
+        for query_index, videos in enumerate(self._top_videos(scores, k)):
+            query_results = []
+            for video, score in videos:
+                start, end = self.video_offsets[video], self.video_offsets[video + 1]
+                row_scores = self.segment_scores(
+                    queries[query_index : query_index + 1], start, end
+                )[0]
+                order = np.argsort(-row_scores, kind="stable")[:segments_per_video]
+                segments = [(int(start + i), float(row_scores[i])) for i in order]
+                query_results.append((video, score, segments))
+            results.append(query_results)
+        return results
+
+    @staticmethod
+    def _top_videos(scores: np.ndarray, k: int) -> list[list[tuple[int, float]]]:
+        results = []
+        for row in scores:
+            k_eff = min(k, int(np.isfinite(row).sum()))
+            if k_eff <= 0:
+                results.append([])
+                continue
+            top = np.argpartition(-row, k_eff - 1)[:k_eff]
+            top = top[np.argsort(-row[top], kind="stable")]
+            results.append([(int(i), float(row[i])) for i in top])
+        return results
+
+    def keyword_videos(self, keyword_list: list, size: int) -> list[tuple[int, float]]:
+        """Finds videos with any of the keywords, like an OpenSearch terms query.
+        Args:
+            keyword_list (list): The keywords to match.
+            size (int): The maximum number of videos to return.
+        Returns:
+            list[tuple[int, float]]: (video index, score) pairs with a constant score.
+        """
+        terms = set(keyword_list)
+        matches = [
+            (i, 1.0)
+            for i, video in enumerate(self.videos)
+            if terms.intersection(video.get("keywords") or [])
+        ]
+        return matches[:size]
+
+    def search(self, body: dict, index: Optional[str] = None, **kwargs) -> dict:
+        """Answers an OpenSearch search request body with an OpenSearch-shaped response.
+        Supports the nested kNN (optionally with inner_hits) and terms queries built
+        by CustomTools, and from/size paging.
+        Args:
+            body (dict): The OpenSearch query body.
+            index (str): The index name, echoed in each hit.
+        Returns:
+            dict: The search response.
+        """
+        started = time.perf_counter()
+        query = body.get("query", {})
+        # from/size paging: rank the first start + size videos, keep the last size
+        start = body.get("from", 0)
+        size = body.get("size", 10)
+
+        if "terms" in query:
+            matches = self.keyword_videos(
+                query["terms"].get("keywords", []), start + size
+            )[start:]
+            hits = [self._video_hit(video, score, index) for video, score in matches]
+            total = len(matches)
+        elif "nested" in query:
+            nested = query["nested"]
+            knn = nested["query"]["knn"]["embeddings.embedding"]
+            vector = np.asarray([knn["vector"]], dtype=np.float32)
+            k = min(start + size, knn.get("k", start + size))
+            score_mode = nested.get("score_mode", "avg")
+            all_segments = knn.get("expand_nested_docs", False)
+            if "inner_hits" in nested:
+                inner_size = nested["inner_hits"].get("size", 3)
+                with_vectors = "embeddings.embedding" in nested["inner_hits"].get(
+                    "fields", []
+                )
+                results = self.knn_segments(
+                    vector, k, inner_size, score_mode, all_segments
+                )[0][start:]
+                hits = [
+                    self._video_hit(video, score, index, segments, with_vectors)
+                    for video, score, segments in results
+                ]
+            else:
+                results = self.knn_videos(vector, k, score_mode, all_segments)
+                hits = [
+                    self._video_hit(video, score, index)
+                    for video, score in results[0][start:]
+                ]
+            total = len(hits)
+        else:
+            raise ValueError(f"Unsupported query for the local index: {list(query)}")
+
+        return {
+            "took": int((time.perf_counter() - started) * 1000),
+            "timed_out": False,
+            "hits": {
+                "total": {"value": total, "relation": "eq"},
+                "max_score": hits[0]["_score"] if hits else None,
+                "hits": hits,
+            },
+        }
+
+    def msearch(self, body: list[dict], index: Optional[str] = None, **kwargs) -> dict:
+        """Answers an OpenSearch _msearch request body, one search per header/query pair.
+        Args:
+            body (list[dict]): Alternating header and query lines.
+            index (str): The default index name, echoed in each hit.
+        Returns:
+            dict: The multi-search response.
+        """
+        responses = []
+        for header, query in zip(body[0::2], body[1::2]):
+            try:
+                response = self.search(query, header.get("index", index))
+            except ValueError as err:
+                responses.append({"status": 400, "error": {"reason": str(err)}})
+                continue
+            responses.append(dict(response, status=200))
+        return {"took": sum(r.get("took", 0) for r in responses), "responses": responses}
+
+    def _video_hit(
+        self,
+        video: int,
+        score: float,
+        index: Optional[str],
+        segments: Optional[list[tuple[int, float]]] = None,
+        with_vectors: bool = False,
+    ) -> dict:
+        metadata = self.videos[video]
+        hit = {
+            "_index": index,
+            "_id": metadata["_id"],
+            "_score": score,
+            "_source": {field: metadata[field] for field in VIDEO_FIELDS},
+        }
+        if segments is not None:
+            first_row = int(self.video_offsets[video])
+            hit["inner_hits"] = {
+                "embeddings": {
+                    "hits": {
+                        "total": {"value": len(segments), "relation": "eq"},
+                        "max_score": segments[0][1] if segments else None,
+                        "hits": [
+                            self._segment_hit(
+                                metadata, row, row - first_row, s, index, with_vectors
+                            )
+                            for row, s in segments
+                        ],
+                    }
+                }
+            }
+        return hit
+
+    def _segment_hit(
+        self,
+        metadata: dict,
+        row: int,
+        offset: int,
+        score: float,
+        index: Optional[str],
+        with_vectors: bool = False,
+    ) -> dict:
+        hit = {
+            "_index": index,
+            "_id": metadata["_id"],
+            "_nested": {"field": "embeddings", "offset": offset},
+            "_score": score,
+            "fields": {
+                "embeddings.startSec": [float(self.segment_start[row])],
+                "embeddings.endSec": [float(self.segment_end[row])],
+                "embeddings.embeddingOption": [
+                    self.embedding_options[self.segment_option[row]]
+                ],
+            },
+        }
+        if with_vectors:
+            hit["fields"]["embeddings.embedding"] = np.asarray(
+                self.embeddings[row], dtype=np.float32
+            ).tolist()
+        return hit
+
+
+class AsyncLocalVectorIndex:
+    """An awaitable facade over LocalVectorIndex for the async search path."""
+
+    def __init__(self, local_index: LocalVectorIndex):
+        self.local_index = local_index
+
+    async def search(self, body: dict, index: Optional[str] = None, **kwargs) -> dict:
+        """Runs LocalVectorIndex.search in a worker thread.
+        NumPy releases the GIL during the matrix products, so searches overlap.
+        """
+        return await asyncio.to_thread(self.local_index.search, body, index, **kwargs)
+
+    async def msearch(
+        self, body: list[dict], index: Optional[str] = None, **kwargs
+    ) -> dict:
+        """Runs LocalVectorIndex.msearch in a worker thread."""
+        return await asyncio.to_thread(self.local_index.msearch, body, index, **kwargs)
+
+
+def index_version(directory: str) -> Optional[tuple[int, int]]:
+    """Identifies the index files in a directory by their metadata file, which every
+    write and export replaces.
+    Args:
+        directory (str): The local index directory.
+    Returns:
+        Optional[tuple[int, int]]: The metadata file's inode and modification time,
+        or None while the directory has no index, e.g. mid-swap.
+    """
+    try:
+        stat = os.stat(os.path.join(directory, METADATA_FILE))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+_local_index: Optional[LocalVectorIndex] = None
+_local_index_lock = threading.Lock()
+
+
+def get_local_index() -> LocalVectorIndex:
+    """Returns the process-wide local index, loading it from LOCAL_INDEX_DIR on first use.
+    When an export has replaced the index files since, the new files are loaded and
+    the shared result cache, which holds responses from the old ones, is invalidated.
+    Returns:
+        LocalVectorIndex: The shared local index.
+    """
+    global _local_index
+    with _local_index_lock:
+        if _local_index is None:
+            _local_index = LocalVectorIndex()
+            return _local_index
+        version = index_version(LOCAL_INDEX_DIR)
+        if version is not None and version != _local_index.version:
+            _local_index = LocalVectorIndex()
+            get_result_cache().invalidate()
+        return _local_index
+
+
+def reload_local_index() -> LocalVectorIndex:
+    """Loads the local index from LOCAL_INDEX_DIR again and invalidates the shared
+    result cache.
+    Returns:
+        LocalVectorIndex: The reloaded local index.
+    """
+    global _local_index
+    with _local_index_lock:
+        _local_index = LocalVectorIndex()
+    get_result_cache().invalidate()
+    return _local_index
@@ -0,0 +1,293 @@
+import atexit
+import io
+import logging
+import os
+import queue
+import sys
+import threading
+from typing import Iterable, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Log pipeline configuration; handlers run on a writer thread, not the caller's
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# When the queue is full: "drop" records below WARNING, or "block" every caller
+LOG_OVERFLOW = os.getenv("LOG_OVERFLOW", "drop").lower()
+# Seconds a caller waits for room in a full queue before its record is dropped
+LOG_BLOCK_TIMEOUT = float(os.getenv("LOG_BLOCK_TIMEOUT", "1.0"))
+# Records written per batch; each handler is flushed once per batch
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "256"))
+# Redirect print() output and warnings into the logs
+LOG_CAPTURE_STDIO = os.getenv("LOG_CAPTURE_STDIO", "true").lower() == "true"
+
+_STOP = object()
+_TRACEBACK_FORMATTER = logging.Formatter()
+
+
+class PipelineHandler(logging.Handler):
+    """Puts records on a log pipeline's queue; the caller never waits on I/O."""
+
+    def __init__(self, pipeline: "LogPipeline"):
+        super().__init__()
+        self.pipeline = pipeline
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Renders the message and traceback now, so later changes to the logged
+        objects don't show up in the record, and frames aren't kept alive."""
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _TRACEBACK_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.pipeline.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+
+class LogPipeline:
+    """Writes log records from a bounded queue on a background thread.
+    Loggers get the pipeline's handler, which only enqueues. The writer thread
+    drains whatever has queued up, up to batch_size records, and hands the batch to
+    each handler; handlers with emit_batch write it with one write and one flush.
+    Under the "drop" policy, records below WARNING are dropped when the queue is
+    full, and the number dropped is logged once the queue drains.
+    """
+
+    def __init__(
+        self,
+        handlers: Iterable[logging.Handler],
+        max_size: int = LOG_QUEUE_SIZE,
+        overflow: str = LOG_OVERFLOW,
+        batch_size: int = LOG_BATCH_SIZE,
+        block_timeout: float = LOG_BLOCK_TIMEOUT,
+    ):
+        if overflow not in ("drop", "block"):
+            raise ValueError(f"Unknown log overflow policy: {overflow}")
+        self.handlers = list(handlers)
+        self.queue: queue.Queue = queue.Queue(max_size)
+        self.handler = PipelineHandler(self)
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self.written = 0
+        self._reported_drops = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Queues a record, dropping it when the queue stays full."""
+        try:
+            if self.overflow == "block" or record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def stats(self) -> dict:
+        """Returns the queued, written and dropped record counts."""
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+    def start(self) -> "LogPipeline":
+        """Starts the writer thread, once."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="log-pipeline", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Writes the queued records and stops the writer thread.
+        Args:
+            timeout (float): Seconds to wait for the queue to drain.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        atexit.unregister(self.stop)
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = any(record is _STOP for record in batch)
+            if stopping:
+                batch = [record for record in batch if record is not _STOP]
+            self._write(batch)
+            if self.dropped != self._reported_drops and self.queue.empty():
+                self._report_drops()
+            if stopping:
+                return
+
+    def _write(self, batch: list[logging.LogRecord]) -> None:
+        for handler in self.handlers:
+            records = [
+                record
+                for record in batch
+                if record.levelno >= handler.level and handler.filter(record)
+            ]
+            if not records:
+                continue
+            emit_batch = getattr(handler, "emit_batch", None)
+            try:
+                if emit_batch is not None:
+                    emit_batch(records)
+                else:
+                    for record in records:
+                        handler.handle(record)
+            except Exception:
+                # Keep the writer thread alive for the other handlers
+                handler.handleError(records[-1])
+        self.written += len(batch)
+
+    def _report_drops(self) -> None:
+        dropped = self.dropped - self._reported_drops
+        self._reported_drops = self.dropped
+        record = logging.LogRecord(
+            __name__,
+            logging.WARNING,
+            __file__,
+            0,
+            f"Log queue was full; dropped {dropped} records",
+            None,
+            None,
+        )
+        self._write([record])
+
+
+def _write_batch(handler: logging.StreamHandler, records: list) -> None:
+    """Formats records and writes them to a stream handler's stream at once."""
+    try:
+        text = "".join(
+            handler.format(record) + handler.terminator for record in records
+        )
+    except Exception:
+        # Fall back to one record at a time, so only the bad record is reported
+        for record in records:
+            handler.handle(record)
+        return
+    with handler.lock:
+        try:
+            handler.stream.write(text)
+            handler.flush()
+        except Exception:
+            handler.handleError(records[-1])
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """A StreamHandler that writes a batch of records with one write and flush."""
+
+    def emit_batch(self, records: list[logging.LogRecord]) -> None:
+        _write_batch(self, records)
+
+
+class BatchFileHandler(logging.FileHandler):
+    """A FileHandler that writes a batch of records with one write and flush."""
+
+    def emit_batch(self, records: list[logging.LogRecord]) -> None:
+        if self.stream is None:
+            with self.lock:
+                if self.stream is None:
+                    self.stream = self._open()
+        _write_batch(self, records)
+
+
+class StreamToLogger(io.TextIOBase):
+    """
+    Redirect a stream (stdout or stderr) to logging.
+    Partial lines are kept as a list of chunks and joined only when a newline
+    arrives, so large outputs written in small pieces cost linear time.
+    """
+
+    def __init__(self, logger: logging.Logger, log_level: int):
+        super().__init__()
+        self.logger = logger
+        self.log_level = log_level
+        self._pending: list[str] = []
+        self._lock = threading.Lock()
+
+    def write(self, buf: str) -> int:
+        with self._lock:
+            self._pending.append(buf)
+            if "\n" not in buf:
+                return len(buf)
+            lines = "".join(self._pending).split("\n")
+            self._pending = [lines[-1]] if lines[-1] else []
+        for line in lines[:-1]:
+            if line.strip():
+                self.logger.log(self.log_level, line)
+        return len(buf)
+
+    def flush(self) -> None:
+        with self._lock:
+            text = "".join(self._pending).strip()
+            self._pending = []
+        if text:
+            self.logger.log(self.log_level, text)
+
+
+def attach_log_pipeline(
+    logger: logging.Logger, handlers: Iterable[logging.Handler]
+) -> LogPipeline:
+    """Sends a logger's records through a new pipeline to the given handlers.
+    Replaces the logger's handlers; a pipeline attached earlier is drained first.
+    Args:
+        logger (logging.Logger): The logger, often the root logger.
+        handlers (Iterable[logging.Handler]): The handlers that write the records.
+    Returns:
+        LogPipeline: The started pipeline.
+    """
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        if isinstance(handler, PipelineHandler):
+            handler.pipeline.stop()
+    pipeline = LogPipeline(handlers).start()
+    logger.addHandler(pipeline.handler)
+    return pipeline
+
+
+def capture_stdio(
+    stdout_logger: logging.Logger,
+    stderr_logger: logging.Logger,
+    enabled: bool = LOG_CAPTURE_STDIO,
+) -> None:
+    """Redirects sys.stdout, sys.stderr and warnings to loggers, when enabled.
+    This replaces the streams for the whole process; set LOG_CAPTURE_STDIO=false
+    to keep them, e.g. when the apps are embedded in another program.
+    Args:
+        stdout_logger (logging.Logger): Receives printed lines at INFO.
+        stderr_logger (logging.Logger): Receives lines written to stderr at ERROR.
+        enabled (bool): Whether to redirect; defaults to LOG_CAPTURE_STDIO.
+    """
+    if not enabled:
+        return
+    sys.stdout = StreamToLogger(stdout_logger, logging.INFO)
+    sys.stderr = StreamToLogger(stderr_logger, logging.ERROR)
+    logging.captureWarnings(True)
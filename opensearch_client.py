@@ -0,0 +1,172 @@
+import asyncio
+import os
+import threading
+import warnings
+from typing import Optional
+
+from dotenv import load_dotenv
+from opensearchpy import AsyncOpenSearch, OpenSearch
+from opensearchpy.connection_pool import RoundRobinSelector
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Connection configuration; OPENSEARCH_HOSTS is a comma-separated list of hosts
+OPENSEARCH_ENDPOINT = os.getenv("OPENSEARCH_ENDPOINT")
+OPENSEARCH_HOSTS = os.getenv("OPENSEARCH_HOSTS", OPENSEARCH_ENDPOINT or "")
+OPENSEARCH_PORT = int(os.getenv("OPENSEARCH_PORT", "9200"))
+OPENSEARCH_USERNAME = os.getenv("OPENSEARCH_USERNAME", "admin")
+OPENSEARCH_PASSWORD = os.getenv("OPENSEARCH_PASSWORD", "OpenSearch123")
+
+# Pooling and timeout configuration
+OPENSEARCH_POOL_MAXSIZE = int(os.getenv("OPENSEARCH_POOL_MAXSIZE", "25"))
+OPENSEARCH_TIMEOUT = float(os.getenv("OPENSEARCH_TIMEOUT", "10"))
+OPENSEARCH_REQUEST_TIMEOUT = float(os.getenv("OPENSEARCH_REQUEST_TIMEOUT", "10"))
+OPENSEARCH_MAX_RETRIES = int(os.getenv("OPENSEARCH_MAX_RETRIES", "2"))
+OPENSEARCH_SNIFF = os.getenv("OPENSEARCH_SNIFF", "false").lower() == "true"
+OPENSEARCH_SNIFF_INTERVAL = float(os.getenv("OPENSEARCH_SNIFF_INTERVAL", "60"))
+OPENSEARCH_HTTP_COMPRESS = (
+    os.getenv("OPENSEARCH_HTTP_COMPRESS", "true").lower() == "true"
+)
+
+_client: Optional[OpenSearch] = None
+_async_client: Optional[AsyncOpenSearch] = None
+_client_lock = threading.Lock()
+
+
+def _client_options() -> dict:
+    """Builds the options shared by the sync and async clients.
+    Returns:
+        dict: Keyword arguments for OpenSearch and AsyncOpenSearch.
+    """
+    # Suppress security warnings related to unverified HTTPS requests and SSL connections
+    warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+    warnings.filterwarnings("ignore", message="Connecting to https://.* using SSL")
+
+    hosts = [
+        {"host": host.strip(), "port": OPENSEARCH_PORT}
+        for host in OPENSEARCH_HOSTS.split(",")
+        if host.strip()
+    ]
+    options = {
+        "hosts": hosts or [{"host": OPENSEARCH_ENDPOINT, "port": OPENSEARCH_PORT}],
+        "http_auth": (OPENSEARCH_USERNAME, OPENSEARCH_PASSWORD),
+        "use_ssl": True,
+        "verify_certs": False,
+        "ssl_show_warn": False,
+        "timeout": OPENSEARCH_TIMEOUT,
+        "max_retries": OPENSEARCH_MAX_RETRIES,
+        "http_compress": OPENSEARCH_HTTP_COMPRESS,
+        "selector_class": RoundRobinSelector,
+        "randomize_hosts": False,
+    }
+    if OPENSEARCH_SNIFF:
+        options.update(
+            {
+                "sniff_on_start": True,
+                "sniff_on_connection_fail": True,
+                "sniffer_timeout": OPENSEARCH_SNIFF_INTERVAL,
+            }
+        )
+    return options
+
+
+def get_opensearch_client() -> OpenSearch:
+    """Returns the process-wide OpenSearch client, creating it on first use.
+    The client keeps a persistent, keep-alive connection pool per host, so TLS
+    handshakes are paid once per connection instead of once per tool call.
+    Returns:
+        OpenSearch: The shared OpenSearch client.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OpenSearch(
+                pool_maxsize=OPENSEARCH_POOL_MAXSIZE, **_client_options()
+            )
+        return _client
+
+
+def get_async_opensearch_client() -> AsyncOpenSearch:
+    """Returns the process-wide async OpenSearch client, creating it on first use.
+    The client must only be used from the background event loop.
+    Returns:
+        AsyncOpenSearch: The shared async OpenSearch client.
+    """
+    global _async_client
+    with _client_lock:
+        if _async_client is None:
+            _async_client = AsyncOpenSearch(
+                maxsize=OPENSEARCH_POOL_MAXSIZE, **_client_options()
+            )
+        return _async_client
+
+
+def opensearch_pool_stats() -> dict:
+    """Returns connection pool statistics for the shared clients.
+    Returns:
+        dict: Per-host pool statistics for the sync and async clients.
+    """
+    stats = {"sync": [], "async": []}
+
+    if _client is not None:
+        pool = _client.transport.connection_pool
+        dead = getattr(pool, "dead_count", {})
+        for connection in getattr(pool, "orig_connections", pool.connections):
+            urllib3_pool = connection.pool
+            stats["sync"].append(
+                {
+                    "host": connection.host,
+                    "alive": connection not in dead,
+                    "failures": dead.get(connection, 0),
+                    "max_connections": urllib3_pool.pool.maxsize,
+                    "idle_connections": sum(
+                        1 for conn in list(urllib3_pool.pool.queue) if conn is not None
+                    ),
+                    "connections_opened": urllib3_pool.num_connections,
+                    "requests": urllib3_pool.num_requests,
+                }
+            )
+
+    if _async_client is not None:
+        pool = _async_client.transport.connection_pool
+        dead = getattr(pool, "dead_count", {}) if pool else {}
+        connections = getattr(pool, "orig_connections", None) or getattr(
+            pool, "connections", []
+        )
+        for connection in connections:
+            session = connection.session
+            connector = session.connector if session is not None else None
+            idle = sum(len(c) for c in getattr(connector, "_conns", {}).values())
+            in_use = len(getattr(connector, "_acquired", ()))
+            stats["async"].append(
+                {
+                    "host": connection.host,
+                    "alive": connection not in dead,
+                    "failures": dead.get(connection, 0),
+                    "max_connections": getattr(connector, "limit", None),
+                    "idle_connections": idle,
+                    "in_use_connections": in_use,
+                }
+            )
+
+    return stats
+
+
+class ThreadedAsyncClient:
+    """An awaitable facade over a synchronous client, such as OpenSearch.
+    Each method call runs in a worker thread, so the async search path can serve
+    callers that hold a sync client. Methods the client lacks stay missing, so
+    hasattr checks such as SearchPager's point-in-time probe still work.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def __getattr__(self, name: str):
+        method = getattr(self.client, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
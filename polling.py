@@ -0,0 +1,148 @@
+import os
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Polling configuration (seconds unless noted)
+POLL_INITIAL_DELAY = float(os.getenv("POLL_INITIAL_DELAY", "0.25"))
+POLL_MULTIPLIER = float(os.getenv("POLL_MULTIPLIER", "1.5"))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "4.0"))
+POLL_JITTER = float(os.getenv("POLL_JITTER", "0.2"))  # fraction of each delay
+POLL_DEADLINE = float(os.getenv("POLL_DEADLINE", "120"))
+POLL_MAX_CALLS = int(os.getenv("POLL_MAX_CALLS", "60"))
+POLL_HISTORY_SIZE = int(os.getenv("POLL_HISTORY_SIZE", "50"))
+POLL_PROBE_S3 = os.getenv("POLL_PROBE_S3", "false").lower() == "true"
+POLL_STATUS_EVERY = int(os.getenv("POLL_STATUS_EVERY", "4"))  # probes per status call
+
+
+class PollSchedule:
+    """The polling schedule for a single job.
+    Produces the delay before each probe until the job finishes, the deadline
+    passes, or the call budget is used up.
+    """
+
+    def __init__(self, strategy: "PollingStrategy", first_delay: float):
+        self.strategy = strategy
+        self.started = time.monotonic()
+        self.calls = 0
+        self._next_delay = first_delay
+        self._backoff = strategy.initial_delay
+
+    def elapsed(self) -> float:
+        """Returns the seconds since the job was submitted."""
+        return time.monotonic() - self.started
+
+    def next_delay(self) -> Optional[float]:
+        """Returns the delay before the next probe, or None when the budget is spent.
+        Returns:
+            Optional[float]: Seconds to wait, or None if no more probes are allowed.
+        """
+        remaining = self.strategy.deadline - self.elapsed()
+        if self.calls >= self.strategy.max_calls or remaining <= 0:
+            return None
+
+        delay = self._next_delay
+        if self.strategy.jitter:
+            delay *= 1 + random.uniform(-self.strategy.jitter, self.strategy.jitter)
+        delay = max(0.0, min(delay, remaining))
+
+        self.calls += 1
+        self._next_delay = self._backoff
+        self._backoff = min(
+            self._backoff * self.strategy.multiplier, self.strategy.max_interval
+        )
+        return delay
+
+    def is_status_check_due(self) -> bool:
+        """Whether the current probe should call the status API.
+        In S3 probe mode only every Nth probe (and the last one allowed) checks the
+        job status, so failed jobs are still detected.
+        """
+        if not self.strategy.probe_s3:
+            return True
+        last_call = self.calls >= self.strategy.max_calls
+        return last_call or self.calls % max(self.strategy.status_every, 1) == 0
+
+
+class PollingStrategy:
+    """A configurable polling strategy for Bedrock async invocations.
+    The first probe is scheduled around the median completion time of recent jobs,
+    later probes back off exponentially with jitter. Every job is bounded by a hard
+    deadline and a maximum number of probes.
+    """
+
+    def __init__(
+        self,
+        initial_delay: float = POLL_INITIAL_DELAY,
+        multiplier: float = POLL_MULTIPLIER,
+        max_interval: float = POLL_MAX_INTERVAL,
+        jitter: float = POLL_JITTER,
+        deadline: float = POLL_DEADLINE,
+        max_calls: int = POLL_MAX_CALLS,
+        history_size: int = POLL_HISTORY_SIZE,
+        probe_s3: bool = POLL_PROBE_S3,
+        status_every: int = POLL_STATUS_EVERY,
+    ):
+        self.initial_delay = initial_delay
+        self.multiplier = multiplier
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.deadline = deadline
+        self.max_calls = max_calls
+        self.probe_s3 = probe_s3
+        self.status_every = status_every
+
+        self._completion_times: deque[float] = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+
+    def record_completion(self, seconds: float) -> None:
+        """Records how long a completed job took, to tune future first probes.
+        Args:
+            seconds (float): The time from submission to observed completion.
+        """
+        with self._lock:
+            self._completion_times.append(seconds)
+
+    def expected_completion(self) -> Optional[float]:
+        """Returns the median completion time of recent jobs, if any were recorded."""
+        with self._lock:
+            if not self._completion_times:
+                return None
+            return statistics.median(self._completion_times)
+
+    def schedule(self) -> PollSchedule:
+        """Starts a new schedule for a job that was just submitted.
+        Returns:
+            PollSchedule: The schedule for the job.
+        """
+        first_delay = self.initial_delay
+        expected = self.expected_completion()
+        if expected is not None:
+            # Probe slightly before the typical completion time, never later than it
+            first_delay = max(self.initial_delay, expected * 0.9)
+        return PollSchedule(self, min(first_delay, self.deadline))
+
+
+_default_strategy: Optional[PollingStrategy] = None
+_default_strategy_lock = threading.Lock()
+
+
+def get_polling_strategy() -> PollingStrategy:
+    """Returns the process-wide polling strategy, creating it on first use.
+    Sharing one strategy lets every job learn from recent completion times.
+    Returns:
+        PollingStrategy: The shared strategy instance.
+    """
+    global _default_strategy
+    with _default_strategy_lock:
+        if _default_strategy is None:
+            _default_strategy = PollingStrategy()
+        return _default_strategy
@@ -0,0 +1,297 @@
+import logging
+import os
+import re
+from typing import TYPE_CHECKING, Callable, Optional
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field
+
+from agent_streaming import report_progress
+from data import flatten_segment_groups
+
+if TYPE_CHECKING:
+    from strands import Agent
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Router configuration
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "false").lower() == "true"
+# Longest search text answered directly; longer requests usually add conditions
+ROUTER_MAX_WORDS = int(os.getenv("ROUTER_MAX_WORDS", "12"))
+# Most results a direct search returns; larger requested counts are clamped
+ROUTER_MAX_RESULTS = int(os.getenv("ROUTER_MAX_RESULTS", "50"))
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.8"))
+
+# "keywords: car, beach", optionally preceded by a description for a hybrid search
+KEYWORDS_PATTERN = re.compile(
+    r"^(?:(?P<text>.*?)[\s,;.]+)?(?:keywords?|tags?)\s*[:=]\s*(?P<keywords>.+)$",
+    re.IGNORECASE | re.DOTALL,
+)
+# A search verb, an optional count, what to find and what it shows:
+# "find 10 videos of a dog on a beach", "show me clips where people dance"
+SEARCH_PATTERN = re.compile(
+    r"^(?:please\s+)?(?:find|search(?:\s+for)?|show(?:\s+me)?|look\s+for|get(?:\s+me)?)"
+    r"\s+(?:(?P<size>\d+)\s+)?(?:(?:all|some)\s+)?"
+    r"(?P<kind>videos?|commercials?|ads?|adverts?|advertisements?|clips?|segments?"
+    r"|scenes?|moments?)"
+    r"\s+(?:about|of|with|featuring|showing|that\s+shows?|where)\s+"
+    r"(?P<text>.+)$",
+    re.IGNORECASE | re.DOTALL,
+)
+SEGMENT_KINDS = ("clip", "segment", "scene", "moment")
+# Words that make an input conversational
+CONVERSATIONAL_WORDS = {
+    "hi", "hello", "hey", "thanks", "thank", "please", "what", "why", "how",
+    "who", "when", "which", "can", "could", "would", "should", "do", "does", "is",
+    "are", "tell", "explain", "summarize", "compare", "describe", "forget", "help",
+    "yes", "no", "ok", "okay", "you", "your",
+}  # fmt: skip
+# Words that refer to earlier turns, which only the agent remembers
+REFERENCE_WORDS = {
+    "it", "that", "those", "these", "them", "previous", "above", "more", "again",
+    "other", "first", "second", "third", "last", "same", "similar", "result",
+    "results", "answer",
+}  # fmt: skip
+# Words that ask for a filter, an order or a video attribute, which a similarity
+# search can't express
+CONSTRAINT_WORDS = {
+    "longest", "shortest", "longer", "shorter", "newest", "oldest", "latest",
+    "recent", "most", "least", "best", "worst", "top", "than", "under", "over",
+    "between", "before", "after", "less", "fewer", "greater", "not", "without",
+    "except", "excluding", "only", "sort", "sorted", "order", "ordered", "rank",
+    "ranked", "duration", "length", "seconds", "secs", "sec", "minutes", "mins",
+    "min", "hours", "summary", "title", "titled", "named", "called", "score",
+}  # fmt: skip
+# Verbs that start a request; a search text doesn't start with one
+SEARCH_VERBS = {"find", "search", "show", "look", "get"}
+# Words that don't describe what to search for; a search text needs another word
+FILLER_WORDS = {
+    "a", "an", "the", "some", "any", "all", "me", "of", "for", "with", "using",
+    "use", "by", "and", "about", "where", "only", "find", "search", "show", "get",
+    "look", "keyword", "keywords", "tag", "tags", "video", "videos", "commercial",
+    "commercials", "ad", "ads", "clip", "clips", "segment", "segments", "scene",
+    "scenes", "moment", "moments",
+}  # fmt: skip
+# Joins a description to its keywords: "dogs on a beach with keywords: dog"
+TRAILING_JOIN = re.compile(r"[\s,;.]+(?:with|using|and|by|plus)$", re.IGNORECASE)
+
+
+class QueryRoute(BaseModel):
+    """How to answer a user input: "agent", or a direct "keyword", "semantic",
+    "segments" or "hybrid" search."""
+
+    mode: str
+    text: str = ""
+    keywords: list[str] = Field(default_factory=list)
+    results_size: int = 6
+
+
+class QueryRouter:
+    """Answers explicit searches directly with CustomTools, without the LLM.
+    Keyword lists and requests of the form verb, kind, preposition, description,
+    such as "find videos of ...", are routed by rules to embed, search and format.
+    An optional classifier can route inputs the rules leave open. Anything else,
+    such as follow-ups, questions about earlier results and filters on duration
+    or order, goes to the full agent.
+    """
+
+    def __init__(
+        self,
+        custom_tools,
+        logger: logging.Logger,
+        classifier: Optional[Callable[[str], tuple[str, float]]] = None,
+        max_words: int = ROUTER_MAX_WORDS,
+        min_confidence: float = ROUTER_MIN_CONFIDENCE,
+        max_results: int = ROUTER_MAX_RESULTS,
+    ):
+        self.custom_tools = custom_tools
+        self.logger = logger
+        self.classifier = classifier
+        self.max_words = max_words
+        self.min_confidence = min_confidence
+        self.max_results = max_results
+
+    def route(self, user_query: str) -> QueryRoute:
+        """Decides how to answer a user input.
+        Args:
+            user_query (str): The user input.
+        Returns:
+            QueryRoute: The route, with the search text and keywords when direct.
+        """
+        query = user_query.strip()
+        if not query or "?" in query or "\n" in query:
+            return QueryRoute(mode="agent")
+
+        match = KEYWORDS_PATTERN.match(query)
+        if match:
+            keywords = [
+                keyword
+                for keyword in self.split_keywords(match.group("keywords"))
+                if not self.is_filler(keyword)
+            ]
+            text = self.strip_search_verbs(match.group("text") or "")
+            text = TRAILING_JOIN.sub("", text).strip(" ,;.")
+            if (
+                not keywords
+                or REFERENCE_WORDS & self.words(" ".join(keywords))
+                or not self.is_search_text(text, allow_empty=True)
+            ):
+                return QueryRoute(mode="agent")
+            if self.is_filler(text):
+                return QueryRoute(mode="keyword", keywords=keywords)
+            return QueryRoute(mode="hybrid", text=text, keywords=keywords)
+
+        match = SEARCH_PATTERN.match(query)
+        if match:
+            text = match.group("text").strip(" .")
+            if not self.is_search_text(text):
+                return QueryRoute(mode="agent")
+            kind = match.group("kind").lower()
+            mode = "segments" if kind.startswith(SEGMENT_KINDS) else "semantic"
+            size = min(max(int(match.group("size") or 6), 1), self.max_results)
+            return QueryRoute(mode=mode, text=text, results_size=size)
+
+        if self.classifier is not None:
+            mode, confidence = self.classifier(query)
+            if mode in ("semantic", "segments") and confidence >= self.min_confidence:
+                return QueryRoute(mode=mode, text=query)
+        return QueryRoute(mode="agent")
+
+    def is_search_text(self, text: str, allow_empty: bool = False) -> bool:
+        """Whether a text describes what to search for, rather than a follow-up.
+        Args:
+            text (str): The search text of an explicit search.
+            allow_empty (bool): Whether filler alone is accepted, as for the
+            optional description of a keyword search.
+        Returns:
+            bool: False for filler, references to earlier results, filters and
+            numbers, conversational or verb openings and texts over max_words
+            words.
+        """
+        if self.is_filler(text):
+            return allow_empty
+        words = re.findall(r"[\w']+", text.lower())
+        return (
+            words[0] not in CONVERSATIONAL_WORDS | SEARCH_VERBS
+            and not (REFERENCE_WORDS | CONSTRAINT_WORDS) & set(words)
+            and not any(word.isdigit() for word in words)
+            and len(words) <= self.max_words
+        )
+
+    @staticmethod
+    def is_filler(text: str) -> bool:
+        """Whether a text has no word besides FILLER_WORDS."""
+        return not QueryRouter.words(text) - FILLER_WORDS
+
+    @staticmethod
+    def words(text: str) -> set[str]:
+        """Returns the lowercase words of a text."""
+        return set(re.findall(r"[\w']+", text.lower()))
+
+    @staticmethod
+    def split_keywords(keywords: str) -> list[str]:
+        """Splits a keyword list on commas, semicolons or "and", or else on spaces."""
+        if re.search(r"[,;]|\band\b", keywords):
+            parts = re.split(r"\s*(?:,|;|\band\b)\s*", keywords)
+        else:
+            parts = keywords.split()
+        keyword_list = [part.strip(" .'\"").lower() for part in parts]
+        return [keyword for keyword in keyword_list if keyword]
+
+    @staticmethod
+    def strip_search_verbs(text: str) -> str:
+        """Removes a leading "find videos of" from a hybrid search description."""
+        match = SEARCH_PATTERN.match(text.strip())
+        return match.group("text").strip(" .") if match else text.strip()
+
+    async def answer_async(
+        self, route: QueryRoute, agent: Optional["Agent"] = None
+    ) -> str:
+        """Runs a direct search and formats the answer.
+        The exchange is added to the agent's conversation, so follow-up questions
+        handled by the agent can refer to these results.
+        Args:
+            route (QueryRoute): A direct search route.
+            agent (Agent): The conversation's agent, if any.
+        Returns:
+            str: The answer, as Markdown.
+        """
+        self.logger.info(f"Fast path {route.mode} search: {route}")
+        tools = self.custom_tools
+
+        if route.mode == "keyword":
+            results = await tools.keyword_search_for_videos_async(
+                route.keywords, route.results_size
+            )
+        else:
+            report_progress("Creating text embedding")
+            handle = await tools.create_text_embedding_async(route.text)
+            if route.mode == "hybrid":
+                results = await tools.hybrid_search_for_videos_async(
+                    handle, route.keywords, route.results_size
+                )
+            elif route.mode == "segments":
+                results = await tools.semantic_search_for_video_segments_async(
+                    handle, route.results_size
+                )
+            else:
+                results = await tools.semantic_search_for_videos_async(
+                    handle, route.results_size
+                )
+
+        # Compact tool output points to the full records, which the user should see
+        if "videos" in results:
+            # Segments grouped by video; the answer has a line per segment
+            records = flatten_segment_groups(
+                tools.result_store.expand(results["videos"])
+            )
+        else:
+            records = tools.result_store.expand(results.get("results", []))
+        answer = self.format_answer(route, records)
+        if agent is not None:
+            agent.messages.append(
+                {"role": "user", "content": [{"text": self.describe(route)}]}
+            )
+            agent.messages.append({"role": "assistant", "content": [{"text": answer}]})
+        return answer
+
+    @staticmethod
+    def describe(route: QueryRoute) -> str:
+        """Returns a one-line description of a direct search."""
+        if route.mode == "keyword":
+            return f"Keyword search for videos: {', '.join(route.keywords)}"
+        if route.mode == "hybrid":
+            keywords = ", ".join(route.keywords)
+            return f"Search for videos of {route.text}, keywords: {keywords}"
+        if route.mode == "segments":
+            return f"Search for video segments of {route.text}"
+        return f"Search for videos of {route.text}"
+
+    @staticmethod
+    def format_answer(route: QueryRoute, results: list[dict]) -> str:
+        """Formats search results as a numbered Markdown list.
+        Args:
+            route (QueryRoute): The route that produced the results.
+            results (list[dict]): The formatted search results.
+        Returns:
+            str: The answer.
+        """
+        if not results:
+            return "No results found. Try a different query."
+
+        lines = [f"{QueryRouter.describe(route)}: {len(results)} results", ""]
+        for number, result in enumerate(results, start=1):
+            line = (
+                f"{number}. **{result['title']}** (`{result['videoName']}`, "
+                f"{result['durationSec']:.0f}s, score {result['score']:.3f})"
+            )
+            if "startSec" in result:
+                line += (
+                    f", segment {result['startSec']:.1f}-{result['endSec']:.1f}s "
+                    f"({result['embeddingOption']}, "
+                    f"score {result['segmentScore']:.3f})"
+                )
+            lines.append(line)
+            lines.append(f"   {result['summary']}")
+        return "\n".join(lines)
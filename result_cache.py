@@ -0,0 +1,281 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Cache configuration; a size or TTL of 0 disables the cache
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "512"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))  # seconds
+
+
+class _CachedResult(NamedTuple):
+    expires: float
+    index_name: str
+    response: dict
+
+
+class SearchResultCache:
+    """A TTL and size-bounded LRU cache for OpenSearch search responses.
+
+    Entries are keyed by the search mode, index name, result size and query input
+    (the query vector or the sorted keyword list). Concurrent identical searches
+    share a single request. Invalidating an index drops its entries and discards
+    any search for it that was already in flight, so an ingest or refresh is never
+    followed by stale results. Cached responses are shared and must not be mutated.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESULT_CACHE_SIZE,
+        ttl: float = RESULT_CACHE_TTL,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._entries: OrderedDict[str, _CachedResult] = OrderedDict()
+        self._in_flight: dict[str, tuple[Future, str]] = {}
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "in_flight_joins": 0,
+            "expirations": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "errors": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        """Whether responses are cached at all."""
+        return self.max_entries > 0 and self.ttl > 0
+
+    @staticmethod
+    def make_key(
+        mode: str,
+        index_name: str,
+        results_size: int,
+        include_embeddings: bool = False,
+        vector: Optional[list[float]] = None,
+        keywords: Optional[list[str]] = None,
+    ) -> str:
+        """Builds the cache key for a search.
+        Args:
+            mode (str): The search mode, e.g. "semantic", "keyword" or "segments".
+            index_name (str): The index searched.
+            results_size (int): The number of results requested.
+            include_embeddings (bool): Whether embeddings were requested.
+            vector (list[float]): The query vector, if any.
+            keywords (list[str]): The query keywords, if any; order is ignored.
+        Returns:
+            str: The hex digest identifying the search.
+        """
+        params = [mode, index_name, results_size, include_embeddings]
+        params.append(sorted(keywords or []))
+        digest = hashlib.sha256(json.dumps(params).encode("utf-8"))
+        if vector is not None:
+            digest.update(array("d", vector).tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Looks up an unexpired response.
+        Args:
+            key (str): The cache key.
+        Returns:
+            Optional[dict]: The cached response, or None on a miss.
+        """
+        with self._lock:
+            response = self._lookup(key)
+            if response is None:
+                self._stats["misses"] += 1
+            return response
+
+    def get_or_search(
+        self, key: str, index_name: str, search: Callable[[], dict]
+    ) -> dict:
+        """Returns the cached response, running the search at most once per key.
+        Args:
+            key (str): The cache key.
+            index_name (str): The index searched, for invalidation.
+            search (Callable[[], dict]): Runs the search.
+        Returns:
+            dict: The search response.
+        """
+        if not self.enabled:
+            return search()
+        future, generation = self._claim(key, index_name)
+        if generation is None:
+            return future.result()
+
+        try:
+            response = search()
+        except BaseException as err:
+            self._release(key, future, index_name, generation, error=err)
+            raise
+        self._release(key, future, index_name, generation, response=response)
+        return response
+
+    async def get_or_search_async(
+        self, key: str, index_name: str, search: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        """Async variant of get_or_search for coroutine-based searches.
+        Args:
+            key (str): The cache key.
+            index_name (str): The index searched, for invalidation.
+            search (Callable[[], Awaitable[dict]]): Runs the search.
+        Returns:
+            dict: The search response.
+        """
+        if not self.enabled:
+            return await search()
+        future, generation = self._claim(key, index_name)
+        if generation is None:
+            return await asyncio.wrap_future(future)
+
+        try:
+            response = await search()
+        except BaseException as err:
+            self._release(key, future, index_name, generation, error=err)
+            raise
+        self._release(key, future, index_name, generation, response=response)
+        return response
+
+    def invalidate(self, index_name: Optional[str] = None) -> int:
+        """Drops the cached responses for an index, or for every index.
+        Call this after ingesting into or refreshing an index.
+        Args:
+            index_name (str): The index to invalidate; None invalidates everything.
+        Returns:
+            int: The number of entries dropped.
+        """
+        with self._lock:
+            if index_name is None:
+                names = set(self._generations)
+                names.update(entry.index_name for entry in self._entries.values())
+                names.update(name for _, name in self._in_flight.values())
+                keys = list(self._entries)
+            else:
+                names = {index_name}
+                keys = [
+                    key
+                    for key, entry in self._entries.items()
+                    if entry.index_name == index_name
+                ]
+            for name in names:
+                self._generations[name] = self._generations.get(name, 0) + 1
+            for key in keys:
+                del self._entries[key]
+            # Searches already in flight finish for their callers but are not joined
+            for key, (_, name) in list(self._in_flight.items()):
+                if index_name is None or name == index_name:
+                    del self._in_flight[key]
+            self._stats["invalidations"] += 1
+        target = index_name or "all indexes"
+        self.logger.info(f"Invalidated {len(keys)} cached search results for {target}")
+        return len(keys)
+
+    def stats(self) -> dict:
+        """Returns the cache counters and current sizes.
+        Returns:
+            dict: Hit, miss, expiration, eviction and size counters.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+            stats["ttl"] = self.ttl
+            stats["in_flight"] = len(self._in_flight)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def _claim(self, key: str, index_name: str) -> tuple[Future, Optional[int]]:
+        """Resolves a key to a future, registering a new in-flight entry on a miss.
+        Returns:
+            tuple[Future, Optional[int]]: The future holding the response, and the index
+            generation when the caller owns the search and must release it.
+        """
+        with self._lock:
+            response = self._lookup(key)
+            future: Future = Future()
+            if response is not None:
+                future.set_result(response)
+                return future, None
+            if key in self._in_flight:
+                self._stats["in_flight_joins"] += 1
+                return self._in_flight[key][0], None
+            self._stats["misses"] += 1
+            self._in_flight[key] = (future, index_name)
+            return future, self._generations.get(index_name, 0)
+
+    def _release(
+        self,
+        key: str,
+        future: Future,
+        index_name: str,
+        generation: int,
+        response: Optional[dict] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """Completes an in-flight entry, caching the response unless it went stale."""
+        with self._lock:
+            if self._in_flight.get(key, (None,))[0] is future:
+                del self._in_flight[key]
+            if error is not None:
+                self._stats["errors"] += 1
+            elif self._generations.get(index_name, 0) == generation:
+                self._entries[key] = _CachedResult(
+                    time.monotonic() + self.ttl, index_name, response
+                )
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        if error is None:
+            future.set_result(response)
+        else:
+            future.set_exception(error)
+
+    def _lookup(self, key: str) -> Optional[dict]:
+        """Returns an unexpired entry. The caller must hold the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= time.monotonic():
+            del self._entries[key]
+            self._stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return entry.response
+
+
+_default_cache: Optional[SearchResultCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> SearchResultCache:
+    """Returns the process-wide search result cache, creating it on first use.
+    Returns:
+        SearchResultCache: The shared cache instance.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = SearchResultCache()
+        return _default_cache
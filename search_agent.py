@@ -1,29 +1,63 @@
+import weakref
 from logging import Logger
 
 from strands import Agent
 from strands.agent.conversation_manager import SlidingWindowConversationManager
 from strands.models import BedrockModel
-from strands_tools import calculator, current_time, shell
 
 from custom_tools import CustomTools
 
 
+def load_builtin_tools() -> list:
+    """Returns the Strands built-in tools the agent offers.
+    They are imported on first use: strands_tools.calculator imports sympy, which
+    takes longer to import than the rest of the agent.
+    Returns:
+        list: The calculator, current_time and shell tools.
+    """
+    from strands_tools import calculator, current_time, shell
+
+    return [calculator, current_time, shell]
+
+
 class SearchAgent:
     def __init__(self, logger: Logger):
         # Set up custom logging
         self.logger = logger
         self.custom_tools = CustomTools(logger=logger)
+        self._models: dict[tuple, BedrockModel] = {}
+        # The tools instance of each agent created, dropped with the agent
+        self._agent_tools: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def get_model(
+        self, model_id: str, region_name: str, temperature: float
+    ) -> BedrockModel:
+        """Returns the Bedrock model for a configuration, creating it on first use.
+        Models hold no conversation state, so one model serves every agent.
+        Args:
+            model_id (str): The Bedrock model ID.
+            region_name (str): The AWS region of the model.
+            temperature (float): The sampling temperature.
+        Returns:
+            BedrockModel: The model.
+        """
+        key = (model_id, region_name, temperature)
+        if key not in self._models:
+            self._models[key] = BedrockModel(
+                model_id=model_id,
+                region_name=region_name,
+                temperature=temperature,
+            )
+        return self._models[key]
 
     def create_agent(
         self, model_id: str, region_name: str, temperature: float
     ) -> Agent:
-        # Create a BedrockModel instance
+        # Each agent gets its own tools instance, and so its own text embedding
+        custom_tools = self.custom_tools.clone()
 
-        model = BedrockModel(
-            model_id=model_id,
-            region_name=region_name,
-            temperature=temperature,
-        )
+        # Create a BedrockModel instance, shared by agents with the same configuration
+        model = self.get_model(model_id, region_name, temperature)
 
         # Create an Ollama model instance
         # model = OllamaModel(
@@ -37,37 +71,78 @@ class SearchAgent:
             window_size=20,
         )
 
-        # Define a system prompt for the agent
-        main_system_prompt = """You are a helpful search assistant that can use various tools to search OpenSearch for TV commercials 
+        # The search tools, each with its description in the system prompt
+        search_tools = [
+            (
+                custom_tools.create_text_embedding_async,
+                "**Text Embedding**: Create a dense vector embedding from the user's text query. It returns an embedding handle, such as \"emb-3f2a9c1b7d4e\".",
+            ),
+            (
+                custom_tools.semantic_search_for_videos_async,
+                "**Semantic Search for Videos**: Perform a semantic search for videos using the generated text embedding.",
+            ),
+            (
+                custom_tools.semantic_search_for_video_segments_async,
+                "**Semantic Search for Video Segments**: Perform a semantic search for video segments using the generated text embedding.",
+            ),
+            (
+                custom_tools.keyword_search_for_videos_async,
+                "**Keyword Search for Videos**: Perform a keyword search for videos using a list of keywords.",
+            ),
+            (
+                custom_tools.hybrid_search_for_videos_async,
+                "**Hybrid Search for Videos**: Perform a semantic and a keyword search for videos in one step, using the generated text embedding and a list of keywords.",
+            ),
+        ]
+        # Compact search results refer to the full records by result ID
+        if custom_tools.tool_output_mode == "compact":
+            search_tools.append(
+                (
+                    custom_tools.get_search_results,
+                    "**Get Search Results**: Get the full records of earlier results by their result IDs, such as \"res-3f2a9c1b\", when search results are shortened.",
+                )
+            )
+        tool_list = "\n".join(
+            f"        {number}. {description}"
+            for number, (_, description) in enumerate(search_tools, start=1)
+        )
+
+        # Define a system prompt for the agent, listing the tools it is given
+        main_system_prompt = f"""You are a helpful search assistant that can use various tools to search OpenSearch for TV commercials
         (aka videos) or segments of commercials (aka video segments) based on user queries.
         You can use the following tools:
-        1. **Text Embedding**: Create a dense vector embedding from the user's text query.
-        2. **Semantic Search for Videos**: Perform a semantic search for videos using the generated text embedding.
-        3. **Semantic Search for Video Segments**: Perform a semantic search for video segments using the generated text embedding.
-        4. **Keyword Search for Videos**: Perform a keyword search for videos using a list of keywords.
+{tool_list}
 
-        The user will either provide a text-based search query that which you will use to create a dense vector embedding from. 
-        Or, the user will explicitly provide a list of keywords. 
+        The user will either provide a text-based search query that which you will use to create a dense vector embedding from.
+        Or, the user will explicitly provide a list of keywords.
         You will either perform a semantic search in OpenSearch using the embedding you created for either videos or video segments,
         or perform a keyword search for videos using the provided keywords.
+        If the user provides both a text-based search query and a list of keywords, create the embedding and use the hybrid search for videos.
+        Pass the embedding handle returned by the text embedding tool to the semantic or hybrid search. Never make up a handle.
         Only perform **one** search at a time.
-        If you cannot find any results, return a message indicating that no results were found. 
+        If you cannot find any results, return a message indicating that no results were found.
         If you encounter an error, return a message indicating that an error occurred.
         """
 
+        tools = [*load_builtin_tools(), *(tool for tool, _ in search_tools)]
+
         # Create an agent with these tools
         search_agent = Agent(
             system_prompt=main_system_prompt,
             model=model,
-            tools=[
-                calculator,
-                current_time,
-                shell,
-                self.custom_tools.create_text_embedding,
-                self.custom_tools.keyword_search_for_videos,
-                self.custom_tools.semantic_search_for_videos,
-                self.custom_tools.semantic_search_for_video_segments,
-            ],
+            tools=tools,
             conversation_manager=conversation_manager,
         )
+        self._agent_tools[search_agent] = custom_tools
         return search_agent
+
+    def agent_tools(self, agent: Agent) -> CustomTools:
+        """Returns the tools instance of an agent made by create_agent.
+        A QueryRouter over these tools shares the agent's embedding handles and
+        result store, so the agent can refer to fast-path results.
+        Args:
+            agent (Agent): The agent.
+        Returns:
+            CustomTools: The agent's own tools.
+        """
+        return self._agent_tools[agent]
@@ -0,0 +1,481 @@
+# Video Search API
+# Agent-free JSON endpoints over the CustomTools search operations, for programmatic
+# and batch clients. Runs next to app.py and shares no state with it.
+# Start with `python search_api.py`, or `uvicorn search_api:app`.
+# Opens on http://127.0.0.1:8000/ (interactive docs at /docs)
+
+import asyncio
+import json
+import os
+from typing import (
+    Annotated,
+    AsyncIterator,
+    Awaitable,
+    Literal,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, model_validator
+
+from basic_logging import BasicLogging
+from custom_tools import CustomTools
+from data import VideoSearchResults, VideoSegmentGroups, VideoSegmentSearchResults
+from embedding_backends import embedding_dimensions
+from event_loop import on_background_loop
+from local_search import SEARCH_BACKEND, reload_local_index
+from opensearch_client import opensearch_pool_stats
+from search_formatting import (
+    format_search_results,
+    format_search_results_segments,
+    format_search_results_segments_grouped,
+)
+from search_pagination import SEARCH_DEEP_MAX_RESULTS, SEARCH_PAGE_SIZE
+from telemetry import render_metrics
+
+# Load environment variables from .env file
+load_dotenv()
+
+# API configuration
+SEARCH_API_HOST = os.getenv("SEARCH_API_HOST", "127.0.0.1")
+SEARCH_API_PORT = int(os.getenv("SEARCH_API_PORT", "8000"))
+SEARCH_API_TIMEOUT = float(os.getenv("SEARCH_API_TIMEOUT", "30"))  # seconds
+SEARCH_API_MAX_TIMEOUT = float(os.getenv("SEARCH_API_MAX_TIMEOUT", "120"))
+SEARCH_API_MAX_BATCH = int(os.getenv("SEARCH_API_MAX_BATCH", "32"))
+
+# The configured embedding backend's dimensions, 1,024 for Marengo
+EMBEDDING_DIMENSIONS = embedding_dimensions()
+
+T = TypeVar("T")
+
+# Per-request timeout, in seconds; defaults to SEARCH_API_TIMEOUT
+Timeout = Annotated[
+    Optional[float], Field(default=None, gt=0, le=SEARCH_API_MAX_TIMEOUT)
+]
+Embedding = Annotated[
+    list[float],
+    Field(min_length=EMBEDDING_DIMENSIONS, max_length=EMBEDDING_DIMENSIONS),
+]
+ResultsSize = Annotated[int, Field(default=6, ge=1, le=100)]
+
+
+class EmbeddingRequest(BaseModel):
+    texts: list[str] = Field(min_length=1, max_length=SEARCH_API_MAX_BATCH)
+    timeout: Timeout
+
+
+class TextEmbedding(BaseModel):
+    text: str
+    embedding: Optional[list[float]] = None
+    error: Optional[str] = None
+
+
+class EmbeddingResponse(BaseModel):
+    embeddings: list[TextEmbedding]
+
+
+class VideoSearchRequest(BaseModel):
+    """A semantic search, by text or by a precomputed Marengo embedding."""
+
+    type: Literal["videos"] = "videos"
+    text: Optional[str] = None
+    embedding: Optional[Embedding] = None
+    results_size: ResultsSize
+    timeout: Timeout
+
+    @model_validator(mode="after")
+    def check_query(self):
+        if (self.text is None) == (self.embedding is None):
+            raise ValueError("Provide exactly one of text or embedding")
+        return self
+
+
+class SegmentSearchRequest(VideoSearchRequest):
+    type: Literal["segments"] = "segments"
+
+
+class KeywordSearchRequest(BaseModel):
+    type: Literal["keywords"] = "keywords"
+    keywords: list[str] = Field(min_length=1)
+    results_size: ResultsSize
+    timeout: Timeout
+
+
+SearchRequest = Annotated[
+    Union[VideoSearchRequest, SegmentSearchRequest, KeywordSearchRequest],
+    Field(discriminator="type"),
+]
+
+
+class BatchSearchRequest(BaseModel):
+    searches: list[SearchRequest] = Field(min_length=1, max_length=SEARCH_API_MAX_BATCH)
+    timeout: Timeout
+
+
+class DeepSearchRequest(BaseModel):
+    """A search for up to max_results results, streamed a page at a time."""
+
+    type: Literal["videos", "segments", "keywords"] = "videos"
+    text: Optional[str] = None
+    embedding: Optional[Embedding] = None
+    keywords: Optional[list[str]] = Field(default=None, min_length=1)
+    max_results: int = Field(default=500, ge=1, le=SEARCH_DEEP_MAX_RESULTS)
+    page_size: int = Field(default=SEARCH_PAGE_SIZE, ge=1, le=1_000)
+    # Applies to embedding the text and to each page
+    timeout: Timeout
+
+    @model_validator(mode="after")
+    def check_query(self):
+        if self.type == "keywords":
+            if self.keywords is None or self.text or self.embedding:
+                raise ValueError("Keyword searches take keywords only")
+        elif self.keywords is not None or (self.text is None) == (
+            self.embedding is None
+        ):
+            raise ValueError("Provide exactly one of text or embedding")
+        return self
+
+
+class CacheInvalidationRequest(BaseModel):
+    """Drops cached search results after an ingest into, or a refresh of, an index."""
+
+    # The index to invalidate; None invalidates every index
+    index_name: Optional[str] = None
+
+
+class CacheInvalidationResponse(BaseModel):
+    invalidated: int
+    local_index_reloaded: bool
+
+
+class BatchSearchResult(BaseModel):
+    """The results of one search in a batch, or the error that occurred."""
+
+    results: Optional[list[dict]] = None
+    error: Optional[str] = None
+
+
+class BatchSearchResponse(BaseModel):
+    responses: list[BatchSearchResult]
+
+
+class SearchService:
+    """Runs searches without the agent, reusing the CustomTools clients and caches.
+    The search methods run on the background event loop, where the shared async
+    OpenSearch client lives.
+    """
+
+    def __init__(self, custom_tools: CustomTools):
+        self.custom_tools = custom_tools
+        self.logger = custom_tools.logger
+
+    async def embed(self, texts: list[str]) -> dict[str, TextEmbedding]:
+        """Embeds texts in one batch; cached texts do not start a Bedrock job.
+        Args:
+            texts (list[str]): The texts to embed.
+        Returns:
+            dict[str, TextEmbedding]: The embedding, or the error, of each unique text.
+        """
+        embeddings = {}
+        batch = self.custom_tools.create_text_embeddings_batch_async(list(set(texts)))
+        async for result in batch:
+            embeddings[result.text] = TextEmbedding(
+                text=result.text,
+                embedding=result.embedding,
+                error=str(result.error) if result.error else None,
+            )
+        return embeddings
+
+    @on_background_loop
+    async def search_videos(self, embedding: list[float], results_size: int) -> dict:
+        """Returns the videos closest to an embedding, as VideoSearchResults."""
+        video_search = self.custom_tools.video_search
+        raw_search_results = await video_search.semantic_search_async(
+            video_search.create_async_opensearch_client(), embedding, results_size
+        )
+        return format_search_results(raw_search_results)
+
+    @on_background_loop
+    async def search_segments(self, embedding: list[float], results_size: int) -> dict:
+        """Returns the segments closest to an embedding, in the segment schema."""
+        video_search = self.custom_tools.video_search
+        raw_search_results = await video_search.semantic_search_segments_async(
+            video_search.create_async_opensearch_client(), embedding, results_size
+        )
+        return format_search_results_segments(raw_search_results)
+
+    @on_background_loop
+    async def search_segments_grouped(
+        self, embedding: list[float], results_size: int
+    ) -> dict:
+        """Returns the segments closest to an embedding, grouped by video."""
+        video_search = self.custom_tools.video_search
+        raw_search_results = await video_search.semantic_search_segments_async(
+            video_search.create_async_opensearch_client(), embedding, results_size
+        )
+        return format_search_results_segments_grouped(raw_search_results)
+
+    @on_background_loop
+    async def search_keywords(self, keywords: list[str], results_size: int) -> dict:
+        """Returns the videos matching keywords, as VideoSearchResults."""
+        video_search = self.custom_tools.video_search
+        raw_search_results = await video_search.keyword_search_async(
+            video_search.create_async_opensearch_client(), keywords, results_size
+        )
+        return format_search_results(raw_search_results)
+
+    async def search(
+        self,
+        request: SearchRequest,
+        embedding: Optional[list[float]] = None,
+        grouped: bool = False,
+    ) -> dict:
+        """Runs one search request.
+        Args:
+            request (SearchRequest): The search.
+            embedding (list[float]): The embedding of the request's text, if any.
+            grouped (bool): Whether segment results are grouped by video.
+        Returns:
+            dict: The formatted search results.
+        """
+        if isinstance(request, KeywordSearchRequest):
+            return await self.search_keywords(request.keywords, request.results_size)
+        if embedding is None:
+            embedding = request.embedding
+        if embedding is None:
+            text_embedding = (await self.embed([request.text]))[request.text]
+            if text_embedding.error:
+                raise RuntimeError(text_embedding.error)
+            embedding = text_embedding.embedding
+        if isinstance(request, SegmentSearchRequest):
+            if grouped:
+                return await self.search_segments_grouped(
+                    embedding, request.results_size
+                )
+            return await self.search_segments(embedding, request.results_size)
+        return await self.search_videos(embedding, request.results_size)
+
+    async def deep_search(
+        self, request: DeepSearchRequest, query_input: list
+    ) -> AsyncIterator[dict]:
+        """Streams a deep search's formatted pages.
+        Args:
+            request (DeepSearchRequest): The search.
+            query_input (list): The request's embedding, or its keywords.
+        Yields:
+            dict: Each page, as {"results": [...]}, or {"videos": [...]} for segments.
+        """
+        video_search = self.custom_tools.video_search
+        pages = video_search.deep_search_async(
+            video_search.create_async_opensearch_client(),
+            request.type,
+            query_input,
+            request.max_results,
+            request.page_size,
+        )
+        async for page in pages:
+            yield page
+
+    async def search_batch(
+        self, requests: list[SearchRequest]
+    ) -> list[BatchSearchResult]:
+        """Runs many searches concurrently, embedding all of their texts in one batch.
+        Args:
+            requests (list[SearchRequest]): The searches.
+        Returns:
+            list[BatchSearchResult]: The results or error of each search, in order.
+        """
+        texts = [
+            request.text
+            for request in requests
+            if getattr(request, "text", None) is not None
+        ]
+        embeddings = await self.embed(texts) if texts else {}
+
+        async def run(request: SearchRequest) -> BatchSearchResult:
+            embedding = None
+            text = getattr(request, "text", None)
+            if text is not None:
+                if embeddings[text].error:
+                    return BatchSearchResult(error=embeddings[text].error)
+                embedding = embeddings[text].embedding
+            try:
+                search_results = await self.search(request, embedding)
+            except Exception as err:
+                self.logger.error(f"Batch search failed: {err}")
+                return BatchSearchResult(error=str(err))
+            return BatchSearchResult(results=search_results["results"])
+
+        return list(await asyncio.gather(*(run(request) for request in requests)))
+
+
+async def run_with_timeout(awaitable: Awaitable[T], timeout: Optional[float]) -> T:
+    """Awaits a search, mapping timeouts and backend failures to HTTP errors.
+    Args:
+        awaitable (Awaitable): The search.
+        timeout (float): Seconds to wait, or None for SEARCH_API_TIMEOUT.
+    Returns:
+        The search's result.
+    Raises:
+        HTTPException: 504 when the timeout expires, 502 when the search fails.
+    """
+    timeout = timeout or SEARCH_API_TIMEOUT
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError as err:
+        message = f"Request timed out after {timeout:g} seconds"
+        raise HTTPException(504, message) from err
+    except HTTPException:
+        raise
+    except Exception as err:
+        logger.error(f"Search request failed: {err}")
+        raise HTTPException(502, f"Search failed: {err}") from err
+
+
+async def next_page(pages: AsyncIterator[dict]) -> Optional[dict]:
+    """Returns the next page of a deep search, or None after the last page."""
+    try:
+        return await anext(pages)
+    except StopAsyncIteration:
+        return None
+
+
+logger = BasicLogging.setup_logging()
+
+search_service = SearchService(CustomTools(logger=logger))
+
+app = FastAPI(
+    title="Video Search API",
+    description="Agent-free semantic, segment and keyword search over the video index.",
+)
+
+
+@app.post("/embeddings", response_model=EmbeddingResponse)
+async def create_embeddings(request: EmbeddingRequest):
+    """Creates Marengo text embeddings, one batch of Bedrock jobs per request."""
+    embeddings = await run_with_timeout(
+        search_service.embed(request.texts), request.timeout
+    )
+    return EmbeddingResponse(embeddings=[embeddings[text] for text in request.texts])
+
+
+@app.post("/search/videos", response_model=VideoSearchResults)
+async def search_videos(request: VideoSearchRequest):
+    """Semantic search for unique videos."""
+    return await run_with_timeout(search_service.search(request), request.timeout)
+
+
+@app.post("/search/segments", response_model=VideoSegmentSearchResults)
+async def search_segments(request: SegmentSearchRequest):
+    """Semantic search for video segments."""
+    return await run_with_timeout(search_service.search(request), request.timeout)
+
+
+@app.post("/search/segments/grouped", response_model=VideoSegmentGroups)
+async def search_segments_grouped(request: SegmentSearchRequest):
+    """Semantic search for video segments, each video listed once with its segments."""
+    return await run_with_timeout(
+        search_service.search(request, grouped=True), request.timeout
+    )
+
+
+@app.post("/search/deep")
+async def search_deep(request: DeepSearchRequest):
+    """Streams up to max_results results as NDJSON, one result per line.
+    Results are fetched and formatted a page at a time, so memory use is bounded by
+    page_size. Segment results are grouped, one line per video. A failure after the
+    first page ends the stream with an {"error": ...} line.
+    """
+    query_input = request.keywords or request.embedding
+    if query_input is None:
+        embeddings = await run_with_timeout(
+            search_service.embed([request.text]), request.timeout
+        )
+        text_embedding = embeddings[request.text]
+        if text_embedding.error:
+            raise HTTPException(502, f"Embedding failed: {text_embedding.error}")
+        query_input = text_embedding.embedding
+
+    pages = search_service.deep_search(request, query_input)
+    key = "videos" if request.type == "segments" else "results"
+    # Fetch the first page before responding, so its errors get a status code
+    try:
+        first_page = await run_with_timeout(next_page(pages), request.timeout)
+    except HTTPException:
+        # Deletes the point-in-time, instead of leaving it to its keep-alive
+        await pages.aclose()
+        raise
+
+    async def lines():
+        page = first_page
+        try:
+            while page is not None:
+                for result in page[key]:
+                    yield json.dumps(result) + "\n"
+                page = await run_with_timeout(next_page(pages), request.timeout)
+        except HTTPException as err:
+            yield json.dumps({"error": err.detail}) + "\n"
+        finally:
+            await pages.aclose()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post("/search/keywords", response_model=VideoSearchResults)
+async def search_keywords(request: KeywordSearchRequest):
+    """Keyword search for unique videos."""
+    return await run_with_timeout(search_service.search(request), request.timeout)
+
+
+@app.post("/search/batch", response_model=BatchSearchResponse)
+async def search_batch(request: BatchSearchRequest):
+    """Runs up to SEARCH_API_MAX_BATCH searches of any type concurrently."""
+    responses = await run_with_timeout(
+        search_service.search_batch(request.searches), request.timeout
+    )
+    return BatchSearchResponse(responses=responses)
+
+
+@app.post("/cache/invalidate", response_model=CacheInvalidationResponse)
+async def invalidate_cache(request: CacheInvalidationRequest):
+    """Drops cached search results, for ingest pipelines to call after writing.
+    With SEARCH_BACKEND=local, the local index is reloaded from disk as well.
+    """
+    invalidated = search_service.custom_tools.result_cache.invalidate(
+        request.index_name
+    )
+    reloaded = SEARCH_BACKEND == "local"
+    if reloaded:
+        await asyncio.to_thread(reload_local_index)
+    return CacheInvalidationResponse(
+        invalidated=invalidated, local_index_reloaded=reloaded
+    )
+
+
+@app.get("/health")
+async def health():
+    """Reports connection pool and cache usage."""
+    tools = search_service.custom_tools
+    return {
+        "status": "ok",
+        "model": tools.embedding_backend.model_id,
+        "embedding_backend": tools.embedding_backend.name,
+        "opensearch_pool": opensearch_pool_stats(),
+        "embedding_cache": tools.embedding_cache.stats(),
+        "result_cache": tools.result_cache.stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Serves the search pipeline histograms in Prometheus text format."""
+    return render_metrics()
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host=SEARCH_API_HOST, port=SEARCH_API_PORT)
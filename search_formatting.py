@@ -0,0 +1,85 @@
+import os
+
+from dotenv import load_dotenv
+
+from data import (
+    VideoSearchResults,
+    VideoSegmentGroups,
+    VideoSegmentSearchResults,
+    segment_group_dict,
+    segment_result_dicts,
+    video_result_dict,
+)
+from telemetry import stage
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Validate search hits with the pydantic models while formatting; by default the
+# result dicts are built directly, as responses from our own index are trusted
+FORMAT_VALIDATE_RESULTS = (
+    os.getenv("FORMAT_VALIDATE_RESULTS", "false").lower() == "true"
+)
+
+
+def format_search_results(raw_search_results: dict) -> dict:
+    """Formats the raw search results for videos from OpenSearch into a structured format.
+    This function processes the raw search results returned by OpenSearch and converts them
+    into a structured format that includes video metadata such as video name, title, summary,
+    keywords, duration, S3 URI, keyframe URL, and score.
+    Args:
+        raw_search_results (dict): The raw search results from OpenSearch.
+    Returns:
+        dict: The formatted search results.
+    """
+    with stage("format_search_results"):
+        # filter_path drops the "hits" key entirely when nothing matched
+        hits = raw_search_results.get("hits", {}).get("hits", [])
+        results = [video_result_dict(hit) for hit in hits]
+
+        if FORMAT_VALIDATE_RESULTS:
+            return VideoSearchResults(results=results).to_dict()
+        return {"results": results}
+
+
+def format_search_results_segments(raw_search_results: dict) -> dict:
+    """Formats the raw search results for video segments from OpenSearch into a structured format.
+    This function processes the raw search results returned by OpenSearch and converts them
+    into a structured format that includes video segment metadata such as video name, title,
+    summary, keywords, duration, S3 URI, keyframe URL, start and end times, embedding option,
+    and score.
+    Args:
+        raw_search_results (dict): The raw search results from OpenSearch.
+    Returns:
+        dict: The formatted search results.
+    """
+    with stage("format_search_results_segments"):
+        # filter_path drops the "hits" key entirely when nothing matched
+        hits = raw_search_results.get("hits", {}).get("hits", [])
+        results = []
+        for hit in hits:
+            results.extend(segment_result_dicts(hit))
+
+        if FORMAT_VALIDATE_RESULTS:
+            return VideoSegmentSearchResults(results=results).to_dict()
+        return {"results": results}
+
+
+def format_search_results_segments_grouped(raw_search_results: dict) -> dict:
+    """Formats the raw search results for video segments, grouped by video.
+    Each video's metadata appears once, followed by its matching segments, instead
+    of being repeated for every segment. data.flatten_segment_groups converts the
+    videos to the format_search_results_segments results.
+    Args:
+        raw_search_results (dict): The raw search results from OpenSearch.
+    Returns:
+        dict: The formatted search results, as {"videos": [...]}.
+    """
+    with stage("format_search_results_segments_grouped"):
+        # filter_path drops the "hits" key entirely when nothing matched
+        hits = raw_search_results.get("hits", {}).get("hits", [])
+        videos = [segment_group_dict(hit) for hit in hits]
+
+        if FORMAT_VALIDATE_RESULTS:
+            return VideoSegmentGroups(videos=videos).to_dict()
+        return {"videos": videos}
@@ -0,0 +1,148 @@
+import logging
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+from opensearchpy.exceptions import OpenSearchException
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Deep result retrieval; memory use depends on the page size, not the result count
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "100"))
+SEARCH_DEEP_MAX_RESULTS = int(os.getenv("SEARCH_DEEP_MAX_RESULTS", "5000"))
+SEARCH_PIT_KEEP_ALIVE = os.getenv("SEARCH_PIT_KEEP_ALIVE", "1m")
+
+# Relevance order; _shard_doc breaks ties, so search_after never skips a hit
+PIT_SORT = [{"_score": "desc"}, {"_shard_doc": "asc"}]
+# Response fields search_after needs, on top of the query's own filter_path
+PAGE_FILTER_PATH = "pit_id,hits.hits.sort"
+
+
+class SearchPager:
+    """Pages through up to max_results hits of a search, page_size at a time.
+    Pages are read from a point-in-time with search_after, so they are consistent
+    while the index changes and no page costs more than the first. Without
+    point-in-time support, such as on the local index or an older cluster, pages
+    are read with from/size instead, which OpenSearch limits to the index's
+    max_result_window (10,000 by default).
+    The pager only builds requests and tracks position; the caller sends them, so
+    the same pager serves the sync and async clients.
+    """
+
+    def __init__(
+        self,
+        query: dict,
+        index: str,
+        max_results: int = SEARCH_DEEP_MAX_RESULTS,
+        page_size: int = SEARCH_PAGE_SIZE,
+        filter_path: Optional[str] = None,
+        keep_alive: str = SEARCH_PIT_KEEP_ALIVE,
+    ):
+        self.query = query
+        self.index = index
+        self.max_results = max_results
+        self.page_size = page_size
+        self.filter_path = filter_path
+        self.keep_alive = keep_alive
+        self.pit_id: Optional[str] = None
+        self.search_after: Optional[list] = None
+        self.returned = 0
+        self.done = max_results <= 0
+
+    def create_pit_request(self, opensearch_client) -> Optional[dict]:
+        """Returns the create_pit arguments, or None when the client has no PIT."""
+        if not hasattr(opensearch_client, "create_pit"):
+            return None
+        return {"index": self.index, "params": {"keep_alive": self.keep_alive}}
+
+    def opened(self, response: Optional[dict]) -> None:
+        """Records the created point-in-time."""
+        if response is not None:
+            self.pit_id = response["pit_id"]
+
+    def open(self, opensearch_client, logger: logging.Logger) -> None:
+        """Creates the point-in-time, or falls back to from/size.
+        Args:
+            opensearch_client (OpenSearch): The client that runs the searches.
+            logger (logging.Logger): Receives the fallback warning.
+        """
+        request = self.create_pit_request(opensearch_client)
+        if request is None:
+            return
+        try:
+            self.opened(opensearch_client.create_pit(**request))
+        except OpenSearchException as err:
+            logger.warning(f"Point-in-time unavailable, paging with from/size: {err}")
+
+    async def open_async(self, opensearch_client, logger: logging.Logger) -> None:
+        """Async variant of open."""
+        request = self.create_pit_request(opensearch_client)
+        if request is None:
+            return
+        try:
+            self.opened(await opensearch_client.create_pit(**request))
+        except OpenSearchException as err:
+            logger.warning(f"Point-in-time unavailable, paging with from/size: {err}")
+
+    def close(self, opensearch_client, logger: logging.Logger) -> None:
+        """Deletes the point-in-time, if one was created."""
+        pit_id, self.pit_id = self.pit_id, None
+        self.done = True
+        if pit_id is None:
+            return
+        try:
+            opensearch_client.delete_pit(body={"pit_id": [pit_id]})
+        except OpenSearchException as err:
+            logger.warning(f"Failed to delete point-in-time: {err}")
+
+    async def close_async(self, opensearch_client, logger: logging.Logger) -> None:
+        """Async variant of close."""
+        pit_id, self.pit_id = self.pit_id, None
+        self.done = True
+        if pit_id is None:
+            return
+        try:
+            await opensearch_client.delete_pit(body={"pit_id": [pit_id]})
+        except OpenSearchException as err:
+            logger.warning(f"Failed to delete point-in-time: {err}")
+
+    def next_request(self) -> dict:
+        """Returns the search arguments for the next page.
+        Returns:
+            dict: Keyword arguments for the client's search method.
+        """
+        size = min(self.page_size, self.max_results - self.returned)
+        body = dict(self.query, size=size)
+        request = {"body": body}
+        if self.pit_id is not None:
+            # A point-in-time search names its index in the PIT, not the request
+            body["pit"] = {"id": self.pit_id, "keep_alive": self.keep_alive}
+            body["sort"] = PIT_SORT
+            body["track_scores"] = True
+            if self.search_after is not None:
+                body["search_after"] = self.search_after
+        else:
+            body["from"] = self.returned
+            request["index"] = self.index
+        if self.filter_path:
+            request["filter_path"] = f"{self.filter_path},{PAGE_FILTER_PATH}"
+        return request
+
+    def advance(self, request: dict, response: dict) -> list[dict]:
+        """Records a page's position and returns its hits.
+        Args:
+            request (dict): The next_request arguments the page was fetched with.
+            response (dict): The search response.
+        Returns:
+            list[dict]: The page's hits.
+        """
+        # filter_path drops the "hits" key entirely when nothing matched
+        hits = response.get("hits", {}).get("hits", [])
+        self.returned += len(hits)
+        if len(hits) < request["body"]["size"] or self.returned >= self.max_results:
+            self.done = True
+        if hits and self.pit_id is not None:
+            self.search_after = hits[-1]["sort"]
+            self.pit_id = response.get("pit_id", self.pit_id)
+        return hits
@@ -0,0 +1,171 @@
+from typing import Callable
+
+from local_search import VIDEO_FIELDS
+from search_formatting import (
+    format_search_results,
+    format_search_results_segments_grouped,
+)
+
+# Response fields kept by filter_path; everything else is trimmed by OpenSearch
+VIDEO_FILTER_PATH = "took,hits.hits._id,hits.hits._score,hits.hits._source"
+SEGMENT_FILTER_PATH = (
+    VIDEO_FILTER_PATH + ",hits.hits.inner_hits.embeddings.hits.hits._nested.offset"
+    ",hits.hits.inner_hits.embeddings.hits.hits._score"
+    ",hits.hits.inner_hits.embeddings.hits.hits.fields"
+)
+
+
+def build_source_filter(include_embeddings: bool = False) -> dict:
+    """Builds the _source filter that returns only the fields the results render.
+    Args:
+        include_embeddings (bool): Also return the nested segment embeddings.
+    Returns:
+        dict: The _source filter.
+    """
+    if include_embeddings:
+        return {"includes": VIDEO_FIELDS + ["embeddings"]}
+    return {"includes": VIDEO_FIELDS}
+
+
+def build_semantic_query(
+    text_embedding: list,
+    results_size: int = 6,
+    include_embeddings: bool = False,
+) -> dict:
+    """Builds the nested kNN query for a semantic search for videos.
+    Args:
+        text_embedding (list): The text embedding to use for the search.
+        results_size (int): The number of results to return.
+        include_embeddings (bool): Also return the nested segment embeddings.
+    Returns:
+        dict: The OpenSearch query body.
+    """
+    return {
+        "query": {
+            "nested": {
+                "path": "embeddings",
+                "query": {
+                    "knn": {
+                        "embeddings.embedding": {
+                            "vector": text_embedding,
+                            "k": results_size,
+                        }
+                    }
+                },
+            }
+        },
+        "size": results_size,
+        "_source": build_source_filter(include_embeddings),
+    }
+
+
+def build_keyword_query(
+    keyword_list: list,
+    results_size: int = 6,
+    include_embeddings: bool = False,
+) -> dict:
+    """Builds the terms query for a keyword search for videos.
+    Args:
+        keyword_list (list): The list of keywords to search for.
+        results_size (int): The number of results to return.
+        include_embeddings (bool): Also return the nested segment embeddings.
+    Returns:
+        dict: The OpenSearch query body.
+    """
+    return {
+        "query": {"terms": {"keywords": keyword_list}},
+        "size": results_size,
+        "_source": build_source_filter(include_embeddings),
+    }
+
+
+def build_segment_query(
+    text_embedding: list,
+    results_size: int = 6,
+    include_embeddings: bool = False,
+) -> dict:
+    """Builds the nested kNN query with inner hits for a semantic search for video segments.
+    Args:
+        text_embedding (list): The text embedding to use for the search.
+        results_size (int): The number of results to return.
+        include_embeddings (bool): Also return each segment's embedding, e.g. for
+            client-side reranking.
+    Returns:
+        dict: The OpenSearch query body.
+    """
+    inner_hit_fields = [
+        "embeddings.startSec",
+        "embeddings.endSec",
+        "embeddings.embeddingOption",
+    ]
+    if include_embeddings:
+        inner_hit_fields.append("embeddings.embedding")
+    return {
+        "query": {
+            "nested": {
+                "path": "embeddings",
+                "query": {
+                    "knn": {
+                        "embeddings.embedding": {
+                            "vector": text_embedding,
+                            "k": results_size,
+                            "expand_nested_docs": True,
+                            "rescore": True,
+                        }
+                    }
+                },
+                "inner_hits": {
+                    "_source": False,
+                    "fields": inner_hit_fields,
+                    "size": 25,
+                },
+                "score_mode": "max",
+            }
+        },
+        "size": results_size,
+        "_source": build_source_filter(include_embeddings),
+    }
+
+
+def build_hybrid_queries(
+    text_embedding: list, keyword_list: list, window_size: int
+) -> list[dict]:
+    """Builds the semantic and keyword queries fused by a hybrid search.
+    Args:
+        text_embedding (list): The text embedding to use for the semantic query.
+        keyword_list (list): The list of keywords to use for the keyword query.
+        window_size (int): The number of candidates each query returns.
+    Returns:
+        list[dict]: The semantic and keyword query bodies, in that order.
+    """
+    return [
+        build_semantic_query(text_embedding, window_size),
+        build_keyword_query(keyword_list, window_size),
+    ]
+
+
+def build_deep_search(
+    search_type: str, query_input: list, max_results: int
+) -> tuple[dict, str, Callable[[dict], dict]]:
+    """Builds a deep search: its query, response fields and page formatter.
+    The kNN queries ask for k=max_results neighbors, which are then paged.
+    Args:
+        search_type (str): "videos", "segments" or "keywords".
+        query_input (list): The text embedding, or the keywords.
+        max_results (int): The most videos to return.
+    Returns:
+        tuple: The query, its filter_path, and the format_search_results* function
+            for its pages. Segment pages are grouped by video.
+    Raises:
+        ValueError: If the search type is unknown.
+    """
+    if search_type == "videos":
+        query = build_semantic_query(query_input, max_results)
+        return query, VIDEO_FILTER_PATH, format_search_results
+    if search_type == "segments":
+        query = build_segment_query(query_input, max_results)
+        return query, SEGMENT_FILTER_PATH, format_search_results_segments_grouped
+    if search_type == "keywords":
+        query = build_keyword_query(query_input, max_results)
+        return query, VIDEO_FILTER_PATH, format_search_results
+    raise ValueError(f"Unknown deep search type: {search_type}")
@@ -0,0 +1,154 @@
+import contextvars
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Per-session log channels for the Gradio log panel
+LOG_CHANNEL_SIZE = int(os.getenv("LOG_CHANNEL_SIZE", "500"))  # lines kept per session
+LOG_MAX_CHANNELS = int(os.getenv("LOG_MAX_CHANNELS", "100"))
+
+# The user session whose request is running the caller, if any
+_log_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "log_session", default=None
+)
+
+
+@contextmanager
+def log_session(session_id: Optional[str]) -> Iterator[None]:
+    """Tags records logged inside the block, and by the tasks and threads it
+    starts, with a user session.
+    Args:
+        session_id (str): The user session ID, or None for application logs.
+    """
+    token = _log_session.set(session_id)
+    try:
+        yield
+    finally:
+        _log_session.reset(token)
+
+
+class SessionLogFilter(logging.Filter):
+    """Sets record.session_id from the current log session.
+    Add it to the handler that runs on the caller's thread, such as the log
+    pipeline's handler, since the session is known only there. A session_id passed
+    with extra= is kept.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "session_id", None) is None:
+            record.session_id = _log_session.get()
+        return True
+
+
+class _Channel:
+    def __init__(self, max_lines: int):
+        self.lines: deque[str] = deque(maxlen=max_lines)
+        self.subscribers: list[Callable[[str], None]] = []
+
+
+class SessionLogs(logging.Handler):
+    """Keeps the recent log lines of each user session, and pushes new lines to
+    its subscribers as they are written.
+    Each channel keeps at most max_lines lines. When there are more than
+    max_channels channels, the least recently written one without subscribers is
+    dropped. Records without a session go to the application channel, None.
+    """
+
+    def __init__(
+        self, max_lines: int = LOG_CHANNEL_SIZE, max_channels: int = LOG_MAX_CHANNELS
+    ):
+        super().__init__()
+        self.max_lines = max_lines
+        self.max_channels = max_channels
+        self._channels: OrderedDict[Optional[str], _Channel] = OrderedDict()
+        self._channels_lock = threading.Lock()
+
+    def _channel(self, session_id: Optional[str]) -> _Channel:
+        # Called with _channels_lock held
+        channel = self._channels.get(session_id)
+        if channel is None:
+            channel = self._channels[session_id] = _Channel(self.max_lines)
+            for key in list(self._channels):
+                if len(self._channels) <= self.max_channels:
+                    break
+                if key is not None and not self._channels[key].subscribers:
+                    del self._channels[key]
+        self._channels.move_to_end(session_id)
+        return channel
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record)
+            with self._channels_lock:
+                channel = self._channel(getattr(record, "session_id", None))
+                channel.lines.append(line)
+                subscribers = list(channel.subscribers)
+            for callback in subscribers:
+                callback(line)
+        except Exception:
+            self.handleError(record)
+
+    def recent(self, session_id: Optional[str]) -> list[str]:
+        """Returns a session's recent log lines, oldest first.
+        Args:
+            session_id (str): The user session ID, or None for application logs.
+        Returns:
+            list[str]: Up to max_lines lines.
+        """
+        with self._channels_lock:
+            channel = self._channels.get(session_id)
+            return list(channel.lines) if channel is not None else []
+
+    @contextmanager
+    def subscribe(
+        self, session_id: Optional[str], callback: Callable[[str], None]
+    ) -> Iterator[None]:
+        """Calls callback with each new log line of a session, inside the block.
+        The callback runs on the thread that writes the logs, so it must not block.
+        Args:
+            session_id (str): The user session ID.
+            callback (Callable[[str], None]): Receives each formatted line.
+        """
+        with self._channels_lock:
+            self._channel(session_id).subscribers.append(callback)
+        try:
+            yield
+        finally:
+            with self._channels_lock:
+                channel = self._channels.get(session_id)
+                if channel is not None and callback in channel.subscribers:
+                    channel.subscribers.remove(callback)
+
+    def close_session(self, session_id: str) -> None:
+        """Forgets a session's log lines, e.g. when its browser tab is closed.
+        Args:
+            session_id (str): The user session ID.
+        """
+        with self._channels_lock:
+            channel = self._channels.get(session_id)
+            if channel is not None and not channel.subscribers:
+                del self._channels[session_id]
+
+
+_session_logs: Optional[SessionLogs] = None
+_session_logs_lock = threading.Lock()
+
+
+def get_session_logs() -> SessionLogs:
+    """Returns the process-wide session log channels, creating them on first use.
+    Returns:
+        SessionLogs: The shared handler.
+    """
+    global _session_logs
+    with _session_logs_lock:
+        if _session_logs is None:
+            _session_logs = SessionLogs()
+        return _session_logs
@@ -0,0 +1,262 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Generic, Iterator, Optional, TypeVar
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# How the entry points build the search agent and its AWS and OpenSearch clients:
+# "background" starts the UI at once and builds and warms them up on a background
+# thread, "lazy" builds them on the first request, "eager" before the UI starts
+STARTUP_MODE = os.getenv("STARTUP_MODE", "background").lower()
+# The warm-up embeds a one-word text, when the embedding backend answers inline
+STARTUP_PING_MODEL = os.getenv("STARTUP_PING_MODEL", "true").lower() == "true"
+
+# Text embedded by the warm-up's model ping
+PING_TEXT = "warm-up"
+
+T = TypeVar("T")
+
+
+class StartupTimer:
+    """Times the phases of an application's startup, for the startup report.
+    The entry point's steps are laps, each from the end of the previous one; the
+    first starts when this module is imported, so entry points import it first.
+    Phases, such as building the search agent or the warm-up, are timed on their
+    own and reported with their thread, as they may overlap the laps.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last_lap = self.started
+        # (name, seconds, thread name, or None for laps)
+        self.phases: list[tuple[str, float, Optional[str]]] = []
+        self._lock = threading.Lock()
+
+    def lap(self, name: str) -> float:
+        """Records the time since the previous lap as a step of the entry point.
+        Args:
+            name (str): The phase name, e.g. "imports".
+        Returns:
+            float: The phase's duration in seconds.
+        """
+        now = time.perf_counter()
+        with self._lock:
+            seconds, self._last_lap = now - self._last_lap, now
+            self.phases.append((name, seconds, None))
+        return seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Times a phase on the current thread; use as a context manager."""
+        started = time.perf_counter()
+        thread = threading.current_thread().name
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases.append((name, time.perf_counter() - started, thread))
+
+    def elapsed(self) -> float:
+        """Returns the seconds since startup began."""
+        return time.perf_counter() - self.started
+
+    def report(self, title: str) -> str:
+        """Formats the phases recorded so far.
+        Args:
+            title (str): The first line, e.g. "Startup timing, UI ready".
+        Returns:
+            str: One line per lap and phase, with its seconds and share of the
+            elapsed time; phases also show the thread they ran on.
+        """
+        elapsed = self.elapsed()
+        lines = [f"{title} after {elapsed:.2f} s:"]
+        with self._lock:
+            phases = list(self.phases)
+        for name, seconds, thread in phases:
+            share = seconds / elapsed if elapsed else 0.0
+            where = f"  on {thread}" if thread else ""
+            lines.append(f"  {name:<24}{seconds:>8.3f} s{share:>6.0%}{where}")
+        return "\n".join(lines)
+
+
+_timer: Optional[StartupTimer] = None
+_timer_lock = threading.Lock()
+
+
+def get_startup_timer() -> StartupTimer:
+    """Returns the process-wide startup timer, created when this module is imported.
+    Returns:
+        StartupTimer: The shared timer.
+    """
+    global _timer
+    with _timer_lock:
+        if _timer is None:
+            _timer = StartupTimer()
+        return _timer
+
+
+# Start timing as early as possible
+get_startup_timer()
+
+
+class Deferred(Generic[T]):
+    """A value built once, on first use or ahead of it on a background thread.
+    Callers of get() wait while the value is being built. If building fails, the
+    error is raised to the waiting callers, and the next get() tries again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], T],
+        logger: logging.Logger,
+        timer: Optional[StartupTimer] = None,
+    ):
+        self.name = name
+        self.factory = factory
+        self.logger = logger
+        self.timer = timer or get_startup_timer()
+        self._value: Optional[T] = None
+        self._built = False
+        self._lock = threading.Lock()
+
+    @property
+    def built(self) -> bool:
+        """Whether the value has been built."""
+        return self._built
+
+    def get(self) -> T:
+        """Returns the value, building it if needed.
+        Returns:
+            The value returned by the factory.
+        """
+        if self._built:
+            return self._value
+        with self._lock:
+            if not self._built:
+                with self.timer.phase(self.name):
+                    self._value = self.factory()
+                self._built = True
+        return self._value
+
+    def start(self, then: Optional[Callable[[T], None]] = None) -> "Deferred[T]":
+        """Builds the value on a daemon thread.
+        Args:
+            then (Callable): Called with the value on the same thread once it is
+            built, e.g. to warm it up.
+        Returns:
+            Deferred: This instance.
+        """
+
+        def build():
+            try:
+                value = self.get()
+            except Exception as err:
+                # The first get() on a request tries again, and raises the error
+                self.logger.error(f"Failed to build {self.name} at startup: {err}")
+                return
+            if then is not None:
+                then(value)
+
+        threading.Thread(target=build, name=f"startup-{self.name}", daemon=True).start()
+        return self
+
+
+def warm_up(
+    custom_tools,
+    logger: logging.Logger,
+    timer: Optional[StartupTimer] = None,
+    ping_model: bool = STARTUP_PING_MODEL,
+) -> None:
+    """Prepares what the first search needs, so it isn't paid by the first request.
+    Creates the AWS clients, imports the agent's built-in tools, opens a pooled
+    connection to OpenSearch, including the TLS handshake, and, with an embedding
+    backend that answers inline, embeds a one-word text to open the Bedrock
+    connection. A failed step is logged and skipped; the request that needs it
+    retries it.
+    Args:
+        custom_tools (CustomTools): The tools whose clients to warm up.
+        logger (logging.Logger): Receives the failures.
+        timer (StartupTimer): Times each step; defaults to the shared timer.
+        ping_model (bool): Whether to embed the ping text.
+    """
+    from search_agent import load_builtin_tools
+
+    timer = timer or get_startup_timer()
+    background_loop = custom_tools.background_loop
+
+    def create_aws_clients():
+        # Loading the service models takes longer than connecting
+        custom_tools.warm_clients()
+
+    def connect_opensearch():
+        client = custom_tools.video_search.create_async_opensearch_client()
+        # The local index is loaded when its client is created; it has no ping
+        if hasattr(client, "ping") and not background_loop.run(client.ping()):
+            raise ConnectionError("OpenSearch did not answer the ping")
+
+    def ping_model_inline():
+        # Async invoke jobs take seconds and write to S3; they are not pinged
+        backend = getattr(custom_tools.embedding_backend, "active", None)
+        backend = backend or custom_tools.embedding_backend
+        if not backend.batch_jobs:
+            background_loop.run(backend.embed_async(PING_TEXT))
+
+    steps = [
+        ("aws_clients", create_aws_clients),
+        ("agent_tools", load_builtin_tools),
+        ("opensearch_connect", connect_opensearch),
+    ]
+    if ping_model:
+        steps.append(("model_ping", ping_model_inline))
+    for name, step in steps:
+        try:
+            with timer.phase(name):
+                step()
+        except Exception as err:
+            logger.warning(f"Startup warm-up step {name} failed: {err}")
+
+
+def start_search_agent(
+    logger: logging.Logger,
+    mode: str = STARTUP_MODE,
+    timer: Optional[StartupTimer] = None,
+) -> Deferred:
+    """Builds the search agent as STARTUP_MODE says.
+    Importing the search agent loads Strands, OpenSearch and AWS libraries, so
+    with "background" and "lazy" the caller doesn't import it itself.
+    Args:
+        logger (logging.Logger): The logger of the search agent.
+        mode (str): "background", "lazy" or "eager".
+        timer (StartupTimer): Times the build; defaults to the shared timer.
+    Returns:
+        Deferred: The SearchAgent, built or being built in the background for
+        "eager" and "background", and on the first get() for "lazy".
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    if mode not in ("background", "lazy", "eager"):
+        raise ValueError(f"Unknown startup mode: {mode}")
+    timer = timer or get_startup_timer()
+
+    def build():
+        from search_agent import SearchAgent
+
+        return SearchAgent(logger=logger)
+
+    def warmed_up(search_agent) -> None:
+        warm_up(search_agent.custom_tools, logger, timer)
+        logger.info(timer.report("Startup timing, search agent warmed up"))
+
+    search_agent = Deferred("search_agent", build, logger, timer)
+    if mode == "background":
+        search_agent.start(then=warmed_up)
+    elif mode == "eager":
+        search_agent.get()
+    return search_agent
@@ -0,0 +1,316 @@
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from dotenv import load_dotenv
+from opentelemetry import metrics, trace
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Telemetry configuration; disabled telemetry costs one attribute check per stage
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "false").lower() == "true"
+# Also export spans and metrics with OTLP (configure with the OTEL_* variables)
+TELEMETRY_OTLP = os.getenv("TELEMETRY_OTLP", "false").lower() == "true"
+# Serve Prometheus text metrics on this port from the Gradio apps; 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    30.0, 60.0,
+)  # fmt: skip
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55)
+SIZE_BUCKETS = (1_024, 4_096, 16_384, 65_536, 262_144, 1_048_576, 4_194_304)
+TOKEN_BUCKETS = (100, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000)
+
+# Name: (description, unit, buckets)
+METRICS = {
+    "search_stage_seconds": (
+        "Wall time of each search pipeline stage",
+        "s",
+        LATENCY_BUCKETS,
+    ),
+    "search_poll_probes": (
+        "Status and S3 probes made while waiting for an embedding job",
+        "1",
+        COUNT_BUCKETS,
+    ),
+    "search_response_bytes": (
+        "Size of S3 and OpenSearch responses",
+        "By",
+        SIZE_BUCKETS,
+    ),
+    "opensearch_took_seconds": (
+        "Server-side search time reported by OpenSearch",
+        "s",
+        LATENCY_BUCKETS,
+    ),
+    "opensearch_overhead_seconds": (
+        "Search wall time not spent inside OpenSearch: network, queueing, parsing",
+        "s",
+        LATENCY_BUCKETS,
+    ),
+    "agent_cycles": ("Event loop cycles per agent invocation", "1", COUNT_BUCKETS),
+    "agent_cycle_seconds": ("Wall time of each agent cycle", "s", LATENCY_BUCKETS),
+    "agent_tokens": ("Tokens used per agent invocation", "1", TOKEN_BUCKETS),
+    "tool_output_tokens": (
+        "Estimated tokens of each search tool result given to the model",
+        "1",
+        TOKEN_BUCKETS,
+    ),
+}
+
+
+class Histogram:
+    """A cumulative histogram with fixed buckets, per label set."""
+
+    def __init__(self, name: str, description: str, buckets: tuple):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        # Label set -> (bucket counts, sum, count)
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        """Records one value for a label set of (name, value) pairs."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        """Returns the histogram in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = {
+                labels: (list(counts), total, count)
+                for labels, (counts, total, count) in self._series.items()
+            }
+        for labels, (bucket_counts, total, count) in sorted(series.items()):
+            label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+class Telemetry:
+    """Records search pipeline spans and histograms.
+    Histograms are kept in process for the Prometheus text endpoint and, when an
+    OpenTelemetry meter provider is configured, also sent to OpenTelemetry. Spans go
+    to the OpenTelemetry tracer, where they nest under the Strands agent spans.
+    """
+
+    def __init__(self, enabled: bool = TELEMETRY_ENABLED):
+        self.enabled = enabled
+        self.tracer = trace.get_tracer("twelvelabs-video-search")
+        meter = metrics.get_meter("twelvelabs-video-search")
+        self.histograms = {
+            name: Histogram(name, description, buckets)
+            for name, (description, _, buckets) in METRICS.items()
+        }
+        self._otel_histograms = {
+            name: meter.create_histogram(name, unit=unit, description=description)
+            for name, (description, unit, _) in METRICS.items()
+        }
+
+    def record(self, metric: str, value: float, **labels) -> None:
+        """Records a value in one of the METRICS histograms.
+        Args:
+            metric (str): The metric name.
+            value (float): The value to record.
+            **labels: The metric labels.
+        """
+        if not self.enabled:
+            return
+        self.histograms[metric].observe(value, tuple(sorted(labels.items())))
+        self._otel_histograms[metric].record(value, labels)
+
+    def render(self) -> str:
+        """Returns all histograms in the Prometheus text exposition format."""
+        lines = []
+        for histogram in self.histograms.values():
+            lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+
+class Stage:
+    """Times one pipeline stage as a span and a search_stage_seconds observation."""
+
+    def __init__(self, telemetry: Telemetry, name: str, attributes: dict):
+        self.telemetry = telemetry
+        self.name = name
+        self.attributes = attributes
+        self._span = None
+        self._span_context = None
+        self._started = 0.0
+
+    def set(self, key: str, value) -> None:
+        """Adds an attribute to the stage's span."""
+        if self._span is not None:
+            self._span.set_attribute(key, value)
+
+    def __enter__(self) -> "Stage":
+        self._span_context = self.telemetry.tracer.start_as_current_span(
+            self.name, attributes=self.attributes
+        )
+        self._span = self._span_context.__enter__()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = time.perf_counter() - self._started
+        self.telemetry.record("search_stage_seconds", elapsed, stage=self.name)
+        self._span_context.__exit__(exc_type, exc, tb)
+
+
+class _NoopStage:
+    """Stands in for Stage when telemetry is disabled."""
+
+    def set(self, key: str, value) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopStage":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP_STAGE = _NoopStage()
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+_metrics_server: Optional[ThreadingHTTPServer] = None
+
+
+def get_telemetry() -> Telemetry:
+    """Returns the process-wide telemetry, setting up OTLP export on first use.
+    Returns:
+        Telemetry: The shared instance.
+    """
+    global _telemetry
+    if _telemetry is not None:
+        return _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            if TELEMETRY_ENABLED and TELEMETRY_OTLP:
+                from strands.telemetry import StrandsTelemetry
+
+                StrandsTelemetry().setup_otlp_exporter().setup_meter(
+                    enable_otlp_exporter=True
+                )
+            _telemetry = Telemetry()
+        return _telemetry
+
+
+def stage(name: str, **attributes) -> Stage | _NoopStage:
+    """Times a pipeline stage.
+    Use as a context manager; the returned stage's set() adds span attributes.
+    Args:
+        name (str): The stage name, e.g. "opensearch_search".
+        **attributes: Span attributes.
+    Returns:
+        Stage: The stage timer, or a shared no-op when telemetry is disabled.
+    """
+    telemetry = get_telemetry()
+    if not telemetry.enabled:
+        return _NOOP_STAGE
+    return Stage(telemetry, name, attributes)
+
+
+def record(metric: str, value: float, **labels) -> None:
+    """Records a value in one of the METRICS histograms of the shared telemetry."""
+    get_telemetry().record(metric, value, **labels)
+
+
+def is_enabled() -> bool:
+    """Whether telemetry is recorded; use it to skip costly measurements."""
+    return get_telemetry().enabled
+
+
+def record_search_response(response: dict, wall_seconds: float) -> None:
+    """Records an OpenSearch response's size, and its took time against wall time.
+    Args:
+        response (dict): The search or _msearch response.
+        wall_seconds (float): The client-side duration of the request.
+    """
+    if not is_enabled():
+        return
+    took = response.get("took")
+    if took is not None:
+        record("opensearch_took_seconds", took / 1_000)
+        record("opensearch_overhead_seconds", max(0.0, wall_seconds - took / 1_000))
+    size = len(json.dumps(response, separators=(",", ":")))
+    record("search_response_bytes", size, source="opensearch")
+
+
+def record_agent_result(result) -> None:
+    """Records the cycles, cycle durations and token usage of an agent invocation.
+    Args:
+        result (AgentResult): The result of the invocation.
+    """
+    if not is_enabled():
+        return
+    agent_metrics = result.metrics
+    record("agent_cycles", agent_metrics.cycle_count)
+    for duration in agent_metrics.cycle_durations:
+        record("agent_cycle_seconds", duration)
+    usage = agent_metrics.accumulated_usage
+    record("agent_tokens", usage.get("inputTokens", 0), kind="input")
+    record("agent_tokens", usage.get("outputTokens", 0), kind="output")
+
+
+def render_metrics() -> str:
+    """Returns the shared telemetry's histograms as Prometheus text."""
+    return get_telemetry().render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = METRICS_PORT) -> None:
+    """Serves /metrics in Prometheus text format from a daemon thread.
+    Does nothing when telemetry is disabled, the port is 0, or it already runs.
+    Args:
+        port (int): The port to listen on.
+    """
+    global _metrics_server
+    if not is_enabled() or not port:
+        return
+    with _telemetry_lock:
+        if _metrics_server is not None:
+            return
+        _metrics_server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
@@ -5,10 +5,14 @@
 # Author: Gary A. Stafford
 # Date: 2025-08-03
 
-from strands import Agent
+# Imported first, so the startup report includes the time spent on imports
+from startup import Deferred, get_startup_timer, start_search_agent  # isort: skip
 
 from basic_logging import BasicLogging
-from search_agent import SearchAgent
+from telemetry import record_agent_result, stage, start_metrics_server
+
+startup_timer = get_startup_timer()
+startup_timer.lap("imports")
 
 # Agent configuration
 MODEL_ID = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
@@ -18,16 +22,31 @@ MODEL_TEMPERATURE = 0.2
 # Sets the logging format and streams logs to stderr
 basic_logger = BasicLogging()
 logger = basic_logger.setup_logging()
+startup_timer.lap("logging")
+
+# Built as STARTUP_MODE says: by default on a background thread, while the user types
+search_agent = start_search_agent(logger)
 
-search_agent = SearchAgent(logger=logger)
+# Created on the first request
+agent = Deferred(
+    "agent",
+    lambda: search_agent.get().create_agent(
+        MODEL_ID, MODEL_REGION, MODEL_TEMPERATURE
+    ),
+    logger,
+)
 
-agent: Agent = search_agent.create_agent(MODEL_ID, MODEL_REGION, MODEL_TEMPERATURE)
+# Serves /metrics when TELEMETRY_ENABLED is true and METRICS_PORT is set
+start_metrics_server()
+startup_timer.lap("agent_setup")
 
 RED = "\033[31m"
 GREEN = "\033[32m"
 BLUE = "\033[34m"
 RESET = "\033[0m"
 
+logger.info(startup_timer.report("Startup timing, prompt ready"))
+
 # Interactive loop
 print(f"{BLUE}Welcome to the TwelveLabs Video Search Agent!{RESET}")
 while True:
@@ -39,7 +58,9 @@ while True:
             break
 
         # Call the video search agent
-        response = agent(user_input)
+        with stage("agent_invocation"):
+            response = agent.get()(user_input)
+        record_agent_result(response)
     except KeyboardInterrupt:
         logger.fatal(f"\n\n{RED}Execution interrupted. Exiting...{RESET}")
         break
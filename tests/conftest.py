@@ -0,0 +1,66 @@
+# Fixtures shared by the tests, which run offline on the stand-ins in benchmarks.fakes
+# Run from the repository root: python -m pytest
+# pylint: disable=redefined-outer-name
+
+import logging
+import os
+import sys
+
+import pytest
+
+# The application modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from benchmarks.fakes import (
+    CallCounter,
+    FakeAsyncOpenSearch,
+    FakeBedrockRuntime,
+    FakeOpenSearch,
+    FakeS3,
+    LatencyModel,
+    build_catalog,
+)
+from custom_tools import CustomTools
+from embedding_backends import create_embedding_backend
+from embedding_cache import EmbeddingCache
+from result_cache import SearchResultCache
+
+
+@pytest.fixture(scope="session")
+def catalog(tmp_path_factory):
+    """A small synthetic catalog, shared by every test."""
+    return build_catalog(str(tmp_path_factory.mktemp("catalog")), 30, 3)
+
+
+@pytest.fixture
+def calls():
+    """Counts the calls made to the fake APIs."""
+    return CallCounter()
+
+
+@pytest.fixture
+def tools(catalog, calls):
+    """CustomTools wired to the offline stand-ins, with no simulated latency.
+    Embeddings come from the fake InvokeModel, and result caching is disabled so
+    each search reaches the fake OpenSearch.
+    """
+    no_latency = LatencyModel("constant:0")
+    custom_tools = CustomTools(
+        logger=logging.getLogger(__name__),
+        embedding_cache=EmbeddingCache(cache_dir=None),
+        result_cache=SearchResultCache(max_entries=0),
+    )
+    s3 = FakeS3(no_latency, calls)
+    custom_tools.s3_client_us_east_1 = s3
+    custom_tools.bedrock_runtime_client = FakeBedrockRuntime(
+        s3, no_latency, no_latency, calls
+    )
+    custom_tools.embedding_backend = create_embedding_backend(
+        custom_tools, "sync", fallback=None
+    )
+    sync_client = FakeOpenSearch(catalog, no_latency, calls)
+    async_client = FakeAsyncOpenSearch(catalog, no_latency, calls)
+    custom_tools.video_search.create_opensearch_client = lambda: sync_client
+    custom_tools.video_search.create_async_opensearch_client = lambda: async_client
+    return custom_tools
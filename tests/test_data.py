@@ -0,0 +1,37 @@
+# Tests of flatten_segment_groups against the flat segment results
+# pylint: disable=missing-function-docstring
+
+from benchmarks.formatting import raw_response
+from data import VideoSegmentSearchResults, flatten_segment_groups
+from search_formatting import (
+    format_search_results_segments,
+    format_search_results_segments_grouped,
+)
+
+
+def test_flattened_groups_match_the_flat_results():
+    raw = raw_response(videos=6, segments=4)
+    groups = format_search_results_segments_grouped(raw)["videos"]
+
+    flat = flatten_segment_groups(groups)
+
+    assert flat == format_search_results_segments(raw)["results"]
+    assert flat == VideoSegmentSearchResults(results=flat).to_dict()["results"]
+    assert len(flat) == 24
+
+
+def test_flattened_results_do_not_share_keywords():
+    groups = format_search_results_segments_grouped(raw_response(1, 2))["videos"]
+
+    flat = flatten_segment_groups(groups)
+    flat[0]["keywords"].append("extra")
+
+    assert "extra" not in flat[1]["keywords"]
+    assert "extra" not in groups[0]["keywords"]
+
+
+def test_flattening_nothing():
+    assert not flatten_segment_groups([])
+    assert not flatten_segment_groups(
+        format_search_results_segments_grouped({"took": 1})["videos"]
+    )
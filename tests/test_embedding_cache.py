@@ -0,0 +1,178 @@
+# Tests of the embedding cache's single-flight lookups and eviction, and of
+# EmbeddingHandles
+# pylint: disable=missing-function-docstring
+
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from benchmarks.fakes import fake_text_embedding
+from embedding_cache import EmbeddingCache, EmbeddingHandles
+
+MODEL_ID = "twelvelabs.marengo-embed-2-7-v1:0"
+
+
+class SlowEmbedder:
+    """Counts embeddings, each taking delay seconds, sync or async."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, text: str) -> list[float]:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return fake_text_embedding(text)
+
+    async def embed_async(self, text: str) -> list[float]:
+        with self._lock:
+            self.calls += 1
+        await asyncio.sleep(self.delay)
+        return fake_text_embedding(text)
+
+
+def test_normalized_texts_share_an_entry():
+    cache = EmbeddingCache(cache_dir=None)
+    cache.put("A dog  on a beach", MODEL_ID, [1.0])
+
+    assert cache.get(" a DOG on a beach ", MODEL_ID) == [1.0]
+    assert cache.get("a dog on a beach", "another-model") is None
+
+
+def test_concurrent_threads_compute_once():
+    cache = EmbeddingCache(cache_dir=None)
+    embedder = SlowEmbedder()
+    results = []
+
+    def lookup():
+        results.append(cache.get_or_compute("a dog", MODEL_ID, embedder))
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert embedder.calls == 1
+    assert results == [fake_text_embedding("a dog")] * 8
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["in_flight_joins"] + stats["memory_hits"] == 7
+    assert stats["in_flight"] == 0
+
+
+def test_concurrent_coroutines_compute_once():
+    cache = EmbeddingCache(cache_dir=None)
+    embedder = SlowEmbedder()
+
+    async def lookups():
+        return await asyncio.gather(
+            *(
+                cache.get_or_compute_async(text, MODEL_ID, embedder.embed_async)
+                for text in ["a dog", "A dog", "a cat"] * 4
+            )
+        )
+
+    results = asyncio.run(lookups())
+
+    assert embedder.calls == 2
+    assert results[0] == results[1] == fake_text_embedding("a dog")
+    assert results[2] == fake_text_embedding("a cat")
+    assert cache.stats()["in_flight_joins"] == 10
+
+
+def test_failed_computation_is_raised_to_joiners_and_not_cached():
+    cache = EmbeddingCache(cache_dir=None)
+    started = threading.Event()
+    errors = []
+
+    def fail(text):
+        started.set()
+        time.sleep(0.05)
+        raise RuntimeError(f"Failed to embed {text}")
+
+    def join():
+        started.wait()
+        try:
+            cache.get_or_compute("a dog", MODEL_ID, fake_text_embedding)
+        except RuntimeError as err:
+            errors.append(err)
+
+    joiner = threading.Thread(target=join)
+    joiner.start()
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("a dog", MODEL_ID, fail)
+    joiner.join()
+
+    assert len(errors) == 1
+    assert cache.stats()["errors"] == 1
+    assert cache.get_or_compute("a dog", MODEL_ID, fake_text_embedding) == (
+        fake_text_embedding("a dog")
+    )
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2, cache_dir=None)
+    cache.put("a", MODEL_ID, [1.0])
+    cache.put("b", MODEL_ID, [2.0])
+    cache.get("a", MODEL_ID)
+    cache.put("c", MODEL_ID, [3.0])
+
+    assert cache.get("b", MODEL_ID) is None
+    assert cache.get("a", MODEL_ID) == [1.0]
+    assert cache.get("c", MODEL_ID) == [3.0]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    EmbeddingCache(cache_dir=str(tmp_path)).put("a dog", MODEL_ID, [1.0, 2.0])
+
+    cache = EmbeddingCache(cache_dir=str(tmp_path))
+    embedder = SlowEmbedder(delay=0)
+
+    assert cache.get_or_compute("a dog", MODEL_ID, embedder) == [1.0, 2.0]
+    assert embedder.calls == 0
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_keeps_most_recently_used(tmp_path):
+    cache = EmbeddingCache(cache_dir=str(tmp_path), max_disk_entries=3)
+    for number in range(6):
+        cache.put(f"text {number}", MODEL_ID, [float(number)])
+        # Distinct modification times, oldest first
+        path = os.path.join(tmp_path, cache.make_key(f"text {number}", MODEL_ID))
+        os.utime(f"{path}.json", (number, number))
+
+    assert len(os.listdir(tmp_path)) == 3
+    assert cache.stats()["disk_evictions"] == 3
+    cache.clear()
+    assert cache.get("text 2", MODEL_ID) is None
+    assert cache.get("text 5", MODEL_ID) == [5.0]
+
+
+def test_handles_resolve_to_their_embedding():
+    handles = EmbeddingHandles()
+    handle = handles.add("a dog", MODEL_ID, [1.0])
+
+    assert handle.startswith("emb-") and len(handle) == 16
+    assert handles.add("A  dog", MODEL_ID, [1.0]) == handle
+    assert handles.resolve(handle) == [1.0]
+    assert handles.resolve(f" '{handle}' ") == [1.0]
+    with pytest.raises(ValueError, match="Unknown embedding handle"):
+        handles.resolve("emb-000000000000")
+
+
+def test_handles_drop_the_oldest():
+    handles = EmbeddingHandles(max_entries=2)
+    first = handles.add("a", MODEL_ID, [1.0])
+    handles.add("b", MODEL_ID, [2.0])
+    handles.add("c", MODEL_ID, [3.0])
+
+    assert len(handles) == 2
+    with pytest.raises(ValueError):
+        handles.resolve(first)
@@ -0,0 +1,87 @@
+# Tests of the reciprocal-rank fusion of hybrid search rankings
+# pylint: disable=missing-function-docstring
+
+import logging
+
+import pytest
+
+from hybrid_search import (
+    build_msearch_body,
+    fuse_hybrid_responses,
+    reciprocal_rank_fusion,
+)
+
+
+def response(*doc_ids: str) -> dict:
+    """An OpenSearch response ranking the documents in order."""
+    return {
+        "hits": {
+            "hits": [
+                {"_id": doc_id, "_score": 10.0 - rank, "_source": {"name": doc_id}}
+                for rank, doc_id in enumerate(doc_ids)
+            ]
+        }
+    }
+
+
+def ranking(fused: dict) -> list[str]:
+    return [hit["_id"] for hit in fused["hits"]["hits"]]
+
+
+def test_documents_found_by_both_retrievers_rise_to_the_top():
+    fused = reciprocal_rank_fusion(
+        [response("a", "b", "c"), response("c", "d")], [1.0, 1.0], 10, rank_constant=60
+    )
+
+    assert ranking(fused) == ["c", "a", "b", "d"]
+    scores = [hit["_score"] for hit in fused["hits"]["hits"]]
+    assert scores[0] == pytest.approx(1 / 63 + 1 / 61, abs=1e-6)
+    assert scores[1] == pytest.approx(1 / 61, abs=1e-6)
+
+
+def test_weights_and_results_size():
+    responses = [response("a", "b"), response("b", "a")]
+
+    assert ranking(reciprocal_rank_fusion(responses, [2.0, 1.0], 10)) == ["a", "b"]
+    assert ranking(reciprocal_rank_fusion(responses, [1.0, 2.0], 10)) == ["b", "a"]
+    assert ranking(reciprocal_rank_fusion(responses, [1.0, 2.0], 1)) == ["b"]
+
+
+def test_fused_hits_keep_their_source():
+    fused = reciprocal_rank_fusion([response("a"), response("a")], [1.0, 1.0], 10)
+
+    assert fused["hits"]["hits"] == [
+        {
+            "_id": "a",
+            "_score": pytest.approx(2 / 61, abs=1e-6),
+            "_source": {"name": "a"},
+        }
+    ]
+
+
+def test_failed_sub_search_contributes_nothing(caplog):
+    multi_search_results = {
+        "responses": [
+            response("a", "b"),
+            {"error": {"type": "search_phase_execution_exception"}, "status": 400},
+        ]
+    }
+
+    with caplog.at_level(logging.WARNING):
+        fused = fuse_hybrid_responses(
+            multi_search_results, 10, logging.getLogger(__name__)
+        )
+
+    assert ranking(fused) == ["a", "b"]
+    assert "Keyword part of hybrid search failed" in caplog.text
+
+
+def test_msearch_body_alternates_headers_and_queries():
+    queries = [{"query": {"match_all": {}}}, {"query": {"terms": {"keywords": []}}}]
+
+    assert build_msearch_body(queries, "videos") == [
+        {"index": "videos"},
+        queries[0],
+        {"index": "videos"},
+        queries[1],
+    ]
@@ -0,0 +1,133 @@
+# Tests of the rule-based routes and the direct answers of QueryRouter
+# pylint: disable=missing-function-docstring,redefined-outer-name
+
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from query_router import QueryRoute, QueryRouter
+
+
+@pytest.fixture
+def router(tools):
+    return QueryRouter(tools, logging.getLogger(__name__))
+
+
+@pytest.mark.parametrize(
+    "query, mode",
+    [
+        ("find 10 videos of a dog on a beach", "semantic"),
+        ("search for videos of a red sports car", "semantic"),
+        ("find videos where people are dancing", "semantic"),
+        ("show me clips of fireworks", "segments"),
+        ("get me 3 clips showing a sunset", "segments"),
+        ("keywords: car, beach", "keyword"),
+        ("Use keywords: car", "keyword"),
+        ("dogs on a beach, keywords: dog, surf", "hybrid"),
+        ("find videos of dogs with keywords: dog", "hybrid"),
+        # Questions, follow-ups, filters and bare descriptions go to the agent
+        ("", "agent"),
+        ("what did you find?", "agent"),
+        ("find videos", "agent"),
+        ("find videos of", "agent"),
+        ("keywords", "agent"),
+        ("tags: previous results", "agent"),
+        ("find more like those", "agent"),
+        ("show me the results again", "agent"),
+        ("find videos shorter than 30 seconds", "agent"),
+        ("Find the video with the longest duration", "agent"),
+        ("show me how to use this", "agent"),
+        ("cars driving on a beach", "agent"),
+        ("find cat videos", "agent"),
+    ],
+)
+def test_route_mode(router, query, mode):
+    assert router.route(query).mode == mode
+
+
+def test_route_extracts_text_keywords_and_size(router):
+    assert router.route("find 10 videos of a dog on a beach.") == QueryRoute(
+        mode="semantic", text="a dog on a beach", results_size=10
+    )
+    assert router.route("dogs on a beach, keywords: Dog and surf") == QueryRoute(
+        mode="hybrid", text="dogs on a beach", keywords=["dog", "surf"]
+    )
+    assert router.route("keywords: car beach").keywords == ["car", "beach"]
+
+
+def test_route_clamps_results_size(tools):
+    router = QueryRouter(tools, logging.getLogger(__name__), max_results=20)
+    assert router.route("get 100 videos of cats").results_size == 20
+    assert router.route("get 0 videos of cats").results_size == 1
+
+
+def test_route_rejects_long_text(tools):
+    router = QueryRouter(tools, logging.getLogger(__name__), max_words=3)
+    assert router.route("find videos of a cat").mode == "semantic"
+    assert router.route("find videos of a cat on a sofa").mode == "agent"
+
+
+def test_classifier_routes_inputs_the_rules_leave_open(tools):
+    def classifier(query):
+        return ("segments", 0.9) if "sunset" in query else ("semantic", 0.5)
+
+    router = QueryRouter(tools, logging.getLogger(__name__), classifier=classifier)
+    assert router.route("a sunset over the sea") == QueryRoute(
+        mode="segments", text="a sunset over the sea"
+    )
+    # Below min_confidence
+    assert router.route("a dog on a beach").mode == "agent"
+    # Rules still win, and questions never reach the classifier
+    assert router.route("keywords: sunset").mode == "keyword"
+    assert router.route("any sunset clips?").mode == "agent"
+
+
+@pytest.mark.parametrize(
+    "query, count",
+    [
+        ("find 4 videos of a dog on a beach", 4),
+        ("get me 3 clips showing a sunset", None),
+        ("keywords: car, beach", None),
+        ("dogs on a beach, keywords: dog, surf", None),
+    ],
+)
+def test_answer_lists_results(tools, router, query, count):
+    route = router.route(query)
+    answer = tools.background_loop.run(router.answer_async(route))
+
+    lines = answer.splitlines()
+    assert lines[0].startswith(router.describe(route))
+    numbered = [line for line in lines if line[:1].isdigit()]
+    assert numbered and numbered[0].startswith("1. **Synthetic commercial ")
+    if count is not None:
+        assert len(numbered) == count
+    if route.mode == "segments":
+        # Grouped segment results are flattened to a line per segment
+        assert all(", segment " in line for line in numbered)
+
+
+def test_answer_expands_compact_results(tools, router):
+    tools.tool_output_mode = "compact"
+    route = router.route("find 3 videos of a dog on a beach")
+    answer = tools.background_loop.run(router.answer_async(route))
+
+    assert "res-" not in answer
+    assert answer.count("commercial-") == 3
+    assert len(tools.result_store) == 3
+
+
+def test_answer_adds_exchange_to_agent(tools, router):
+    agent = SimpleNamespace(messages=[])
+    route = router.route("keywords: car")
+    answer = tools.background_loop.run(router.answer_async(route, agent))
+
+    assert agent.messages == [
+        {"role": "user", "content": [{"text": "Keyword search for videos: car"}]},
+        {"role": "assistant", "content": [{"text": answer}]},
+    ]
+
+
+def test_format_answer_without_results():
+    route = QueryRoute(mode="semantic", text="cats")
+    assert QueryRouter.format_answer(route, []).startswith("No results found")
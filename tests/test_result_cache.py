@@ -0,0 +1,129 @@
+# Tests of the search result cache's TTL, eviction and invalidation
+# pylint: disable=missing-function-docstring,redefined-outer-name
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import result_cache
+from result_cache import SearchResultCache
+
+INDEX_NAME = "video_search"
+
+
+class Clock:
+    """Replaces time.monotonic in result_cache, so entries expire on demand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = Clock()
+    monkeypatch.setattr(result_cache.time, "monotonic", fake_clock)
+    return fake_clock
+
+
+def key(keyword: str, index_name: str = INDEX_NAME) -> str:
+    return SearchResultCache.make_key("keyword", index_name, 6, keywords=[keyword])
+
+
+def test_keys_ignore_keyword_order_but_not_the_vector():
+    assert SearchResultCache.make_key(
+        "keyword", INDEX_NAME, 6, keywords=["dog", "car"]
+    ) == SearchResultCache.make_key("keyword", INDEX_NAME, 6, keywords=["car", "dog"])
+    assert SearchResultCache.make_key(
+        "semantic", INDEX_NAME, 6, vector=[0.1, 0.2]
+    ) != SearchResultCache.make_key("semantic", INDEX_NAME, 6, vector=[0.1, 0.3])
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = SearchResultCache(ttl=10)
+    searches = []
+
+    def search():
+        searches.append(clock())
+        return {"took": len(searches)}
+
+    assert cache.get_or_search(key("dog"), INDEX_NAME, search) == {"took": 1}
+    clock.advance(9.9)
+    assert cache.get_or_search(key("dog"), INDEX_NAME, search) == {"took": 1}
+    clock.advance(0.1)
+    assert cache.get(key("dog")) is None
+    assert cache.get_or_search(key("dog"), INDEX_NAME, search) == {"took": 2}
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["expirations"] == 1
+
+
+@pytest.mark.usefixtures("clock")
+def test_least_recently_used_entries_are_evicted():
+    cache = SearchResultCache(max_entries=2, ttl=60)
+    for keyword in ("a", "b"):
+        cache.get_or_search(key(keyword), INDEX_NAME, lambda k=keyword: {"q": k})
+    cache.get(key("a"))
+    cache.get_or_search(key("c"), INDEX_NAME, lambda: {"q": "c"})
+
+    assert cache.get(key("b")) is None
+    assert cache.get(key("a")) == {"q": "a"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_concurrent_searches_share_one_request():
+    cache = SearchResultCache(ttl=60)
+    searches = []
+
+    def search():
+        searches.append(1)
+        time.sleep(0.05)
+        return {"took": 1}
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(
+            pool.map(
+                lambda _: cache.get_or_search(key("dog"), INDEX_NAME, search), range(8)
+            )
+        )
+
+    assert len(searches) == 1
+    assert results == [{"took": 1}] * 8
+
+
+def test_invalidate_drops_entries_and_in_flight_searches():
+    cache = SearchResultCache(ttl=60)
+    cache.get_or_search(key("dog"), INDEX_NAME, lambda: {"took": 1})
+    other_key = key("dog", "other_index")
+    cache.get_or_search(other_key, "other_index", lambda: {"took": 1})
+
+    def search_during_ingest():
+        # An ingest finishes while this search is running
+        cache.invalidate(INDEX_NAME)
+        return {"took": 2}
+
+    assert cache.invalidate(INDEX_NAME) == 1
+    assert cache.get_or_search(key("cat"), INDEX_NAME, search_during_ingest)
+    assert cache.get(key("cat")) is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_zero_ttl_disables_caching():
+    cache = SearchResultCache(ttl=0)
+    searches = []
+
+    def search():
+        searches.append(1)
+        return {"took": len(searches)}
+
+    assert not cache.enabled
+    cache.get_or_search(key("dog"), INDEX_NAME, search)
+    cache.get_or_search(key("dog"), INDEX_NAME, search)
+    assert len(searches) == 2
@@ -0,0 +1,86 @@
+# Tests of the compact tool output and the ResultStore behind it
+# pylint: disable=missing-function-docstring
+
+from benchmarks.formatting import raw_response
+from search_formatting import (
+    format_search_results,
+    format_search_results_segments_grouped,
+)
+from tool_output import (
+    ResultStore,
+    compact_search_results,
+    estimate_tokens,
+    result_id,
+)
+
+
+def video_results(videos: int) -> dict:
+    return format_search_results(raw_response(videos, 1))
+
+
+def test_result_ids_are_stable_and_distinguish_record_types():
+    video = video_results(1)["results"][0]
+    group = format_search_results_segments_grouped(raw_response(1, 2))["videos"][0]
+
+    assert result_id(video) == result_id(dict(video))
+    assert result_id(video).startswith("res-") and len(result_id(video)) == 12
+    assert result_id(video) != result_id(group)
+    assert result_id(group) != result_id(dict(group, segments=group["segments"][:1]))
+
+
+def test_store_expands_compact_results_to_full_records():
+    store = ResultStore()
+    records = video_results(3)["results"]
+    compact = compact_search_results({"results": records}, store)["results"]
+
+    assert store.expand(compact) == records
+    assert store.get(f" '{compact[0]['id']}' ") == records[0]
+    # Unknown IDs and full records are passed through
+    unknown = {"id": "res-00000000", "title": "Gone"}
+    assert store.expand([unknown, records[1]]) == [unknown, records[1]]
+
+
+def test_store_drops_the_oldest_records():
+    store = ResultStore(max_entries=2)
+    first, *others = video_results(3)["results"]
+    first_id = store.add(first)
+    for record in others:
+        store.add(record)
+
+    assert len(store) == 2
+    assert store.get(first_id) is None
+
+
+def test_compact_records_leave_out_ui_fields_and_round_numbers():
+    store = ResultStore()
+    compact = compact_search_results(video_results(2), store, token_budget=10_000)
+
+    record = compact["results"][0]
+    assert "s3URI" not in record and "keyframeURL" not in record
+    assert len(record["keywords"]) <= 5
+    assert len(record["summary"]) <= 200
+    assert record["score"] == round(record["score"], 3)
+    assert "omitted" not in compact
+
+
+def test_compact_results_fit_the_budget():
+    store = ResultStore()
+    search_results = video_results(25)
+    compact = compact_search_results(search_results, store, token_budget=400)
+
+    assert estimate_tokens(compact) <= 400
+    assert estimate_tokens(compact) < estimate_tokens(search_results)
+    kept = len(compact["results"])
+    assert kept and compact["omitted"] == 25 - kept
+    # Every result is stored, including the omitted ones
+    assert len(store) == 25
+
+
+def test_compact_grouped_segments_keep_their_segments():
+    store = ResultStore()
+    grouped = format_search_results_segments_grouped(raw_response(2, 3))
+
+    compact = compact_search_results(grouped, store, token_budget=10_000)
+
+    assert [len(video["segments"]) for video in compact["videos"]] == [3, 3]
+    assert store.expand(compact["videos"]) == grouped["videos"]
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# What the search tools return to the model: "full" records, or "compact" records
+# that fit under a token budget and point to the full records by ID
+TOOL_OUTPUT_MODE = os.getenv("TOOL_OUTPUT_MODE", "full").lower()
+TOOL_OUTPUT_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_TOKEN_BUDGET", "1500"))
+TOOL_SUMMARY_CHARS = int(os.getenv("TOOL_SUMMARY_CHARS", "200"))
+TOOL_MAX_KEYWORDS = int(os.getenv("TOOL_MAX_KEYWORDS", "5"))
+TOOL_FLOAT_DIGITS = int(os.getenv("TOOL_FLOAT_DIGITS", "3"))
+# Full records kept per conversation for get_search_results and the UI
+RESULT_STORE_SIZE = int(os.getenv("RESULT_STORE_SIZE", "500"))
+
+# Shortest summary kept before summaries are dropped to meet the budget
+MIN_SUMMARY_CHARS = 40
+# Fields only the UI needs; the model gets them from get_search_results
+UI_ONLY_FIELDS = ("s3URI", "keyframeURL")
+
+
+def estimate_tokens(value) -> int:
+    """Estimates the tokens of a tool result as the model receives it.
+    Strands sends dict results as JSON; this counts about four characters a token.
+    Args:
+        value: The tool result.
+    Returns:
+        int: The estimated token count.
+    """
+    return (len(json.dumps(value, ensure_ascii=False)) + 3) // 4
+
+
+def result_id(record: dict) -> str:
+    """Returns the compact ID of a video, segment or grouped segments result.
+    The ID is derived from the record type, the video name and the segment IDs, so
+    a result has the same ID in every search of a conversation, and a video and
+    its grouped segments get different IDs.
+    Args:
+        record (dict): A formatted search result.
+    Returns:
+        str: The ID, e.g. "res-3f2a9c1b".
+    """
+    if "segments" in record:
+        segment_ids = ",".join(
+            str(segment["segmentId"]) for segment in record["segments"]
+        )
+        key = f"segments#{record['videoName']}#{segment_ids}"
+    elif "segmentId" in record:
+        key = f"segment#{record['videoName']}#{record['segmentId']}"
+    else:
+        key = f"video#{record['videoName']}"
+    return f"res-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:8]}"
+
+
+class ResultStore:
+    """A bounded store of the full search results returned in one conversation.
+    Compact tool output refers to results by ID; the model fetches the full records
+    with get_search_results, and the UI can show them without the model. The
+    oldest results are dropped first.
+    """
+
+    def __init__(self, max_entries: int = RESULT_STORE_SIZE):
+        self.max_entries = max_entries
+        self._records: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, record: dict) -> str:
+        """Stores a full result and returns its ID.
+        Args:
+            record (dict): A formatted search result.
+        Returns:
+            str: The result ID.
+        """
+        record_id = result_id(record)
+        with self._lock:
+            self._records[record_id] = record
+            self._records.move_to_end(record_id)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+        return record_id
+
+    def get(self, record_id: str) -> Optional[dict]:
+        """Returns the full result for an ID, or None if it is unknown or dropped."""
+        with self._lock:
+            return self._records.get(record_id.strip().strip("'\""))
+
+    def expand(self, results: list[dict]) -> list[dict]:
+        """Replaces compact results with their full records, where still stored.
+        Args:
+            results (list[dict]): Compact or full search results.
+        Returns:
+            list[dict]: The full records.
+        """
+        expanded = []
+        for result in results:
+            record = self.get(result["id"]) if "id" in result else None
+            expanded.append(record if record is not None else result)
+        return expanded
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._records)
+
+
+def truncate(text: str, max_chars: int) -> str:
+    """Shortens text to at most max_chars characters, at a word boundary."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[: max_chars - 1]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip(" ,.;:") + "…"
+
+
+def _compact_record(
+    record: dict, record_id: str, summary_chars: Optional[int], max_keywords: int
+) -> dict:
+    compact = {"id": record_id}
+    for key, value in record.items():
+        if key in UI_ONLY_FIELDS:
+            continue
+        if key == "summary":
+            if summary_chars is None:
+                continue
+            value = truncate(value, summary_chars)
+        elif key == "keywords":
+            if not max_keywords:
+                continue
+            value = value[:max_keywords]
+        elif key == "segments":
+            value = [
+                {
+                    name: round(field, TOOL_FLOAT_DIGITS)
+                    if isinstance(field, float)
+                    else field
+                    for name, field in segment.items()
+                }
+                for segment in value
+            ]
+        elif isinstance(value, float):
+            value = round(value, TOOL_FLOAT_DIGITS)
+        compact[key] = value
+    return compact
+
+
+def compact_search_results(
+    search_results: dict,
+    store: ResultStore,
+    token_budget: int = TOOL_OUTPUT_TOKEN_BUDGET,
+    summary_chars: int = TOOL_SUMMARY_CHARS,
+    max_keywords: int = TOOL_MAX_KEYWORDS,
+) -> dict:
+    """Shrinks formatted search results to fit a token budget.
+    Works on "results", or on the "videos" of grouped segment results, whose
+    segments are kept with rounded numbers. Full records go to the store. Each
+    compact record has the result ID, rounded numbers, a truncated summary and the
+    first keywords, without the S3 and keyframe URLs. While the output is over
+    budget, summaries are shortened, then dropped, then keywords are dropped, then
+    the lowest ranked results are left out and counted in "omitted".
+    Args:
+        search_results (dict): The output of format_search_results*.
+        store (ResultStore): Receives the full records.
+        token_budget (int): The most tokens the output may take.
+        summary_chars (int): The longest summary kept.
+        max_keywords (int): The most keywords kept per result.
+    Returns:
+        dict: The compact results, with "omitted" when results were left out.
+    """
+    key = "videos" if "videos" in search_results else "results"
+    records = search_results.get(key, [])
+    ids = [store.add(record) for record in records]
+
+    def build(summary_limit, keyword_limit, count):
+        output = {
+            key: [
+                _compact_record(record, record_id, summary_limit, keyword_limit)
+                for record, record_id in zip(records[:count], ids[:count])
+            ]
+        }
+        if count < len(records):
+            output["omitted"] = len(records) - count
+        return output
+
+    summary_limit, keyword_limit, count = summary_chars, max_keywords, len(records)
+    output = build(summary_limit, keyword_limit, count)
+    while estimate_tokens(output) > token_budget and count:
+        if summary_limit is not None and summary_limit > MIN_SUMMARY_CHARS:
+            summary_limit = max(MIN_SUMMARY_CHARS, summary_limit // 2)
+        elif summary_limit is not None:
+            summary_limit = None
+        elif keyword_limit:
+            keyword_limit = 0
+        else:
+            count -= 1
+        output = build(summary_limit, keyword_limit, count)
+    return output
@@ -0,0 +1,522 @@
+import logging
+import time
+from typing import AsyncIterator, Iterator, Optional
+
+from opensearchpy import AsyncOpenSearch, OpenSearch
+
+from event_loop import get_background_loop, on_background_loop
+from hybrid_search import (
+    HYBRID_WINDOW_SIZE,
+    MSEARCH_FILTER_PATH,
+    build_msearch_body,
+    fuse_hybrid_responses,
+)
+from local_search import SEARCH_BACKEND, AsyncLocalVectorIndex, get_local_index
+from opensearch_client import (
+    OPENSEARCH_REQUEST_TIMEOUT,
+    ThreadedAsyncClient,
+    get_async_opensearch_client,
+    get_opensearch_client,
+)
+from result_cache import SearchResultCache, get_result_cache
+from search_pagination import SEARCH_DEEP_MAX_RESULTS, SEARCH_PAGE_SIZE, SearchPager
+from search_queries import (
+    SEGMENT_FILTER_PATH,
+    VIDEO_FILTER_PATH,
+    build_deep_search,
+    build_hybrid_queries,
+    build_keyword_query,
+    build_segment_query,
+    build_semantic_query,
+)
+from telemetry import record_search_response, stage
+
+
+class VideoSearch:
+    """Runs the video searches behind the search tools and the search API.
+    Each search has an async method, which goes through the result cache, and a
+    synchronous wrapper that runs it on the background event loop with a sync
+    client, such as OpenSearch or LocalVectorIndex.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        index_name: Optional[str],
+        result_cache: Optional[SearchResultCache] = None,
+    ):
+        self.logger = logger
+        self.index_name = index_name
+
+        # Search responses are cached until they expire or the index is invalidated
+        self.result_cache = result_cache or get_result_cache()
+
+        # Event loop that runs all async I/O; the sync searches are wrappers around it
+        self.background_loop = get_background_loop()
+
+    def create_opensearch_client(self) -> OpenSearch:
+        """Returns the shared OpenSearch client instance.
+        The client is created once per process and reuses its connection pool.
+        With SEARCH_BACKEND=local, the in-process LocalVectorIndex is returned instead.
+        Args:
+            None
+        Returns:
+            OpenSearch: The OpenSearch client instance.
+        """
+        if SEARCH_BACKEND == "local":
+            return get_local_index()
+        return get_opensearch_client()
+
+    def create_async_opensearch_client(self) -> AsyncOpenSearch:
+        """Returns the shared async OpenSearch client instance.
+        The client and its connection pool live on the background event loop.
+        With SEARCH_BACKEND=local, an async facade over LocalVectorIndex is returned.
+        Args:
+            None
+        Returns:
+            AsyncOpenSearch: The async OpenSearch client instance.
+        """
+        if SEARCH_BACKEND == "local":
+            return AsyncLocalVectorIndex(get_local_index())
+        return get_async_opensearch_client()
+
+    def run_search(
+        self,
+        opensearch_client: OpenSearch,
+        query: dict,
+        filter_path: str = VIDEO_FILTER_PATH,
+    ) -> dict:
+        """Runs a search request against the OpenSearch index.
+        Synchronous wrapper around run_search_async.
+        Args:
+            opensearch_client (OpenSearch): The OpenSearch client instance.
+            query (dict): The OpenSearch query body.
+            filter_path (str): The response fields to keep.
+        Returns:
+            dict: The search results from OpenSearch.
+        """
+        return self.background_loop.run(
+            self.run_search_async(
+                ThreadedAsyncClient(opensearch_client), query, filter_path
+            )
+        )
+
+    async def run_search_async(
+        self,
+        opensearch_client: AsyncOpenSearch,
+        query: dict,
+        filter_path: str = VIDEO_FILTER_PATH,
+    ) -> dict:
+        """Runs a search request against the OpenSearch index without blocking.
+        Args:
+            opensearch_client (AsyncOpenSearch): The async OpenSearch client instance.
+            query (dict): The OpenSearch query body.
+            filter_path (str): The response fields to keep.
+        Returns:
+            dict: The search results from OpenSearch.
+        """
+        try:
+            with stage("opensearch_search"):
+                started = time.perf_counter()
+                search_results = await opensearch_client.search(
+                    body=query,
+                    index=self.index_name,
+                    filter_path=filter_path,
+                    request_timeout=OPENSEARCH_REQUEST_TIMEOUT,
+                )
+                record_search_response(search_results, time.perf_counter() - started)
+            self.logger.debug("Search results: %s", search_results)
+            return search_results
+        except Exception as err:
+            self.logger.error(f"Error querying index: {err}")
+            raise err
+
+    def run_multi_search(self, opensearch_client: OpenSearch, queries: list) -> dict:
+        """Runs several search requests against the OpenSearch index in one round trip.
+        Synchronous wrapper around run_multi_search_async.
+        Args:
+            opensearch_client (OpenSearch): The OpenSearch client instance.
+            queries (list): The OpenSearch query bodies.
+        Returns:
+            dict: The _msearch response from OpenSearch.
+        """
+        return self.background_loop.run(
+            self.run_multi_search_async(ThreadedAsyncClient(opensearch_client), queries)
+        )
+
+    async def run_multi_search_async(
+        self, opensearch_client: AsyncOpenSearch, queries: list
+    ) -> dict:
+        """Runs several search requests in one round trip without blocking.
+        Args:
+            opensearch_client (AsyncOpenSearch): The async OpenSearch client instance.
+            queries (list): The OpenSearch query bodies.
+        Returns:
+            dict: The _msearch response from OpenSearch.
+        """
+        try:
+            with stage("opensearch_msearch", queries=len(queries)):
+                started = time.perf_counter()
+                multi_search_results = await opensearch_client.msearch(
+                    body=build_msearch_body(queries, self.index_name),
+                    index=self.index_name,
+                    filter_path=MSEARCH_FILTER_PATH,
+                    request_timeout=OPENSEARCH_REQUEST_TIMEOUT,
+                )
+                elapsed = time.perf_counter() - started
+                record_search_response(multi_search_results, elapsed)
+            self.logger.debug("Multi-search results: %s", multi_search_results)
+            return multi_search_results
+        except Exception as err:
+            self.logger.error(f"Error querying index: {err}")
+            raise err
+
+    def semantic_search(
+        self,
+        opensearch_client: OpenSearch,
+        text_embedding: list,
+        results_size: int = 6,
+        include_embeddings: bool = False,
+    ) -> dict:
+        """Runs a semantic search for videos.
+        Synchronous wrapper around semantic_search_async.
+        Args:
+            opensearch_client (OpenSearch): The OpenSearch client instance.
+            text_embedding (list): The text embedding to use for the search.
+            results_size (int): The number of results to return.
+            include_embeddings (bool): Also return the embedding vectors.
+        Returns:
+            dict: The search results from OpenSearch.
+        """
+        return self.background_loop.run(
+            self.semantic_search_async(
+                ThreadedAsyncClient(opensearch_client),
+                text_embedding,
+                results_size,
+                include_embeddings,
+            )
+        )
+
+    async def semantic_search_async(
+        self,
+        opensearch_client: AsyncOpenSearch,
+        text_embedding: list,
+        results_size: int = 6,
+        include_embeddings: bool = False,
+    ) -> dict:
+        """Query the OpenSearch index using a text embedding and return a list of video search results.
+        This function performs a semantic search in OpenSearch using the provided text embedding.
+        It constructs a query that uses the k-nearest neighbors (kNN) algorithm to find
+        the most similar video segments based on the embedding.
+        The results are limited to the specified number of results_size.
+        Args:
+            opensearch_client (AsyncOpenSearch): The async OpenSearch client instance.
+            text_embedding (list): The text embedding to use for the search.
+            results_size (int): The number of results to return.
+            include_embeddings (bool): Also return the embedding vectors.
+        Returns:
+            dict: The search results from OpenSearch.
+        """
+        query = build_semantic_query(text_embedding, results_size, include_embeddings)
+        key = self.result_cache.make_key(
+            "semantic",
+            self.index_name,
+            results_size,
+            include_embeddings,
+            vector=text_embedding,
+        )
+        return await self.result_cache.get_or_search_async(
+            key,
+            self.index_name,
+            lambda: self.run_search_async(opensearch_client, query),
+        )
+
+    def keyword_search(
+        self,
+        opensearch_client: OpenSearch,
+        keyword_list: list,
+        results_size: int = 6,
+        include_embeddings: bool = False,
+    ) -> dict:
+        """Runs a keyword search for videos.
+        Synchronous wrapper around keyword_search_async.
+        Args:
+            opensearch_client (OpenSearch): The OpenSearch client instance.
+            keyword_list (list): The list of keywords to search for.
+            results_size (int): The number of results to return.
+            include_embeddings (bool): Also return the embedding vectors.
+        Returns:
+            dict: The search results from OpenSearch.
+        """
+        return self.background_loop.run(
+            self.keyword_search_async(
+                ThreadedAsyncClient(opensearch_client),
+                keyword_list,
+                results_size,
+                include_embeddings,
+            )
+        )
+
+    async def keyword_search_async(
+        self,
+        opensearch_client: AsyncOpenSearch,
+        keyword_list: list,
+        results_size: int = 6,
+        include_embeddings: bool = False,
+    ) -> dict:
+        """Query the OpenSearch index using a list of keywords and return the videos.
+        This function performs a keyword search in OpenSearch using the provided keyword list.
+        Args:
+            opensearch_client (AsyncOpenSearch): The async OpenSearch client instance.
+            keyword_list (list): The list of keywords to search for.
+            results_size (int): The number of results to return.
+            include_embeddings (bool): Also return the embedding vectors.
+        Returns:
+            dict: The search results from OpenSearch.
+        """
+        query = build_keyword_query(keyword_list, results_size, include_embeddings)
+        key = self.result_cache.make_key(
+            "keyword",
+            self.index_name,
+            results_size,
+            include_embeddings,
+            keywords=keyword_list,
+        )
+        return await self.result_cache.get_or_search_async(
+            key,
+            self.index_name,
+            lambda: self.run_search_async(opensearch_client, query),
+        )
+
+    def hybrid_search(
+        self,
+        opensearch_client: OpenSearch,
+        text_embedding: list,
+        keyword_list: list,
+        results_size: int = 6,
+    ) -> dict:
+        """Runs a hybrid semantic and keyword search for videos.
+        Synchronous wrapper around hybrid_search_async.
+        Args:
+            opensearch_client (OpenSearch): The OpenSearch client instance.
+            text_embedding (list): The text embedding to use for the semantic search.
+            keyword_list (list): The list of keywords to search for.
+            results_size (int): The number of results to return.
+        Returns:
+            dict: An OpenSearch-shaped response with the fused hits.
+        """
+        return self.background_loop.run(
+            self.hybrid_search_async(
+                ThreadedAsyncClient(opensearch_client),
+                text_embedding,
+                keyword_list,
+                results_size,
+            )
+        )
+
+    async def hybrid_search_async(
+        self,
+        opensearch_client: AsyncOpenSearch,
+        text_embedding: list,
+        keyword_list: list,
+        results_size: int = 6,
+    ) -> dict:
+        """Runs a semantic and a keyword search in one _msearch round trip and fuses them.
+        The rankings are combined client-side with weighted reciprocal-rank fusion.
+        Args:
+            opensearch_client (AsyncOpenSearch): The async OpenSearch client instance.
+            text_embedding (list): The text embedding to use for the semantic search.
+            keyword_list (list): The list of keywords to search for.
+            results_size (int): The number of results to return.
+        Returns:
+            dict: An OpenSearch-shaped response with the fused hits.
+        """
+        queries = build_hybrid_queries(
+            text_embedding, keyword_list, max(results_size, HYBRID_WINDOW_SIZE)
+        )
+
+        async def search() -> dict:
+            multi_search_results = await self.run_multi_search_async(
+                opensearch_client, queries
+            )
+            return fuse_hybrid_responses(
+                multi_search_results, results_size, self.logger
+            )
+
+        key = self.result_cache.make_key(
+            "hybrid",
+            self.index_name,
+            results_size,
+            vector=text_embedding,
+            keywords=keyword_list,
+        )
+        return await self.result_cache.get_or_search_async(
+            key, self.index_name, search
+        )
+
+    def semantic_search_segments(
+        self,
+        opensearch_client: OpenSearch,
+        text_embedding: list,
+        results_size: int = 6,
+        include_embeddings: bool = False,
+    ) -> dict:
+        """Runs a semantic search for video segments.
+        Synchronous wrapper around semantic_search_segments_async.
+        Args:
+            opensearch_client (OpenSearch): The OpenSearch client instance.
+            text_embedding (list): The text embedding to use for the search.
+            results_size (int): The number of results to return.
+            include_embeddings (bool): Also return the embedding vectors.
+        Returns:
+            dict: The search response from OpenSearch.
+        """
+        return self.background_loop.run(
+            self.semantic_search_segments_async(
+                ThreadedAsyncClient(opensearch_client),
+                text_embedding,
+                results_size,
+                include_embeddings,
+            )
+        )
+
+    async def semantic_search_segments_async(
+        self,
+        opensearch_client: AsyncOpenSearch,
+        text_embedding: list,
+        results_size: int = 6,
+        include_embeddings: bool = False,
+    ) -> dict:
+        """Performs a semantic search in OpenSearch using the provided text embedding and returns a list of video segments.
+        This function constructs a query that uses the k-nearest neighbors (kNN) algorithm to find
+        the most similar video segments based on the embedding. The results are limited to the specified number of results_size.
+        Args:
+            opensearch_client (AsyncOpenSearch): The async OpenSearch client instance.
+            text_embedding (list): The text embedding to use for the search.
+            results_size (int): The number of results to return.
+            include_embeddings (bool): Also return the embedding vectors.
+        Returns:
+            dict: The search response from OpenSearch.
+        """
+        query = build_segment_query(text_embedding, results_size, include_embeddings)
+        key = self.result_cache.make_key(
+            "segments",
+            self.index_name,
+            results_size,
+            include_embeddings,
+            vector=text_embedding,
+        )
+        return await self.result_cache.get_or_search_async(
+            key,
+            self.index_name,
+            lambda: self.run_search_async(opensearch_client, query, SEGMENT_FILTER_PATH),
+        )
+
+    def search_page(self, opensearch_client: OpenSearch, pager: SearchPager) -> dict:
+        """Fetches the next page of a deep search.
+        Synchronous wrapper around search_page_async.
+        Args:
+            opensearch_client (OpenSearch): The OpenSearch client instance.
+            pager (SearchPager): The deep search's position.
+        Returns:
+            dict: The page's search results from OpenSearch.
+        """
+        return self.background_loop.run(
+            self.search_page_async(ThreadedAsyncClient(opensearch_client), pager)
+        )
+
+    @on_background_loop
+    async def search_page_async(
+        self, opensearch_client: AsyncOpenSearch, pager: SearchPager
+    ) -> dict:
+        """Fetches the next page of a deep search on the background loop.
+        Args:
+            opensearch_client (AsyncOpenSearch): The async OpenSearch client instance.
+            pager (SearchPager): The deep search's position.
+        Returns:
+            dict: The page's search results from OpenSearch.
+        """
+        request = pager.next_request()
+        try:
+            with stage("opensearch_search_page"):
+                started = time.perf_counter()
+                page = await opensearch_client.search(
+                    **request, request_timeout=OPENSEARCH_REQUEST_TIMEOUT
+                )
+                record_search_response(page, time.perf_counter() - started)
+        except Exception as err:
+            self.logger.error(f"Error querying index: {err}")
+            raise err
+        pager.advance(request, page)
+        return page
+
+    def deep_search(
+        self,
+        opensearch_client: OpenSearch,
+        search_type: str,
+        query_input: list,
+        max_results: int = SEARCH_DEEP_MAX_RESULTS,
+        page_size: int = SEARCH_PAGE_SIZE,
+    ) -> Iterator[dict]:
+        """Retrieves up to max_results results, one formatted page at a time.
+        Synchronous wrapper around deep_search_async; each page is fetched and
+        formatted on the background loop as it is consumed.
+        Args:
+            opensearch_client (OpenSearch): The OpenSearch client instance.
+            search_type (str): "videos", "segments" or "keywords".
+            query_input (list): The text embedding, or the keywords.
+            max_results (int): The most videos to return.
+            page_size (int): The videos fetched and formatted per page.
+        Yields:
+            dict: Each page, formatted like format_search_results, or like
+                format_search_results_segments_grouped for segments.
+        """
+        yield from self.background_loop.iterate(
+            self.deep_search_async(
+                ThreadedAsyncClient(opensearch_client),
+                search_type,
+                query_input,
+                max_results,
+                page_size,
+            )
+        )
+
+    async def deep_search_async(
+        self,
+        opensearch_client: AsyncOpenSearch,
+        search_type: str,
+        query_input: list,
+        max_results: int = SEARCH_DEEP_MAX_RESULTS,
+        page_size: int = SEARCH_PAGE_SIZE,
+    ) -> AsyncIterator[dict]:
+        """Retrieves up to max_results results, one formatted page at a time.
+        Pages come from a point-in-time with search_after, falling back to from/size
+        where point-in-time is unsupported. Only the current page is held in memory,
+        and the results bypass the result cache. Requests run on the background loop,
+        and each page is formatted on the caller's loop as it is consumed.
+        Args:
+            opensearch_client (AsyncOpenSearch): The async OpenSearch client instance.
+            search_type (str): "videos", "segments" or "keywords".
+            query_input (list): The text embedding, or the keywords.
+            max_results (int): The most videos to return.
+            page_size (int): The videos fetched and formatted per page.
+        Yields:
+            dict: Each formatted page.
+        """
+        query, filter_path, format_page = build_deep_search(
+            search_type, query_input, max_results
+        )
+        pager = SearchPager(
+            query, self.index_name, max_results, page_size, filter_path
+        )
+        await self.background_loop.run_async(
+            pager.open_async(opensearch_client, self.logger)
+        )
+        try:
+            while not pager.done:
+                page = await self.search_page_async(opensearch_client, pager)
+                yield format_page(page)
+        finally:
+            await self.background_loop.run_async(
+                pager.close_async(opensearch_client, self.logger)
+            )